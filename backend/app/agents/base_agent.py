@@ -9,6 +9,7 @@ from langchain_core.messages import HumanMessage, SystemMessage
 from app.agents.gemini_wrapper import GeminiChatWrapper
 
 from app.core.config import settings
+from app.services.context_packer import pack_history
 import structlog
 import json
 import re
@@ -49,9 +50,22 @@ class BaseAgent(ABC):
         else:
             return self.openai_llm  # Fallback
     
-    def build_context(self, message: str, history: List[Dict[str, str]]) -> str:
-        """Construit le contexte de conversation"""
+    def build_context(
+        self,
+        message: str,
+        history: List[Dict[str, str]],
+        llm_provider: Optional[str] = None,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """
+        Construit le contexte de conversation
+
+        Avec max_tokens, l'historique est limité à ce budget (tokens comptés
+        pour llm_provider, échanges récents prioritaires)
+        """
         context = ""
+        if history and max_tokens is not None:
+            return pack_history(history, max_tokens, llm_provider)
         if history:
             context = "\n".join([
                 f"Utilisateur: {h.get('user', '')}\nAssistant: {h.get('bot', '')}"
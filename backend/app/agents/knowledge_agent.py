@@ -1,23 +1,36 @@
 """
 Knowledge Agent - RAG interne pour les procédures
-Utilise Pinecone pour la recherche vectorielle
+Utilise la recherche hybride (BM25 + vectorielle)
 """
 from typing import Dict, Any, List
 import structlog
 
 from app.agents.base_agent import BaseAgent
-from app.database.pinecone_client import PineconeClient
+from app.services.procedure_progress import get_procedure_progress, render_progress_prompt
 from app.services.procedure_service import ProcedureService
+from app.services.context_packer import pack_snippets, truncate_to_tokens
+from app.services.retrieval_service import get_retrieval_service
+from app.services.session_retrieval import get_session_retrieval
 
 logger = structlog.get_logger()
 
 
 class KnowledgeAgent(BaseAgent):
     """Agent spécialisé dans la recherche de connaissances (RAG)"""
+
+    # Budgets de tokens du contexte injecté (voir context_packer)
+    HISTORY_TOKEN_BUDGET = 1000
+    PROCEDURE_TOKEN_BUDGET = 1200
+    # Documentation injectée dans le prompt: au plus N extraits, dans un budget de tokens
+    KNOWLEDGE_TOP_K = 5
+    KNOWLEDGE_TOKEN_BUDGET = 1500
     
     def __init__(self):
         super().__init__()
-        self.pinecone = PineconeClient()
+        self.retrieval = get_retrieval_service()
+        self.session_retrieval = get_session_retrieval()
+        self.procedure_service = ProcedureService()
+        self.procedure_progress = get_procedure_progress()
     
     async def process(
         self,
@@ -32,25 +45,55 @@ class KnowledgeAgent(BaseAgent):
         Traite une demande de connaissances/procédures avec RAG
         """
         llm = self.get_llm(llm_provider)
-        context = self.build_context(message, history or [])
+        context = self.build_context(
+            message,
+            history or [],
+            llm_provider=llm_provider,
+            max_tokens=self.HISTORY_TOKEN_BUDGET
+        )
         
-        # Recherche vectorielle dans Pinecone
+        # Recherche hybride (BM25 + vectorielle)
+        relevant_docs = []
+        procedure_context = ""
         try:
-            relevant_docs = await self.pinecone.search(message, top_k=3)
+            # Documentation et procédure (une seule requête avec pgvector),
+            # réutilisées d'un tour à l'autre tant que le sujet ne change pas
+            relevant_docs, relevant_procedure = await self.session_retrieval.search(
+                session_id,
+                "knowledge",
+                message,
+                lambda: self.retrieval.search_with_procedure(
+                    message,
+                    top_k=self.KNOWLEDGE_TOP_K,
+                    token_budget=self.KNOWLEDGE_TOKEN_BUDGET
+                )
+            )
+            packed_docs = pack_snippets(relevant_docs, self.KNOWLEDGE_TOKEN_BUDGET, llm_provider)
             knowledge_context = "\n\n".join([
                 f"Document {i+1}: {doc.get('text', '')}"
-                for i, doc in enumerate(relevant_docs)
-            ]) if relevant_docs else "Aucune documentation pertinente trouvée."
-            
-            # Recherche de procédures pertinentes
-            procedure_service = ProcedureService()
-            relevant_procedure = await procedure_service.find_relevant_procedure(message)
+                for i, doc in enumerate(packed_docs)
+            ]) if packed_docs else "Aucune documentation pertinente trouvée."
             
-            if relevant_procedure:
-                procedure_context = "\n\n" + procedure_service.format_procedure_for_prompt(relevant_procedure)
-                knowledge_context += procedure_context
+            # Procédure en cours: seule l'étape suivante est injectée (taille constante)
+            progress = await self.procedure_progress.advance(
+                session_id,
+                message,
+                relevant_procedure,
+                sources=[doc.get("metadata", {}).get("source") for doc in relevant_docs]
+            )
+            if progress:
+                procedure_context = render_progress_prompt(progress)
+            elif relevant_procedure:
+                # Fragment précompilé, identique d'une requête à l'autre
+                procedure_context = self.procedure_service.format_procedure_for_prompt(relevant_procedure)
+            if procedure_context:
+                procedure_context = truncate_to_tokens(
+                    procedure_context,
+                    self.PROCEDURE_TOKEN_BUDGET,
+                    llm_provider
+                )
         except Exception as e:
-            logger.error("Pinecone search error", error=str(e))
+            logger.error("Knowledge search error", error=str(e))
             knowledge_context = "Erreur lors de la recherche dans la base de connaissances."
         
         system_prompt = """Vous êtes VyBuddy, un assistant de support IT chaleureux et empathique qui répond aux questions en vous basant sur la documentation interne et les procédures.
@@ -118,6 +161,11 @@ CONCISION IMPORTANTE:
 - Pour les procédures: posez UNE question à la fois, de manière conversationnelle
 """
         
+        # Procédure en fin de prompt système: les instructions forment un préfixe
+        # stable, qui peut être mis en cache par le fournisseur
+        if procedure_context:
+            system_prompt += f"\nPROCÉDURE APPLICABLE:\n{procedure_context}"
+        
         prompt = f"""Contexte de la conversation:
 {context}
 
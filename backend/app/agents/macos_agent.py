@@ -2,18 +2,83 @@
 MacOS Agent - Diagnostic Mac
 Spécialisé dans les problèmes macOS
 """
-from typing import Dict, Any, List
+import asyncio
+from typing import Dict, Any, List, Tuple
 import structlog
 
 from app.agents.base_agent import BaseAgent
 from app.core.company_context import get_company_context
+from app.services.context_packer import pack_snippets
+from app.services.retrieval_service import get_retrieval_service
+from app.services.session_retrieval import get_session_retrieval
 from app.services.jamf_service import JamfService
+from app.services.device_detection import (
+    conversation_texts,
+    find_serial_numbers,
+    find_hostname_candidates,
+    format_device_facts,
+)
 
 logger = structlog.get_logger()
 
 
 class MacOSAgent(BaseAgent):
     """Agent spécialisé dans le diagnostic macOS"""
+
+    # Budgets de tokens du contexte injecté (voir context_packer)
+    HISTORY_TOKEN_BUDGET = 600
+    # Documentation injectée dans le prompt: au plus N extraits, dans un budget de tokens
+    KNOWLEDGE_TOP_K = 3
+    KNOWLEDGE_TOKEN_BUDGET = 800
+    # Catégories de la base de connaissances recherchées (kb_chunker.source_category);
+    # tout l'index si les résultats filtrés sont trop faibles
+    KNOWLEDGE_FILTER = {"category": ["macbook", "macos_jamf", "wifi_macbook_jamf", "macos_issues", "software_installation"]}
+    # MacBook recherchés au plus dans la conversation (mentions récentes d'abord)
+    MAX_DEVICES = 2
+    
+    def __init__(self):
+        super().__init__()
+        self.retrieval = get_retrieval_service()
+        self.session_retrieval = get_session_retrieval()
+        self.jamf = JamfService()
+    
+    async def resolve_devices(self, message: str, history: List[Dict[str, str]]) -> Tuple[str, bool]:
+        """
+        Faits des MacBook mentionnés par l'utilisateur (numéro de série ou hostname)
+        
+        Args:
+            message: Message actuel de l'utilisateur
+            history: Historique de la conversation
+            
+        Returns:
+            (faits à injecter dans le prompt, "" si aucun MacBook détecté;
+            au moins un MacBook trouvé dans l'inventaire)
+        """
+        serials: List[str] = []
+        hostnames: List[str] = []
+        for text in conversation_texts(message, history):
+            serials += [serial for serial in find_serial_numbers(text) if serial not in serials]
+            hostnames += [hostname for hostname in find_hostname_candidates(text) if hostname not in hostnames]
+        if not serials and not hostnames:
+            return "", False
+        
+        # Hostnames: seuls ceux de l'inventaire sont retenus
+        found = await asyncio.gather(*[self.jamf.find_device_by_hostname(hostname) for hostname in hostnames])
+        for device in found:
+            if device and device["serial"].upper() not in serials:
+                serials.append(device["serial"].upper())
+        serials = serials[:self.MAX_DEVICES]
+        
+        async def describe(serial: str) -> Tuple[str, bool]:
+            device, users = await asyncio.gather(
+                self.jamf.get_device_info(serial),
+                self.jamf.get_device_users(serial)
+            )
+            return format_device_facts(device or {"serial": serial, "is_enrolled": False}, users), device is not None
+        
+        described = await asyncio.gather(*[describe(serial) for serial in serials])
+        logger.debug("MacBook detected in conversation", serials=serials)
+        return "\n".join(facts for facts, _ in described), any(found for _, found in described)
     
     async def process(
         self,
@@ -28,7 +93,12 @@ class MacOSAgent(BaseAgent):
         Traite une demande liée à macOS
         """
         llm = self.get_llm(llm_provider)
-        context = self.build_context(message, history or [])
+        context = self.build_context(
+            message,
+            history or [],
+            llm_provider=llm_provider,
+            max_tokens=self.HISTORY_TOKEN_BUDGET
+        )
         
         company_context = get_company_context()
         
@@ -118,25 +188,51 @@ RÈGLE DE COMMUNICATION CRITIQUE:
 - Les utilisateurs ne connaissent pas Jamf, ne les confondez pas avec des termes techniques
 """
         
-        # Recherche dans la base de connaissances
-        try:
-            from app.database.pinecone_client import PineconeClient
-            pinecone = PineconeClient()
-            relevant_docs = await pinecone.search(message, top_k=2)
-            knowledge_context = "\n\n".join([
-                f"{doc.get('text', '')}"
-                for doc in relevant_docs
-            ]) if relevant_docs else ""
-        except Exception as e:
-            logger.warning("Knowledge search failed", error=str(e))
-            knowledge_context = ""
+        # Recherche dans la base de connaissances (réutilisée pendant le diagnostic)
+        async def search_knowledge():
+            documents = await self.retrieval.search(
+                message,
+                top_k=self.KNOWLEDGE_TOP_K,
+                token_budget=self.KNOWLEDGE_TOKEN_BUDGET,
+                metadata_filter=self.KNOWLEDGE_FILTER
+            )
+            return documents, None
+        
+        async def load_knowledge() -> str:
+            try:
+                relevant_docs, _ = await self.session_retrieval.search(
+                    session_id, "macos", message, search_knowledge
+                )
+                return "\n\n".join([
+                    f"{doc.get('text', '')}"
+                    for doc in pack_snippets(relevant_docs, self.KNOWLEDGE_TOKEN_BUDGET, llm_provider)
+                ]) if relevant_docs else ""
+            except Exception as e:
+                logger.warning("Knowledge search failed", error=str(e))
+                return ""
+        
+        async def load_devices() -> Tuple[str, bool]:
+            try:
+                return await self.resolve_devices(message, history or [])
+            except Exception as e:
+                logger.warning("MacBook lookup failed", error=str(e))
+                return "", False
+        
+        # Recherche documentaire et inventaire des MacBook mentionnés en parallèle
+        knowledge_context, (device_facts, device_found) = await asyncio.gather(load_knowledge(), load_devices())
+        # Numéro de série à ne pas redemander seulement s'il a été trouvé dans l'inventaire
+        device_note = "inventaire IT, ne pas redemander le numéro de série" if device_found else "inventaire IT"
+        device_section = f"""
+MacBook de l'utilisateur ({device_note}):
+{device_facts}
+""" if device_facts else ""
         
         prompt = f"""Contexte de la conversation:
 {context}
 
 Base de connaissances pertinente:
 {knowledge_context if knowledge_context else "Aucune documentation spécifique trouvée."}
-
+{device_section}
 Message actuel de l'utilisateur: {message}
 
 RAPPEL CRITIQUE ABSOLU:
@@ -7,12 +7,29 @@ import structlog
 
 from app.agents.base_agent import BaseAgent
 from app.core.company_context import get_company_context
+from app.services.context_packer import pack_snippets
+from app.services.retrieval_service import get_retrieval_service
+from app.services.session_retrieval import get_session_retrieval
 
 logger = structlog.get_logger()
 
 
 class NetworkAgent(BaseAgent):
     """Agent spécialisé dans le diagnostic réseau"""
+
+    # Budgets de tokens du contexte injecté (voir context_packer)
+    HISTORY_TOKEN_BUDGET = 600
+    # Documentation injectée dans le prompt: au plus N extraits, dans un budget de tokens
+    KNOWLEDGE_TOP_K = 3
+    KNOWLEDGE_TOKEN_BUDGET = 800
+    # Catégories de la base de connaissances recherchées (kb_chunker.source_category);
+    # tout l'index si les résultats filtrés sont trop faibles
+    KNOWLEDGE_FILTER = {"category": ["wifi_macbook_jamf", "network_wifi"]}
+    
+    def __init__(self):
+        super().__init__()
+        self.retrieval = get_retrieval_service()
+        self.session_retrieval = get_session_retrieval()
     
     async def process(
         self,
@@ -34,7 +51,12 @@ class NetworkAgent(BaseAgent):
         - etc.
         """
         llm = self.get_llm(llm_provider)
-        context = self.build_context(message, history or [])
+        context = self.build_context(
+            message,
+            history or [],
+            llm_provider=llm_provider,
+            max_tokens=self.HISTORY_TOKEN_BUDGET
+        )
         
         company_context = get_company_context()
         
@@ -99,14 +121,23 @@ CONCISION IMPORTANTE:
 - Pour les solutions: listez les étapes clairement, sans trop d'explications superflues
 """
         
-        # Recherche dans la base de connaissances
+        # Recherche dans la base de connaissances (réutilisée pendant le diagnostic)
+        async def search_knowledge():
+            documents = await self.retrieval.search(
+                message,
+                top_k=self.KNOWLEDGE_TOP_K,
+                token_budget=self.KNOWLEDGE_TOKEN_BUDGET,
+                metadata_filter=self.KNOWLEDGE_FILTER
+            )
+            return documents, None
+        
         try:
-            from app.database.pinecone_client import PineconeClient
-            pinecone = PineconeClient()
-            relevant_docs = await pinecone.search(message, top_k=2)
+            relevant_docs, _ = await self.session_retrieval.search(
+                session_id, "network", message, search_knowledge
+            )
             knowledge_context = "\n\n".join([
                 f"{doc.get('text', '')}"
-                for doc in relevant_docs
+                for doc in pack_snippets(relevant_docs, self.KNOWLEDGE_TOKEN_BUDGET, llm_provider)
             ]) if relevant_docs else ""
         except Exception as e:
             logger.warning("Knowledge search failed", error=str(e))
@@ -1,11 +1,12 @@
 """
 Odoo Ticket Agent - Création de tickets dans Odoo
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import structlog
 import httpx
 
 from app.core.config import settings
+from app.services.procedure_progress import format_collected_answers
 
 logger = structlog.get_logger()
 
@@ -105,7 +106,8 @@ class OdooTicketAgent:
         session_id: str,
         issue_description: str,
         conversation_history: List[Dict[str, str]] = None,
-        agent_used: str = "unknown"
+        agent_used: str = "unknown",
+        procedure_progress: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """
         Crée un ticket dans Odoo Helpdesk
@@ -116,6 +118,7 @@ class OdooTicketAgent:
             issue_description: Description du problème
             conversation_history: Historique de la conversation
             agent_used: Agent qui a traité la demande
+            procedure_progress: Procédure suivie et réponses collectées (optionnel)
             
         Returns:
             Informations du ticket créé
@@ -140,9 +143,15 @@ class OdooTicketAgent:
 
 Agent utilisé: {agent_used}
 Session ID: {session_id}
-
-Historique de la conversation:
 """
+            if procedure_progress:
+                procedure = procedure_progress["procedure"]
+                description += f"\nProcédure suivie: {procedure['title']} ({procedure['category']})\n"
+                collected = format_collected_answers(procedure_progress)
+                if collected:
+                    description += f"Informations collectées:\n{collected}\n"
+            
+            description += "\nHistorique de la conversation:\n"
             if conversation_history:
                 for exchange in conversation_history[-10:]:  # Derniers 10 échanges
                     description += f"\nUtilisateur: {exchange.get('user', '')}"
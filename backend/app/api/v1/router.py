@@ -2,11 +2,10 @@
 Routes API REST
 """
 from fastapi import APIRouter, HTTPException, Depends, Request, Header
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
-from datetime import datetime
-from pathlib import Path
+from datetime import datetime, timedelta, timezone
 import structlog
 import os
 import asyncio
@@ -16,6 +15,9 @@ from app.services.orchestrator import OrchestratorService
 from app.services.slack_service import SlackService
 from app.services.human_support_service import HumanSupportService
 from app.services.knowledge_base_storage import KnowledgeBaseStorage
+from app.services.conversation_export import ConversationExportService, EXPORT_PLATFORMS
+from app.services.admin_jobs import JobAlreadyRunningError, get_job_manager
+from app.services.kb_indexer import index_knowledge_base
 from app.database.supabase_client import SupabaseClient
 from app.database.redis_client import RedisClient
 from app.middleware.auth_middleware import get_current_user, get_current_admin
@@ -28,6 +30,8 @@ slack_service = SlackService()
 human_support = HumanSupportService()
 knowledge_base_storage = KnowledgeBaseStorage()  # Instance partagée utilisant le service role key
 supabase = SupabaseClient()
+conversation_export = ConversationExportService()
+job_manager = get_job_manager()
 redis_client = RedisClient()
 
 
@@ -553,6 +557,84 @@ async def get_feedback_stats(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@api_router.get("/admin/feedbacks/stats/daily")
+async def get_feedback_stats_daily(
+    days: int = 30,
+    current_user: dict = Depends(get_current_admin)
+):
+    """
+    Récupère les statistiques des feedbacks jour par jour (admin uniquement)
+    """
+    try:
+        stats = await supabase.get_feedback_stats_daily(days=days)
+        return {"stats": stats}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@api_router.get("/admin/agents/stats")
+async def get_agent_stats(
+    days: int = 7,
+    current_user: dict = Depends(get_current_admin)
+):
+    """
+    Récupère les statistiques d'utilisation des agents (admin uniquement)
+    """
+    try:
+        stats = await supabase.get_agent_stats(days=days)
+        return {"stats": stats}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@api_router.get("/admin/export/conversations")
+async def export_conversations(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    agent_used: Optional[str] = None,
+    platform: Optional[str] = None,
+    current_user: dict = Depends(get_current_admin)
+):
+    """
+    Exporte conversations et interactions en NDJSON streamé (admin uniquement)
+    Par défaut: les 30 derniers jours. Filtres optionnels: agent_used, platform (web/slack)
+    """
+    if not conversation_export.is_configured():
+        raise HTTPException(status_code=503, detail="SUPABASE_DB_URL is not configured")
+    if platform and platform not in EXPORT_PLATFORMS:
+        raise HTTPException(status_code=400, detail=f"platform must be one of: {', '.join(EXPORT_PLATFORMS)}")
+    if conversation_export.is_busy():
+        raise HTTPException(status_code=429, detail="Too many exports in progress, retry later")
+    
+    # Les dates sans fuseau sont interprétées en UTC
+    end = end.replace(tzinfo=end.tzinfo or timezone.utc) if end else datetime.now(timezone.utc)
+    start = start.replace(tzinfo=start.tzinfo or timezone.utc) if start else end - timedelta(days=30)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    
+    logger.info(
+        "Conversation export requested",
+        admin=current_user.get("email"),
+        start=start.isoformat(),
+        end=end.isoformat(),
+        agent_used=agent_used,
+        platform=platform
+    )
+    
+    filename = f"conversations_{start:%Y%m%d}_{end:%Y%m%d}.ndjson"
+    return StreamingResponse(
+        conversation_export.stream_ndjson(start, end, agent_used=agent_used, platform=platform),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
 # Endpoints admin pour la base de connaissances
 class KnowledgeBaseFileRequest(BaseModel):
     """Requête pour créer/modifier un fichier de la base de connaissances"""
@@ -750,39 +832,82 @@ async def delete_knowledge_base_file(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _run_reindex_job(progress, full: bool = False):
+    """Job de réindexation de la base de connaissances"""
+    return await index_knowledge_base(full=full, progress=progress)
+
+
+async def _run_pipeline_job(progress):
+    """Job du pipeline procédural complet (scripts/run_full_pipeline.py)"""
+    from scripts.run_full_pipeline import run_pipeline
+    await run_pipeline(progress=progress)
+    return {"steps": 4}
+
+
+async def _start_admin_job(kind: str, func, params: dict, current_user: dict) -> JSONResponse:
+    """Démarre un job sur la base de connaissances (202, ou 409 si un job tourne déjà)"""
+    try:
+        job = await job_manager.start(
+            kind,
+            resource="knowledge_base",
+            func=func,
+            params=params,
+            user=current_user.get("email")
+        )
+    except JobAlreadyRunningError as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "A knowledge base job is already running", "job_id": e.job_id}
+        )
+    except Exception as e:
+        logger.error("Error starting admin job", kind=kind, error=str(e))
+        raise HTTPException(status_code=500, detail=f"Error starting job: {str(e)}")
+    return JSONResponse(status_code=202, content=job)
+
+
 @api_router.post("/admin/knowledge-base/reindex")
 async def reindex_knowledge_base(
+    full: bool = False,
     current_user: dict = Depends(get_current_admin)
 ):
     """
-    Re-indexe la base de connaissances dans Pinecone (admin uniquement)
+    Re-indexe la base de connaissances (admin uniquement), en arrière-plan
+    
+    Incrémental: seuls les chunks nouveaux ou modifiés sont ré-encodés et les
+    chunks supprimés sont retirés de l'index. full=true reconstruit l'index
+    dans un nouveau namespace, activé après validation.
+    Retourne le job (202); suivi par GET /admin/jobs/{job_id} ou par le
+    WebSocket /ws/admin/jobs/{job_id}.
+    """
+    return await _start_admin_job("reindex", _run_reindex_job, {"full": full}, current_user)
+
+
+@api_router.post("/admin/jobs/pipeline")
+async def run_procedures_pipeline(
+    current_user: dict = Depends(get_current_admin)
+):
+    """
+    Lance le pipeline procédural complet en arrière-plan (admin uniquement)
+    """
+    return await _start_admin_job("pipeline", _run_pipeline_job, {}, current_user)
+
+
+@api_router.get("/admin/jobs/{job_id}")
+async def get_admin_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_admin)
+):
+    """
+    Statut d'un job d'administration (admin uniquement)
     """
     try:
-        # Importer et exécuter le script de chargement
-        import sys
-        
-        # Ajouter le chemin du backend au sys.path
-        backend_dir = Path(__file__).parent.parent.parent.parent
-        scripts_dir = backend_dir / "scripts"
-        
-        if str(backend_dir) not in sys.path:
-            sys.path.insert(0, str(backend_dir))
-        
-        # Importer la fonction de chargement
-        from scripts.load_knowledge_base import load_knowledge_base
-        
-        # Exécuter le chargement de manière asynchrone
-        await load_knowledge_base()
-        
-        logger.info("Knowledge base reindexed", user=current_user.get("email"))
-        
-        return {"message": "Knowledge base reindexed successfully"}
-        
-    except HTTPException:
-        raise
+        job = await job_manager.get(job_id)
     except Exception as e:
-        logger.error("Error reindexing knowledge base", error=str(e))
-        raise HTTPException(status_code=500, detail=f"Error reindexing: {str(e)}")
+        logger.error("Error reading admin job", job_id=job_id, error=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 # ============================================
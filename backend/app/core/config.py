@@ -22,6 +22,8 @@ class Settings(BaseSettings):
     SUPABASE_URL: str
     SUPABASE_KEY: str
     SUPABASE_SERVICE_ROLE_KEY: str = ""  # Service role key pour bypass RLS (admin operations)
+    SUPABASE_DB_URL: str = ""  # Connexion Postgres directe (jobs d'archivage et exports)
+    INTERACTIONS_RETENTION_MONTHS: int = 12  # Mois conservés dans la table interactions avant archivage
     
     # Redis Cloud
     REDIS_URL: str
@@ -31,6 +33,25 @@ class Settings(BaseSettings):
     PINECONE_API_KEY: str
     PINECONE_ENVIRONMENT: str = ""  # Optionnel, non utilisé avec le nouveau SDK
     PINECONE_INDEX_NAME: str = "vybuddy-rag"
+    PINECONE_TIMEOUT_SECONDS: float = 5.0  # Timeout d'une recherche
+    PINECONE_UPSERT_TIMEOUT_SECONDS: float = 30.0  # Timeout d'un upsert
+    PINECONE_MAX_WORKERS: int = 8  # Threads dédiés aux appels Pinecone (SDK synchrone)
+    
+    # Moteur de recherche vectorielle: "pinecone" (index distant), "local" (NumPy en mémoire)
+    # ou "pgvector" (Postgres Supabase, voir scripts/add_pgvector_retrieval.sql)
+    VECTOR_BACKEND: str = "pinecone"
+    PGVECTOR_TIMEOUT_SECONDS: float = 5.0  # Timeout d'une recherche pgvector
+    LOCAL_VECTOR_INDEX_DIR: str = ""  # Vide = backend/data/vector_index
+    LOCAL_VECTOR_INDEX_INT8: bool = False  # Quantification int8 (mémoire / 4)
+    
+    # Stockage persistant des embeddings de documents: "sqlite", "redis" ou "none"
+    # (vide = redis en production, sqlite sinon)
+    EMBEDDING_STORE: str = ""
+    EMBEDDING_STORE_PATH: str = ""  # Vide = backend/data/embedding_store/embeddings.sqlite3
+    
+    # Stockage du texte des chunks: "sqlite" ou "redis" (vide = redis en production, sqlite sinon)
+    CHUNK_STORE: str = ""
+    CHUNK_STORE_PATH: str = ""  # Vide = backend/data/chunk_store/chunks.sqlite3
     
     # Odoo
     ODOO_URL: str
@@ -85,13 +85,14 @@ class HealthChecker:
     
     async def check_pinecone(self) -> Dict[str, Any]:
         """Vérifie la connexion Pinecone"""
+        if settings.VECTOR_BACKEND != "pinecone":
+            return {
+                "status": "ok",
+                "message": f"Non utilisé (VECTOR_BACKEND={settings.VECTOR_BACKEND})"
+            }
         try:
-            client = self.pinecone_client._get_client()
-            # Vérifier que l'index existe
-            index = self.pinecone_client._get_index()
-            
-            # Test simple: obtenir les stats de l'index
-            stats = index.describe_index_stats()
+            # Test simple: obtenir les stats de l'index (vérifie aussi qu'il existe)
+            stats = await self.pinecone_client.describe_index_stats()
             
             return {
                 "status": "ok",
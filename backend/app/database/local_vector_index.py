@@ -0,0 +1,309 @@
+"""
+Index vectoriel local (NumPy) pour la base de connaissances
+
+La base de connaissances ne compte que quelques centaines de vecteurs: une
+matrice float32 normalisée en mémoire suffit. Une recherche est un produit
+matrice-vecteur suivi d'un top-k par argpartition (quelques microsecondes),
+sans aller-retour réseau.
+
+Chaque namespace est persisté dans un fichier .npz (vecteurs, IDs et
+métadonnées) écrit de manière atomique. Les instances rechargent le fichier
+dès que sa date de modification change: un réindexage (même depuis un autre
+processus) est pris en compte à la recherche suivante.
+
+Option LOCAL_VECTOR_INDEX_INT8: vecteurs quantifiés en int8 avec un facteur
+d'échelle par ligne (mémoire divisée par 4, écart de score négligeable).
+"""
+import json
+import os
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+import structlog
+
+from app.core.config import settings
+from app.database.vector_store import VectorStore, matches_filter
+from app.services.embedding_service import get_embedding_service
+
+logger = structlog.get_logger()
+
+# Répertoire par défaut des fichiers d'index (backend/data/vector_index)
+DEFAULT_INDEX_DIR = Path(__file__).parent.parent.parent / "data" / "vector_index"
+
+# Nom de fichier du namespace par défaut
+DEFAULT_NAMESPACE = "default"
+
+
+class _Namespace:
+    """Contenu chargé d'un namespace"""
+
+    def __init__(
+        self,
+        ids: List[str],
+        metadata: List[Dict[str, Any]],
+        vectors: np.ndarray,
+        quantize: bool,
+        mtime: int = 0
+    ):
+        self.ids = ids
+        self.metadata = metadata
+        self.mtime = mtime
+        self.dimension = vectors.shape[1] if vectors.size else 0
+        if quantize and vectors.size:
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self.matrix = np.round(vectors / scales[:, None]).astype(np.int8)
+            self.scales = scales.astype(np.float32)
+        else:
+            self.matrix = vectors
+            self.scales = None
+
+    def scores(self, query: np.ndarray) -> np.ndarray:
+        """Similarités cosinus entre la requête (normalisée) et chaque ligne"""
+        scores = self.matrix @ query
+        if self.scales is not None:
+            scores = scores * self.scales
+        return scores
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Normalise chaque ligne (norme L2 = 1)"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+class LocalVectorIndex(VectorStore):
+    """Index vectoriel en mémoire (NumPy), persisté sur disque"""
+
+    def __init__(self, index_dir: Optional[str] = None, quantize: Optional[bool] = None):
+        self.index_dir = Path(index_dir or settings.LOCAL_VECTOR_INDEX_DIR or DEFAULT_INDEX_DIR)
+        self.quantize = settings.LOCAL_VECTOR_INDEX_INT8 if quantize is None else quantize
+        self._namespaces: Dict[str, _Namespace] = {}
+
+    def _path(self, namespace: Optional[str]) -> Path:
+        """Chemin du fichier d'un namespace"""
+        return self.index_dir / f"{namespace or DEFAULT_NAMESPACE}.npz"
+
+    def _load(self, namespace: Optional[str]) -> Optional[_Namespace]:
+        """Retourne le namespace, rechargé si le fichier a changé"""
+        name = namespace or DEFAULT_NAMESPACE
+        path = self._path(namespace)
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self._namespaces.pop(name, None)
+            return None
+
+        cached = self._namespaces.get(name)
+        if cached and cached.mtime == mtime:
+            return cached
+
+        ids, metadata, vectors = self._read(namespace)
+        loaded = _Namespace(ids, metadata, vectors, quantize=self.quantize, mtime=mtime)
+        self._namespaces[name] = loaded
+        logger.info(
+            "Local vector index loaded",
+            namespace=name,
+            vectors=len(loaded.ids),
+            int8=self.quantize
+        )
+        return loaded
+
+    def _read(self, namespace: Optional[str]):
+        """Lit le fichier d'un namespace: (ids, métadonnées, vecteurs float32)"""
+        path = self._path(namespace)
+        if not path.exists():
+            return [], [], np.zeros((0, 0), dtype=np.float32)
+        with np.load(path, allow_pickle=False) as data:
+            return (
+                [str(i) for i in data["ids"]],
+                json.loads(str(data["metadata"])),
+                data["vectors"].astype(np.float32)
+            )
+
+    def _save(self, namespace: Optional[str], ids: List[str], metadata: List[Dict[str, Any]], vectors: np.ndarray):
+        """Écrit un namespace de manière atomique (fichier temporaire + rename)"""
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(namespace)
+        tmp_path = path.with_suffix(".tmp.npz")
+        np.savez(
+            tmp_path,
+            ids=np.array(ids, dtype=str),
+            metadata=np.array(json.dumps(metadata, ensure_ascii=False)),
+            vectors=vectors.astype(np.float32)
+        )
+        os.replace(tmp_path, path)
+        # Force le rechargement (la résolution de mtime peut être grossière)
+        self._namespaces.pop(namespace or DEFAULT_NAMESPACE, None)
+
+    def get_version(self, namespace: str = None) -> int:
+        """Version du fichier d'un namespace (mtime en ns, 0 s'il n'existe pas)"""
+        try:
+            return self._path(namespace).stat().st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def get_documents(self, namespace: str = None) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Retourne les documents indexés d'un namespace (sans les vecteurs)
+
+        Returns:
+            (version, documents): la version change à chaque réécriture du fichier
+            (0 si le namespace n'existe pas)
+        """
+        index = self._load(namespace)
+        if not index:
+            return 0, []
+        return index.mtime, [
+            {"id": vector_id, "text": metadata.get("text", ""), "metadata": metadata}
+            for vector_id, metadata in zip(index.ids, index.metadata)
+        ]
+
+    async def search(
+        self,
+        query: str,
+        top_k: int = 3,
+        namespace: str = None,
+        query_embedding: Optional[List[float]] = None,
+        metadata_filter: Optional[Dict[str, List[str]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Recherche vectorielle locale (produit matrice-vecteur + argpartition)
+
+        Args:
+            query: Requête de recherche
+            top_k: Nombre de résultats à retourner
+            namespace: Namespace (optionnel)
+            query_embedding: Embedding déjà calculé de la requête (optionnel)
+            metadata_filter: Valeurs admises par champ de métadonnées (optionnel)
+
+        Returns:
+            Liste des documents pertinents
+        """
+        try:
+            index = self._load(namespace)
+            if not index or not index.ids:
+                return []
+
+            if query_embedding is None:
+                query_embedding = await get_embedding_service().embed_query(query)
+
+            query_vector = np.asarray(query_embedding, dtype=np.float32)
+            if query_vector.shape[0] != index.dimension:
+                raise ValueError(
+                    f"Query dimension {query_vector.shape[0]} != index dimension {index.dimension}"
+                )
+            norm = np.linalg.norm(query_vector)
+            if norm:
+                query_vector = query_vector / norm
+
+            scores = index.scores(query_vector)
+            rows = np.arange(len(scores))
+            if metadata_filter:
+                # Filtre appliqué avant le top-k
+                rows = np.asarray([
+                    row for row, metadata in enumerate(index.metadata)
+                    if matches_filter(metadata, metadata_filter)
+                ], dtype=np.int64)
+                scores = scores[rows]
+            k = min(top_k, len(scores))
+            if k == 0:
+                return []
+            if k < len(scores):
+                top = np.argpartition(-scores, k - 1)[:k]
+            else:
+                top = np.arange(len(scores))
+            top = top[np.argsort(-scores[top])]
+
+            documents = []
+            for position in top:
+                row = rows[position]
+                metadata = index.metadata[row]
+                documents.append({
+                    "id": index.ids[row],
+                    "score": float(scores[position]),
+                    "text": metadata.get("text", ""),
+                    "metadata": metadata
+                })
+
+            logger.debug(
+                "Local vector search completed",
+                query_preview=query[:50],
+                results_count=len(documents)
+            )
+            return documents
+
+        except Exception as e:
+            logger.error(
+                "Local vector search error",
+                error=str(e),
+                exc_info=True
+            )
+            return []
+
+    async def upsert_vectors(
+        self,
+        vectors: List[Dict[str, Any]],
+        namespace: str = None
+    ):
+        """Ajoute ou remplace des vecteurs (par ID) puis réécrit le namespace"""
+        if not vectors:
+            return
+
+        # Relecture du fichier: les vecteurs float32 d'origine (pas la version int8)
+        current_ids, current_metadata, current_vectors = self._read(namespace)
+        rows: Dict[str, Any] = {}
+        for i, vector_id in enumerate(current_ids):
+            rows[vector_id] = (current_vectors[i], current_metadata[i])
+
+        new_values = _normalize_rows(np.asarray([v["values"] for v in vectors], dtype=np.float32))
+        for i, vector in enumerate(vectors):
+            rows[vector["id"]] = (new_values[i], vector.get("metadata", {}))
+
+        ids = list(rows.keys())
+        self._save(
+            namespace,
+            ids,
+            [rows[vector_id][1] for vector_id in ids],
+            np.vstack([rows[vector_id][0] for vector_id in ids])
+        )
+        logger.info(
+            "Vectors upserted to local index",
+            namespace=namespace or DEFAULT_NAMESPACE,
+            count=len(vectors),
+            total=len(ids)
+        )
+
+    async def delete_vectors(self, ids: List[str], namespace: str = None):
+        """Supprime des vecteurs par ID puis réécrit le namespace"""
+        if not ids:
+            return
+        current_ids, current_metadata, current_vectors = self._read(namespace)
+
+        to_delete = set(ids)
+        keep = [i for i, vector_id in enumerate(current_ids) if vector_id not in to_delete]
+        if len(keep) == len(current_ids):
+            return
+
+        self._save(
+            namespace,
+            [current_ids[i] for i in keep],
+            [current_metadata[i] for i in keep],
+            current_vectors[keep]
+        )
+        logger.info(
+            "Vectors deleted from local index",
+            namespace=namespace or DEFAULT_NAMESPACE,
+            count=len(current_ids) - len(keep)
+        )
+
+    async def delete_namespace(self, namespace: str):
+        """Supprime le fichier d'un namespace"""
+        try:
+            self._path(namespace).unlink()
+        except FileNotFoundError:
+            return
+        self._namespaces.pop(namespace or DEFAULT_NAMESPACE, None)
+        logger.info("Local vector index namespace deleted", namespace=namespace or DEFAULT_NAMESPACE)
@@ -0,0 +1,212 @@
+"""
+Moteur vectoriel pgvector (Postgres Supabase)
+
+Les vecteurs des chunks sont dans la table kb_chunks et ceux des procédures
+dans procedures.embedding (migration scripts/add_pgvector_retrieval.sql).
+La RPC match_knowledge renvoie en un seul appel les chunks les plus proches
+et la procédure la plus proche avec sa ligne structurée.
+
+Le client Supabase est synchrone: chaque appel s'exécute dans un thread,
+avec un timeout.
+"""
+import asyncio
+import json
+from typing import List, Dict, Any, Optional, Tuple
+
+import structlog
+
+from app.core.config import settings
+from app.database.supabase_client import SupabaseClient
+from app.database.vector_store import VectorStore
+from app.services.embedding_service import get_embedding_service
+
+logger = structlog.get_logger()
+
+# Namespace par défaut (même convention que l'index local et le chunk store)
+DEFAULT_NAMESPACE = "default"
+
+# Champs JSON d'une procédure (renvoyés sous forme de texte selon la version de PostgREST)
+PROCEDURE_JSON_FIELDS = ("diagnostic_questions", "resolution_steps", "ticket_creation", "common_issues")
+
+
+def _parse_procedure(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Ligne de procédure renvoyée par la RPC -> même forme que get_procedures_by_category"""
+    procedure = dict(row)
+    for field in PROCEDURE_JSON_FIELDS:
+        if isinstance(procedure.get(field), str):
+            procedure[field] = json.loads(procedure[field])
+    return procedure
+
+
+class PgVectorStore(VectorStore):
+    """Recherche vectorielle dans Postgres (pgvector) via les RPC Supabase"""
+
+    TABLE = "kb_chunks"
+    # Lignes par requête d'upsert et requêtes simultanées
+    UPSERT_BATCH_SIZE = 100
+    UPSERT_CONCURRENCY = 4
+    # Timeout d'une écriture (upsert, suppression)
+    WRITE_TIMEOUT = 30.0
+    # Similarité minimale d'une procédure retenue sans catégorie
+    PROCEDURE_MIN_SCORE = 0.5
+
+    def __init__(self):
+        self.supabase = SupabaseClient()
+        self.timeout = settings.PGVECTOR_TIMEOUT_SECONDS
+
+    async def _run(self, query, timeout: Optional[float] = None):
+        """Exécute une requête Supabase (synchrone) dans un thread"""
+        return await asyncio.wait_for(asyncio.to_thread(query.execute), timeout=timeout or self.timeout)
+
+    async def match(
+        self,
+        query: str,
+        top_k: int = 3,
+        namespace: str = None,
+        query_embedding: Optional[List[float]] = None,
+        procedure_category: Optional[str] = None,
+        with_procedure: bool = False,
+        metadata_filter: Optional[Dict[str, List[str]]] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Chunks et procédure les plus proches d'une requête, en un appel
+
+        Args:
+            query: Requête de recherche
+            top_k: Nombre de chunks à retourner
+            namespace: Namespace des chunks (optionnel)
+            query_embedding: Embedding déjà calculé de la requête (optionnel)
+            procedure_category: Limite la procédure à une catégorie (optionnel)
+            with_procedure: Recherche aussi la procédure la plus proche; sans
+                catégorie, seule une procédure d'une similarité d'au moins
+                PROCEDURE_MIN_SCORE est retenue
+            metadata_filter: Valeurs admises par champ de métadonnées des chunks (optionnel)
+
+        Returns:
+            (chunks {"id", "score", "text", "metadata"}, procédure ou None)
+        """
+        try:
+            if query_embedding is None:
+                query_embedding = await get_embedding_service().embed_query(query)
+
+            client = self.supabase._get_client()
+            result = await self._run(client.rpc("match_knowledge", {
+                "query_embedding": query_embedding,
+                "match_namespace": namespace or DEFAULT_NAMESPACE,
+                "match_count": top_k,
+                "procedure_category": procedure_category,
+                "procedure_count": 1 if with_procedure else 0,
+                "procedure_min_score": 0 if procedure_category else self.PROCEDURE_MIN_SCORE,
+                "match_filter": metadata_filter or None,
+            }))
+
+            documents = []
+            procedure = None
+            for row in result.data or []:
+                if row["kind"] == "procedure":
+                    procedure = {**_parse_procedure(row["procedure"]), "score": row["score"]}
+                    continue
+                metadata = row.get("metadata") or {}
+                documents.append({
+                    "id": row["id"],
+                    "score": row["score"],
+                    # Texte lu dans le chunk store par la recherche hybride
+                    "text": metadata.get("text", ""),
+                    "metadata": metadata
+                })
+
+            logger.debug(
+                "pgvector search completed",
+                query_preview=query[:50],
+                results_count=len(documents),
+                procedure=procedure["title"] if procedure else None
+            )
+            return documents, procedure
+
+        except asyncio.TimeoutError:
+            logger.warning("pgvector search timeout", query_preview=query[:50], timeout=self.timeout)
+            return [], None
+        except Exception as e:
+            logger.error("pgvector search error", error=str(e), exc_info=True)
+            return [], None
+
+    async def search(
+        self,
+        query: str,
+        top_k: int = 3,
+        namespace: str = None,
+        query_embedding: Optional[List[float]] = None,
+        metadata_filter: Optional[Dict[str, List[str]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Recherche vectorielle dans kb_chunks
+
+        Args:
+            query: Requête de recherche
+            top_k: Nombre de résultats à retourner
+            namespace: Namespace (optionnel)
+            query_embedding: Embedding déjà calculé de la requête (optionnel)
+
+        Returns:
+            Liste des documents pertinents
+        """
+        documents, _ = await self.match(query, top_k, namespace, query_embedding, metadata_filter=metadata_filter)
+        return documents
+
+    async def upsert_vectors(
+        self,
+        vectors: List[Dict[str, Any]],
+        namespace: str = None
+    ):
+        """Ajoute ou remplace des vecteurs (par batch, en parallèle)"""
+        if not vectors:
+            return
+        client = self.supabase._get_client()
+        semaphore = asyncio.Semaphore(self.UPSERT_CONCURRENCY)
+
+        async def upsert_batch(batch: List[Dict[str, Any]]):
+            rows = [
+                {
+                    "namespace": namespace or DEFAULT_NAMESPACE,
+                    "id": vector["id"],
+                    "embedding": vector["values"],
+                    "metadata": vector.get("metadata", {}),
+                }
+                for vector in batch
+            ]
+            async with semaphore:
+                await self._run(
+                    client.table(self.TABLE).upsert(rows, on_conflict="namespace,id"),
+                    timeout=self.WRITE_TIMEOUT
+                )
+
+        await asyncio.gather(*[
+            upsert_batch(vectors[i:i + self.UPSERT_BATCH_SIZE])
+            for i in range(0, len(vectors), self.UPSERT_BATCH_SIZE)
+        ])
+        logger.info("Vectors upserted to pgvector", namespace=namespace or DEFAULT_NAMESPACE, count=len(vectors))
+
+    async def delete_vectors(self, ids: List[str], namespace: str = None):
+        """Supprime des vecteurs par ID"""
+        if not ids:
+            return
+        client = self.supabase._get_client()
+        batch_size = 200
+        await asyncio.gather(*[
+            self._run(
+                client.table(self.TABLE).delete()
+                .eq("namespace", namespace or DEFAULT_NAMESPACE)
+                .in_("id", ids[i:i + batch_size]),
+                timeout=self.WRITE_TIMEOUT
+            )
+            for i in range(0, len(ids), batch_size)
+        ])
+
+    async def delete_namespace(self, namespace: str):
+        """Supprime tous les vecteurs d'un namespace"""
+        client = self.supabase._get_client()
+        await self._run(
+            client.table(self.TABLE).delete().eq("namespace", namespace or DEFAULT_NAMESPACE),
+            timeout=self.WRITE_TIMEOUT
+        )
+        logger.info("pgvector namespace deleted", namespace=namespace or DEFAULT_NAMESPACE)
@@ -1,44 +1,118 @@
 """
 Client Pinecone pour la recherche vectorielle (RAG)
 Utilise le nouveau SDK Pinecone (v3+) - anciennement pinecone-client
+
+Le SDK est synchrone: chaque appel réseau s'exécute dans un pool de threads
+dédié et borné (PINECONE_MAX_WORKERS), avec un timeout par appel, pour ne
+jamais bloquer la boucle d'événements. Le client et l'index (pool HTTP
+persistant) sont partagés par toutes les instances du processus.
 """
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pinecone import Pinecone
 import structlog
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Callable
 
 from app.core.config import settings
+from app.database.vector_store import VectorStore
+from app.services.chunk_store import get_chunk_store
+from app.services.embedding_service import get_embedding_service
 
 logger = structlog.get_logger()
 
+# Ressources partagées par toutes les instances de PineconeClient
+_shared_client: Optional[Pinecone] = None
+_shared_indexes: Dict[str, Any] = {}
+_shared_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Retourne le pool de threads dédié aux appels Pinecone"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PINECONE_MAX_WORKERS,
+            thread_name_prefix="pinecone"
+        )
+    return _executor
+
+
+def shutdown_pinecone_executor():
+    """Arrête le pool de threads Pinecone (à l'arrêt de l'application)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
 
-class PineconeClient:
+
+class PineconeClient(VectorStore):
     """Client Pinecone pour la recherche vectorielle"""
     
+    # Vecteurs par requête d'upsert (limite Pinecone) et requêtes simultanées
+    UPSERT_BATCH_SIZE = 100
+    UPSERT_CONCURRENCY = 4
+    
     def __init__(self):
         self.api_key = settings.PINECONE_API_KEY
         self.index_name = settings.PINECONE_INDEX_NAME
         # Note: PINECONE_ENVIRONMENT n'est plus nécessaire avec le nouveau SDK
-        self.pc: Pinecone = None
-        self.index = None
+        self.timeout = settings.PINECONE_TIMEOUT_SECONDS
+        self.upsert_timeout = settings.PINECONE_UPSERT_TIMEOUT_SECONDS
     
     def _get_client(self) -> Pinecone:
-        """Retourne le client Pinecone (singleton)"""
-        if not self.pc:
-            self.pc = Pinecone(api_key=self.api_key)
-        return self.pc
+        """Retourne le client Pinecone (singleton partagé)"""
+        global _shared_client
+        with _shared_lock:
+            if _shared_client is None:
+                _shared_client = Pinecone(api_key=self.api_key)
+            return _shared_client
     
     def _get_index(self):
-        """Retourne l'index Pinecone"""
-        if not self.index:
+        """Retourne l'index Pinecone (appel bloquant au premier accès: résolution de l'hôte)"""
+        index = _shared_indexes.get(self.index_name)
+        if index is None:
             pc = self._get_client()
-            self.index = pc.Index(self.index_name)
-        return self.index
+            with _shared_lock:
+                index = _shared_indexes.get(self.index_name)
+                if index is None:
+                    index = pc.Index(self.index_name)
+                    _shared_indexes[self.index_name] = index
+        return index
+    
+    async def _run(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs):
+        """
+        Exécute un appel bloquant du SDK dans le pool dédié, avec timeout
+        
+        Raises:
+            asyncio.TimeoutError: si l'appel dépasse le timeout (le thread
+            termine en arrière-plan, son résultat est ignoré)
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(_get_executor(), functools.partial(func, *args, **kwargs))
+        return await asyncio.wait_for(future, timeout=timeout or self.timeout)
+    
+    async def get_index(self):
+        """Retourne l'index Pinecone sans bloquer la boucle d'événements"""
+        index = _shared_indexes.get(self.index_name)
+        if index is None:
+            index = await self._run(self._get_index)
+        return index
+    
+    async def describe_index_stats(self) -> Dict[str, Any]:
+        """Retourne les statistiques de l'index"""
+        index = await self.get_index()
+        return await self._run(index.describe_index_stats)
     
     async def search(
         self,
         query: str,
         top_k: int = 3,
-        namespace: str = None
+        namespace: str = None,
+        query_embedding: Optional[List[float]] = None,
+        metadata_filter: Optional[Dict[str, List[str]]] = None
     ) -> List[Dict[str, Any]]:
         """
         Recherche vectorielle dans Pinecone
@@ -47,32 +121,29 @@ class PineconeClient:
             query: Requête de recherche
             top_k: Nombre de résultats à retourner
             namespace: Namespace Pinecone (optionnel)
+            query_embedding: Embedding déjà calculé de la requête (optionnel)
+            metadata_filter: Valeurs admises par champ de métadonnées (optionnel)
             
         Returns:
             Liste des documents pertinents
         """
         try:
-            # Pour la recherche vectorielle, on aurait besoin d'un modèle d'embedding
-            # Ici, on simule une recherche basique
-            # En production, utiliser un modèle comme OpenAI embeddings ou sentence-transformers
-            
-            from langchain_openai import OpenAIEmbeddings
-            
-            embeddings = OpenAIEmbeddings(
-                model="text-embedding-3-small",
-                openai_api_key=settings.OPENAI_API_KEY
-            )
-            
-            # Génération de l'embedding de la requête
-            query_embedding = await embeddings.aembed_query(query)
+            # Embedding de la requête (mis en cache par le service partagé)
+            if query_embedding is None:
+                query_embedding = await get_embedding_service().embed_query(query)
             
             # Recherche dans Pinecone
-            index = self._get_index()
-            results = index.query(
+            index = await self.get_index()
+            results = await self._run(
+                index.query,
                 vector=query_embedding,
                 top_k=top_k,
                 include_metadata=True,
-                namespace=namespace
+                namespace=namespace,
+                filter={
+                    field: {"$in": list(values)}
+                    for field, values in metadata_filter.items()
+                } if metadata_filter else None
             )
             
             # Formatage des résultats
@@ -93,6 +164,13 @@ class PineconeClient:
             
             return documents
             
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Pinecone search timeout",
+                query_preview=query[:50],
+                timeout=self.timeout
+            )
+            return []
         except Exception as e:
             logger.error(
                 "Pinecone search error",
@@ -109,40 +187,42 @@ class PineconeClient:
         """
         Ajoute ou met à jour des documents dans Pinecone
         
+        Embeddings par batch (concurrence bornée, reprises) et upserts en
+        parallèle. Le texte est écrit dans le chunk store, pas dans les
+        métadonnées des vecteurs (même stockage que kb_indexer).
+        
         Args:
             documents: Liste de documents avec id, text, metadata
             namespace: Namespace Pinecone (optionnel)
         """
+        if not documents:
+            return
         try:
-            from langchain_openai import OpenAIEmbeddings
+            embedding_service = get_embedding_service()
             
-            embeddings = OpenAIEmbeddings(
-                model="text-embedding-3-small",
-                openai_api_key=settings.OPENAI_API_KEY
-            )
+            # Textes écrits avant les vecteurs: un résultat de recherche a toujours son texte
+            await get_chunk_store().set_many({doc["id"]: doc["text"] for doc in documents}, namespace)
             
-            # Génération des embeddings
-            texts = [doc["text"] for doc in documents]
-            vectors = await embeddings.aembed_documents(texts)
-            
-            # Préparation des vecteurs pour Pinecone
-            vectors_to_upsert = []
-            for i, doc in enumerate(documents):
-                vectors_to_upsert.append({
-                    "id": doc["id"],
-                    "values": vectors[i],
-                    "metadata": {
-                        "text": doc["text"],
-                        **doc.get("metadata", {})
-                    }
-                })
+            # Pipeline: chaque batch est upserté dès que ses embeddings sont prêts
+            async def embed_and_upsert(batch: List[Dict[str, Any]]):
+                vectors = await embedding_service.embed_documents([doc["text"] for doc in batch])
+                await self.upsert_vectors(
+                    [
+                        {
+                            "id": doc["id"],
+                            "values": vectors[i],
+                            "metadata": doc.get("metadata", {})
+                        }
+                        for i, doc in enumerate(batch)
+                    ],
+                    namespace=namespace
+                )
             
-            # Upsert dans Pinecone
-            index = self._get_index()
-            index.upsert(
-                vectors=vectors_to_upsert,
-                namespace=namespace
-            )
+            batch_size = embedding_service.BATCH_SIZE
+            await asyncio.gather(*[
+                embed_and_upsert(documents[i:i + batch_size])
+                for i in range(0, len(documents), batch_size)
+            ])
             
             logger.info(
                 "Documents upserted to Pinecone",
@@ -155,4 +235,66 @@ class PineconeClient:
                 error=str(e),
                 exc_info=True
             )
+    
+    async def upsert_vectors(
+        self,
+        vectors: List[Dict[str, Any]],
+        namespace: str = None
+    ):
+        """
+        Ajoute ou met à jour des vecteurs déjà calculés
+        
+        Batchs de UPSERT_BATCH_SIZE (limite Pinecone), envoyés en parallèle
+        (au plus UPSERT_CONCURRENCY à la fois)
+        
+        Args:
+            vectors: Liste de {"id", "values", "metadata"}
+            namespace: Namespace Pinecone (optionnel)
+        """
+        if not vectors:
+            return
+        index = await self.get_index()
+        semaphore = asyncio.Semaphore(self.UPSERT_CONCURRENCY)
+
+        async def upsert_batch(batch: List[Dict[str, Any]]):
+            async with semaphore:
+                await self._run(
+                    index.upsert,
+                    vectors=batch,
+                    namespace=namespace,
+                    timeout=self.upsert_timeout
+                )
 
+        batches = [
+            vectors[i:i + self.UPSERT_BATCH_SIZE]
+            for i in range(0, len(vectors), self.UPSERT_BATCH_SIZE)
+        ]
+        await asyncio.gather(*[upsert_batch(batch) for batch in batches])
+        logger.info(f"Upserted {len(vectors)} vectors in {len(batches)} batches")
+    
+    async def delete_vectors(self, ids: List[str], namespace: str = None):
+        """Supprime des vecteurs par ID (par batch de 1000, limite Pinecone)"""
+        if not ids:
+            return
+        index = await self.get_index()
+        batch_size = 1000
+        await asyncio.gather(*[
+            self._run(
+                index.delete,
+                ids=ids[i:i + batch_size],
+                namespace=namespace,
+                timeout=self.upsert_timeout
+            )
+            for i in range(0, len(ids), batch_size)
+        ])
+    
+    async def delete_namespace(self, namespace: str):
+        """Supprime tous les vecteurs d'un namespace"""
+        index = await self.get_index()
+        await self._run(
+            index.delete,
+            delete_all=True,
+            namespace=namespace,
+            timeout=self.upsert_timeout
+        )
+        logger.info("Pinecone namespace deleted", namespace=namespace)
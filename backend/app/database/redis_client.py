@@ -191,3 +191,22 @@ class RedisClient:
             logger.error("Error getting session data", error=str(e))
             return None
 
+
+
+# Client partagé par les services (un seul pool de connexions par processus)
+_shared_redis: Optional[RedisClient] = None
+
+
+async def get_redis() -> redis.Redis:
+    """
+    Retourne le client Redis partagé (connexion à la demande)
+    
+    Raises:
+        Exception: Si la connexion échoue (l'appelant décide du repli)
+    """
+    global _shared_redis
+    if _shared_redis is None:
+        _shared_redis = RedisClient()
+    if not _shared_redis.client:
+        await _shared_redis.connect()
+    return _shared_redis.client
@@ -7,6 +7,7 @@ from typing import Dict, Any, Optional
 from datetime import datetime
 
 from app.core.config import settings
+from app.services.interaction_archive import InteractionArchiveService
 
 logger = structlog.get_logger()
 
@@ -18,6 +19,7 @@ class SupabaseClient:
         self.supabase: Optional[Client] = None
         self.url = settings.SUPABASE_URL
         self.key = settings.SUPABASE_KEY
+        self.archive = InteractionArchiveService()
     
     def _get_client(self) -> Client:
         """Retourne le client Supabase (singleton)"""
@@ -219,7 +221,7 @@ class SupabaseClient:
             
             # Vérifier que la conversation appartient à l'utilisateur
             conv_check = client.table("conversations")\
-                .select("id")\
+                .select("id, created_at")\
                 .eq("session_id", session_id)\
                 .eq("user_id", user_id)\
                 .execute()
@@ -232,15 +234,23 @@ class SupabaseClient:
                 )
                 return []
             
+            # Les messages des partitions archivées sont relus depuis Supabase Storage
+            archived_messages = []
+            if self.archive.may_have_archives(conv_check.data[0].get("created_at")):
+                archived_messages = await self.archive.get_archived_messages(session_id, user_id)
+            
+            if len(archived_messages) >= limit:
+                return archived_messages[:limit]
+            
             result = client.table("interactions")\
                 .select("*")\
                 .eq("session_id", session_id)\
                 .eq("user_id", user_id)\
                 .order("created_at", desc=False)\
-                .limit(limit)\
+                .limit(limit - len(archived_messages))\
                 .execute()
             
-            return result.data or []
+            return archived_messages + (result.data or [])
             
         except Exception as e:
             logger.error(
@@ -674,3 +684,53 @@ class SupabaseClient:
             )
             return None
 
+    
+    async def get_feedback_stats_daily(self, days: int = 30) -> list:
+        """
+        Récupère les statistiques des feedbacks jour par jour (admin uniquement)
+        Lit les compteurs pré-agrégés de feedback_stats_daily
+        
+        Args:
+            days: Nombre de jours à remonter
+            
+        Returns:
+            Liste des statistiques par jour (plus anciennes en premier)
+        """
+        try:
+            client = self._get_client()
+            
+            result = client.rpc("get_feedback_stats_daily", {"days": days}).execute()
+            
+            return result.data or []
+            
+        except Exception as e:
+            logger.error(
+                "Error getting daily feedback stats",
+                error=str(e)
+            )
+            return []
+    
+    async def get_agent_stats(self, days: int = 7) -> list:
+        """
+        Récupère les statistiques d'utilisation des agents (admin uniquement)
+        Lit les compteurs pré-agrégés de agent_stats_daily
+        
+        Args:
+            days: Nombre de jours à remonter
+            
+        Returns:
+            Liste {agent_used, count, avg_response_length} triée par volume
+        """
+        try:
+            client = self._get_client()
+            
+            result = client.rpc("get_agent_stats", {"days": days}).execute()
+            
+            return result.data or []
+            
+        except Exception as e:
+            logger.error(
+                "Error getting agent stats",
+                error=str(e)
+            )
+            return []
@@ -0,0 +1,103 @@
+"""
+Interface commune des moteurs de recherche vectorielle
+
+Trois implémentations:
+- "pinecone": PineconeClient (index distant)
+- "local": LocalVectorIndex (matrice NumPy en mémoire, persistée sur disque)
+- "pgvector": PgVectorStore (Postgres Supabase; chunks et procédure en une RPC)
+
+Le moteur est choisi par VECTOR_BACKEND. Tous sont alimentés par les
+mêmes vecteurs (scripts/load_knowledge_base.py) et renvoient des résultats
+de même forme: {"id", "score", "text", "metadata"}.
+
+Filtre de métadonnées (metadata_filter): {champ: [valeurs admises]}, par
+exemple {"category": ["network_wifi"]}; un document est retenu si chaque
+champ a l'une des valeurs admises. Le filtre est appliqué par le moteur
+(avant la sélection du top_k).
+"""
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional
+
+from app.core.config import settings
+
+# Moteurs disponibles pour VECTOR_BACKEND
+VECTOR_BACKENDS = ("pinecone", "local", "pgvector")
+
+
+class VectorStore(ABC):
+    """Interface d'un moteur de recherche vectorielle"""
+
+    @abstractmethod
+    async def search(
+        self,
+        query: str,
+        top_k: int = 3,
+        namespace: str = None,
+        query_embedding: Optional[List[float]] = None,
+        metadata_filter: Optional[Dict[str, List[str]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Recherche les documents les plus proches d'une requête
+
+        Args:
+            query: Requête de recherche
+            top_k: Nombre de résultats à retourner
+            namespace: Namespace (optionnel)
+            query_embedding: Embedding déjà calculé de la requête (optionnel)
+            metadata_filter: Valeurs admises par champ de métadonnées (optionnel)
+
+        Returns:
+            Liste des documents pertinents, du plus au moins similaire
+        """
+
+    @abstractmethod
+    async def upsert_vectors(
+        self,
+        vectors: List[Dict[str, Any]],
+        namespace: str = None
+    ):
+        """
+        Ajoute ou remplace des vecteurs déjà calculés
+
+        Args:
+            vectors: Liste de {"id", "values", "metadata"} (le texte des chunks de
+                la base de connaissances est dans le chunk store, pas dans metadata)
+            namespace: Namespace (optionnel)
+        """
+
+    @abstractmethod
+    async def delete_vectors(self, ids: List[str], namespace: str = None):
+        """Supprime des vecteurs par ID"""
+
+    @abstractmethod
+    async def delete_namespace(self, namespace: str):
+        """Supprime tous les vecteurs d'un namespace"""
+
+
+def matches_filter(metadata: Dict[str, Any], metadata_filter: Optional[Dict[str, List[str]]]) -> bool:
+    """Le document satisfait-il le filtre de métadonnées ?"""
+    if not metadata_filter:
+        return True
+    return all(metadata.get(field) in values for field, values in metadata_filter.items())
+
+
+_vector_store: Optional[VectorStore] = None
+
+
+def get_vector_store() -> VectorStore:
+    """Retourne le moteur vectoriel configuré (instance partagée)"""
+    global _vector_store
+    if _vector_store is None:
+        backend = settings.VECTOR_BACKEND
+        if backend == "local":
+            from app.database.local_vector_index import LocalVectorIndex
+            _vector_store = LocalVectorIndex()
+        elif backend == "pinecone":
+            from app.database.pinecone_client import PineconeClient
+            _vector_store = PineconeClient()
+        elif backend == "pgvector":
+            from app.database.pgvector_store import PgVectorStore
+            _vector_store = PgVectorStore()
+        else:
+            raise ValueError(f"Unknown VECTOR_BACKEND '{backend}', expected one of {VECTOR_BACKENDS}")
+    return _vector_store
@@ -0,0 +1,310 @@
+"""
+Jobs d'administration en arrière-plan (réindexation, pipeline procédural)
+
+Une opération longue n'est plus exécutée dans la requête HTTP: l'endpoint
+démarre un job et renvoie immédiatement son identifiant.
+
+- État du job dans Redis (admin_job:{job_id}), consultable par l'endpoint
+  de statut depuis n'importe quel worker
+- Événements de progression publiés sur le canal admin_job_events:{job_id}
+  (relayés à l'interface d'administration par WebSocket)
+- Verrou par ressource (admin_job_lock:{resource}): deux jobs sur la même
+  ressource ne peuvent pas tourner en même temps; les opérations courtes
+  sur la ressource (hold) attendent la fin du job en cours
+"""
+import asyncio
+import json
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Dict, Any, Optional, Callable, Awaitable, AsyncIterator, Set
+
+import structlog
+
+from app.database.redis_client import get_redis
+
+logger = structlog.get_logger()
+
+# Statuts d'un job
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+FINISHED_STATUSES = (JOB_COMPLETED, JOB_FAILED)
+
+# Opérations sur le verrou réservées à son propriétaire (lecture et écriture
+# atomiques: le verrou a pu expirer et être pris par un autre entre-temps)
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+REFRESH_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class JobAlreadyRunningError(Exception):
+    """Un job utilise déjà la ressource demandée"""
+
+    def __init__(self, resource: str, job_id: Optional[str]):
+        super().__init__(f"A job is already running on '{resource}'")
+        self.resource = resource
+        self.job_id = job_id
+
+
+class AdminJobManager:
+    """Démarre les jobs, suit leur état et diffuse leur progression"""
+
+    KEY_PREFIX = "admin_job"
+    LOCK_PREFIX = "admin_job_lock"
+    CHANNEL_PREFIX = "admin_job_events"
+    # Conservation de l'état d'un job terminé
+    JOB_TTL = 60 * 60 * 24 * 7  # 7 jours
+    # Durée du verrou, prolongée tant que le job tourne
+    # (un worker arrêté en plein job ne bloque pas la ressource indéfiniment)
+    LOCK_TTL = 60 * 5
+    # Sans événement pendant ce délai, watch() relit l'état du job
+    WATCH_POLL_SECONDS = 15.0
+    # hold(): intervalle de vérification du verrou et attente maximale
+    HOLD_POLL_SECONDS = 2.0
+    HOLD_MAX_WAIT_SECONDS = 60 * 30
+
+    def __init__(self):
+        # Références des tâches en cours (évite leur collecte par le GC)
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _job_key(self, job_id: str) -> str:
+        """Clé Redis de l'état d'un job"""
+        return f"{self.KEY_PREFIX}:{job_id}"
+
+    def _lock_key(self, resource: str) -> str:
+        """Clé Redis du verrou d'une ressource"""
+        return f"{self.LOCK_PREFIX}:{resource}"
+
+    def _channel(self, job_id: str) -> str:
+        """Canal Redis des événements d'un job"""
+        return f"{self.CHANNEL_PREFIX}:{job_id}"
+
+    async def _save(self, job: Dict[str, Any]):
+        """Enregistre l'état d'un job"""
+        client = await get_redis()
+        await client.setex(self._job_key(job["id"]), self.JOB_TTL, json.dumps(job, default=str))
+
+    async def _publish(self, job: Dict[str, Any]):
+        """Enregistre l'état d'un job et le diffuse aux abonnés"""
+        await self._save(job)
+        client = await get_redis()
+        await client.publish(self._channel(job["id"]), json.dumps(job, default=str))
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Retourne l'état d'un job (None s'il est inconnu ou expiré)"""
+        client = await get_redis()
+        value = await client.get(self._job_key(job_id))
+        return json.loads(value) if value else None
+
+    async def start(
+        self,
+        kind: str,
+        resource: str,
+        func: Callable[..., Awaitable[Any]],
+        params: Optional[Dict[str, Any]] = None,
+        user: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Démarre un job en arrière-plan
+
+        Args:
+            kind: Type de job ("reindex", "pipeline", ...)
+            resource: Ressource verrouillée pendant le job
+            func: Coroutine exécutée: await func(progress, **params), où
+                progress(stage, **compteurs) publie un événement
+            params: Paramètres passés à func (et conservés dans l'état du job)
+            user: Utilisateur ayant lancé le job
+
+        Returns:
+            État initial du job
+
+        Raises:
+            JobAlreadyRunningError: Si un job utilise déjà la ressource
+        """
+        params = params or {}
+        job_id = uuid.uuid4().hex
+        client = await get_redis()
+
+        acquired = await client.set(self._lock_key(resource), job_id, nx=True, ex=self.LOCK_TTL)
+        if not acquired:
+            raise JobAlreadyRunningError(resource, await client.get(self._lock_key(resource)))
+
+        job = {
+            "id": job_id,
+            "kind": kind,
+            "resource": resource,
+            "params": params,
+            "status": JOB_QUEUED,
+            "stage": None,
+            "progress": {},
+            "result": None,
+            "error": None,
+            "user": user,
+            "created_at": datetime.utcnow().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+        }
+        try:
+            await self._save(job)
+        except Exception:
+            await self._release(resource, job_id)
+            raise
+
+        task = asyncio.create_task(self._run(job, func))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        logger.info("Admin job started", job_id=job_id, kind=kind, user=user)
+        return job
+
+    async def _release(self, resource: str, owner: str):
+        """Libère le verrou s'il appartient encore à owner (job ou hold)"""
+        client = await get_redis()
+        await client.eval(RELEASE_LOCK_SCRIPT, 1, self._lock_key(resource), owner)
+
+    async def _heartbeat(self, resource: str, owner: str):
+        """Prolonge le verrou tant que son propriétaire le détient (tâche à annuler)"""
+        while True:
+            await asyncio.sleep(self.LOCK_TTL / 3)
+            try:
+                client = await get_redis()
+                refreshed = await client.eval(
+                    REFRESH_LOCK_SCRIPT, 1, self._lock_key(resource), owner, self.LOCK_TTL
+                )
+                if not refreshed:
+                    logger.warning("Admin job lock lost", resource=resource, owner=owner)
+                    return
+            except Exception as e:
+                logger.warning("Admin job lock not refreshed", resource=resource, owner=owner, error=str(e))
+
+    @asynccontextmanager
+    async def hold(self, resource: str):
+        """
+        Verrouille une ressource le temps d'une opération courte
+
+        Attend la fin du job en cours sur la ressource (au plus
+        HOLD_MAX_WAIT_SECONDS); un job démarré pendant l'opération est refusé
+        (JobAlreadyRunningError). Sans Redis, l'opération s'exécute sans verrou.
+        """
+        owner = f"hold:{uuid.uuid4().hex}"
+        acquired = False
+        try:
+            client = await get_redis()
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.HOLD_MAX_WAIT_SECONDS
+            while True:
+                acquired = bool(await client.set(self._lock_key(resource), owner, nx=True, ex=self.LOCK_TTL))
+                if acquired or loop.time() >= deadline:
+                    break
+                await asyncio.sleep(self.HOLD_POLL_SECONDS)
+            if not acquired:
+                logger.warning("Admin job lock still held, proceeding without it", resource=resource)
+        except Exception as e:
+            logger.warning("Admin job lock unavailable, proceeding without it", resource=resource, error=str(e))
+
+        heartbeat_task = asyncio.create_task(self._heartbeat(resource, owner)) if acquired else None
+        try:
+            yield
+        finally:
+            if heartbeat_task:
+                heartbeat_task.cancel()
+            if acquired:
+                try:
+                    await self._release(resource, owner)
+                except Exception as e:
+                    logger.warning("Admin job lock not released", resource=resource, error=str(e))
+
+    async def _run(self, job: Dict[str, Any], func: Callable[..., Awaitable[Any]]):
+        """Exécute un job et publie ses changements d'état"""
+        async def progress(stage: str, **data):
+            job["stage"] = stage
+            job["progress"].update(data)
+            try:
+                await self._publish(job)
+            except Exception as e:
+                logger.warning("Admin job progress not published", job_id=job["id"], error=str(e))
+
+        # Prolonge le verrou tant que le job tourne
+        heartbeat_task = asyncio.create_task(self._heartbeat(job["resource"], job["id"]))
+        try:
+            job["status"] = JOB_RUNNING
+            job["started_at"] = datetime.utcnow().isoformat()
+            await self._publish(job)
+
+            job["result"] = await func(progress, **job["params"])
+            job["status"] = JOB_COMPLETED
+            logger.info("Admin job completed", job_id=job["id"], kind=job["kind"])
+        except Exception as e:
+            job["status"] = JOB_FAILED
+            job["error"] = str(e)
+            logger.error("Admin job failed", job_id=job["id"], kind=job["kind"], error=str(e), exc_info=True)
+        finally:
+            heartbeat_task.cancel()
+            job["finished_at"] = datetime.utcnow().isoformat()
+            try:
+                await self._publish(job)
+                await self._release(job["resource"], job["id"])
+            except Exception as e:
+                logger.error("Admin job state not saved", job_id=job["id"], error=str(e))
+
+    async def watch(self, job_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Suit un job: état courant puis chaque événement jusqu'à la fin
+
+        Yields:
+            États successifs du job (le dernier a un statut terminal)
+        """
+        client = await get_redis()
+        pubsub = client.pubsub()
+        await pubsub.subscribe(self._channel(job_id))
+        try:
+            # Abonnement avant la lecture de l'état: aucun événement n'est perdu
+            job = await self.get(job_id)
+            if job is None:
+                return
+            yield job
+            if job["status"] in FINISHED_STATUSES:
+                return
+
+            while True:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=self.WATCH_POLL_SECONDS
+                )
+                if message is None:
+                    # Pas d'événement: relecture de l'état (worker arrêté, événement manqué)
+                    job = await self.get(job_id)
+                    if job is None:
+                        return
+                    if job["status"] in FINISHED_STATUSES:
+                        yield job
+                        return
+                    continue
+                job = json.loads(message["data"])
+                yield job
+                if job["status"] in FINISHED_STATUSES:
+                    return
+        finally:
+            await pubsub.unsubscribe(self._channel(job_id))
+            await pubsub.close()
+
+
+_job_manager: Optional[AdminJobManager] = None
+
+
+def get_job_manager() -> AdminJobManager:
+    """Retourne le gestionnaire de jobs partagé"""
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = AdminJobManager()
+    return _job_manager
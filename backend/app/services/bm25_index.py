@@ -0,0 +1,84 @@
+"""
+Index inversé BM25 en mémoire
+
+Index lexical des chunks de la base de connaissances: les requêtes qui
+reposent sur des termes exacts ("licence OpenAI", "timesheet Skeelz") sont
+retrouvées même quand la recherche vectorielle les classe mal.
+"""
+import math
+from collections import Counter, defaultdict
+from typing import List, Dict, Any, Set, Tuple
+
+from app.services.french_analyzer import analyze
+
+
+class BM25Index:
+    """Index inversé avec score BM25 (Okapi)"""
+
+    def __init__(self, documents: List[Dict[str, Any]], k1: float = 1.2, b: float = 0.75):
+        """
+        Args:
+            documents: Liste de {"id", "text", "metadata"}
+            k1: Saturation de la fréquence des termes
+            b: Normalisation par la longueur du document
+        """
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        # terme -> [(index du document, fréquence du terme)]
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.doc_lengths: List[int] = []
+
+        for doc_index, document in enumerate(documents):
+            terms = analyze(document.get("text", ""))
+            self.doc_lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                self.postings[term].append((doc_index, frequency))
+
+        self.avg_doc_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+        doc_count = len(documents)
+        self.idf = {
+            term: math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def search(self, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Recherche BM25
+
+        Args:
+            query: Requête brute (analysée avec le même analyseur que les documents)
+            top_k: Nombre de résultats
+
+        Returns:
+            Documents triés par score décroissant, avec "score" (BM25) et
+            "matched_terms" (nombre de termes distincts de la requête trouvés)
+        """
+        query_terms: Set[str] = set(analyze(query))
+        if not query_terms or not self.documents:
+            return []
+
+        scores: Dict[int, float] = defaultdict(float)
+        matched: Dict[int, int] = defaultdict(int)
+        for term in query_terms:
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_index, frequency in self.postings[term]:
+                length_norm = 1 - self.b + self.b * self.doc_lengths[doc_index] / (self.avg_doc_length or 1)
+                scores[doc_index] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+                matched[doc_index] += 1
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [
+            {
+                **self.documents[doc_index],
+                "score": score,
+                "matched_terms": matched[doc_index],
+                "query_terms": len(query_terms),
+            }
+            for doc_index, score in ranked
+        ]
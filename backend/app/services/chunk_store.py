@@ -0,0 +1,196 @@
+"""
+Stockage du texte des chunks de la base de connaissances
+
+Les moteurs vectoriels ne stockent que l'ID et des métadonnées légères de
+chaque chunk: le texte n'est plus renvoyé avec chaque résultat Pinecone (ni
+limité par la taille maximale des métadonnées). La recherche lit le texte
+des seuls résultats retenus, en une requête, par ID.
+
+Deux implémentations:
+- SQLite (développement): un fichier local
+- Redis (production): partagé entre les instances, sans expiration
+
+Choix par CHUNK_STORE ("sqlite", "redis"); par défaut Redis en production et
+SQLite ailleurs.
+"""
+import asyncio
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Dict, Optional
+
+import structlog
+
+from app.core.config import settings
+from app.database.redis_client import get_redis
+
+logger = structlog.get_logger()
+
+# Fichier SQLite par défaut (backend/data/chunk_store/chunks.sqlite3)
+DEFAULT_SQLITE_PATH = Path(__file__).parent.parent.parent / "data" / "chunk_store" / "chunks.sqlite3"
+
+CHUNK_STORES = ("sqlite", "redis")
+
+DEFAULT_NAMESPACE = "default"
+
+
+class ChunkStore(ABC):
+    """Texte des chunks, par namespace et ID de chunk"""
+
+    @abstractmethod
+    async def get_many(self, ids: List[str], namespace: str = None) -> Dict[str, str]:
+        """Retourne les textes connus (ID -> texte); les absents sont omis"""
+
+    @abstractmethod
+    async def set_many(self, texts: Dict[str, str], namespace: str = None):
+        """Enregistre des textes (ID -> texte)"""
+
+    @abstractmethod
+    async def delete_many(self, ids: List[str], namespace: str = None):
+        """Supprime des textes par ID"""
+
+    @abstractmethod
+    async def delete_namespace(self, namespace: str):
+        """Supprime tous les textes d'un namespace"""
+
+
+class SQLiteChunkStore(ChunkStore):
+    """Textes dans un fichier SQLite local (appels exécutés dans un thread)"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or settings.CHUNK_STORE_PATH or DEFAULT_SQLITE_PATH)
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Ouvre la base (création du schéma au premier accès)"""
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chunks (
+                    namespace TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    PRIMARY KEY (namespace, chunk_id)
+                )
+                """
+            )
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def _get_many(self, namespace: str, ids: List[str]) -> Dict[str, str]:
+        found = {}
+        with self._lock:
+            connection = self._connect()
+            # Limite SQLite du nombre de paramètres par requête
+            for i in range(0, len(ids), 500):
+                batch = ids[i:i + 500]
+                rows = connection.execute(
+                    f"SELECT chunk_id, text FROM chunks "
+                    f"WHERE namespace = ? AND chunk_id IN ({','.join('?' * len(batch))})",
+                    [namespace, *batch]
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def _set_many(self, namespace: str, texts: Dict[str, str]):
+        with self._lock:
+            connection = self._connect()
+            connection.executemany(
+                "INSERT OR REPLACE INTO chunks (namespace, chunk_id, text) VALUES (?, ?, ?)",
+                [(namespace, chunk_id, text) for chunk_id, text in texts.items()]
+            )
+            connection.commit()
+
+    def _delete_many(self, namespace: str, ids: List[str]):
+        with self._lock:
+            connection = self._connect()
+            connection.executemany(
+                "DELETE FROM chunks WHERE namespace = ? AND chunk_id = ?",
+                [(namespace, chunk_id) for chunk_id in ids]
+            )
+            connection.commit()
+
+    def _delete_namespace(self, namespace: str):
+        with self._lock:
+            connection = self._connect()
+            connection.execute("DELETE FROM chunks WHERE namespace = ?", (namespace,))
+            connection.commit()
+
+    async def get_many(self, ids: List[str], namespace: str = None) -> Dict[str, str]:
+        if not ids:
+            return {}
+        return await asyncio.to_thread(self._get_many, namespace or DEFAULT_NAMESPACE, ids)
+
+    async def set_many(self, texts: Dict[str, str], namespace: str = None):
+        if texts:
+            await asyncio.to_thread(self._set_many, namespace or DEFAULT_NAMESPACE, texts)
+
+    async def delete_many(self, ids: List[str], namespace: str = None):
+        if ids:
+            await asyncio.to_thread(self._delete_many, namespace or DEFAULT_NAMESPACE, ids)
+
+    async def delete_namespace(self, namespace: str):
+        await asyncio.to_thread(self._delete_namespace, namespace or DEFAULT_NAMESPACE)
+
+
+class RedisChunkStore(ChunkStore):
+    """Textes dans Redis, clé kb_chunk:{namespace}:{ID}, sans expiration"""
+
+    KEY_PREFIX = "kb_chunk"
+
+    def _key(self, namespace: Optional[str], chunk_id: str) -> str:
+        """Clé Redis du texte d'un chunk"""
+        return f"{self.KEY_PREFIX}:{namespace or DEFAULT_NAMESPACE}:{chunk_id}"
+
+    async def get_many(self, ids: List[str], namespace: str = None) -> Dict[str, str]:
+        if not ids:
+            return {}
+        client = await get_redis()
+        values = await client.mget([self._key(namespace, chunk_id) for chunk_id in ids])
+        return {chunk_id: value for chunk_id, value in zip(ids, values) if value is not None}
+
+    async def set_many(self, texts: Dict[str, str], namespace: str = None):
+        if not texts:
+            return
+        client = await get_redis()
+        await client.mset({self._key(namespace, chunk_id): text for chunk_id, text in texts.items()})
+
+    async def delete_many(self, ids: List[str], namespace: str = None):
+        if not ids:
+            return
+        client = await get_redis()
+        await client.delete(*[self._key(namespace, chunk_id) for chunk_id in ids])
+
+    async def delete_namespace(self, namespace: str):
+        client = await get_redis()
+        batch = []
+        async for key in client.scan_iter(match=self._key(namespace, "*"), count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                await client.delete(*batch)
+                batch = []
+        if batch:
+            await client.delete(*batch)
+
+
+_chunk_store: Optional[ChunkStore] = None
+
+
+def get_chunk_store() -> ChunkStore:
+    """Retourne le stockage de chunks configuré (instance partagée)"""
+    global _chunk_store
+    if _chunk_store is None:
+        backend = settings.CHUNK_STORE or ("redis" if settings.ENVIRONMENT == "production" else "sqlite")
+        if backend == "sqlite":
+            _chunk_store = SQLiteChunkStore()
+        elif backend == "redis":
+            _chunk_store = RedisChunkStore()
+        else:
+            raise ValueError(f"Unknown CHUNK_STORE '{backend}', expected one of {CHUNK_STORES}")
+    return _chunk_store
@@ -0,0 +1,185 @@
+"""
+Assemblage du contexte des prompts dans un budget de tokens
+
+Les agents injectent dans leurs prompts des extraits de documentation, une
+procédure et l'historique de conversation. Sans limite, un document ou une
+procédure volumineux gonfle chaque requête (latence du premier token et coût).
+
+Le packer:
+- compte les tokens selon le fournisseur (tiktoken pour OpenAI, estimation
+  par caractères pour Anthropic et Gemini)
+- classe les extraits candidats par score
+- tronque le dernier extrait retenu en fin de phrase
+- respecte le budget fixé par l'agent
+"""
+import re
+from functools import lru_cache
+from typing import List, Dict, Any, Optional
+
+import structlog
+
+logger = structlog.get_logger()
+
+# Caractères par token (estimation pour le français) quand le tokenizer exact
+# n'est pas disponible localement
+CHARS_PER_TOKEN = {
+    "anthropic": 3.5,
+    "gemini": 4.0,
+    "openai": 4.0,
+}
+DEFAULT_CHARS_PER_TOKEN = 3.5
+
+# Encodage tiktoken des modèles OpenAI utilisés (gpt-5, gpt-4o)
+OPENAI_ENCODING = "o200k_base"
+
+# Un extrait tronqué plus court que ce nombre de tokens n'est pas inclus
+MIN_SNIPPET_TOKENS = 40
+
+TRUNCATION_MARKER = " […]"
+
+# Fin de phrase ou de ligne (les procédures sont structurées en lignes)
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+@lru_cache(maxsize=1)
+def _openai_encoding():
+    """Encodage tiktoken (None si tiktoken n'est pas installé)"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(OPENAI_ENCODING)
+    except Exception as e:
+        logger.warning("tiktoken unavailable, token counts are estimated", error=str(e))
+        return None
+
+
+def count_tokens(text: str, provider: Optional[str] = None) -> int:
+    """
+    Compte (ou estime) le nombre de tokens d'un texte pour un fournisseur
+
+    Args:
+        text: Texte à mesurer
+        provider: "openai", "anthropic" ou "gemini" (optionnel)
+
+    Returns:
+        Nombre de tokens
+    """
+    if not text:
+        return 0
+    if provider == "openai":
+        encoding = _openai_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+    return max(1, round(len(text) / CHARS_PER_TOKEN.get(provider, DEFAULT_CHARS_PER_TOKEN)))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, provider: Optional[str] = None) -> str:
+    """
+    Tronque un texte en fin de phrase pour tenir dans max_tokens
+
+    Args:
+        text: Texte à tronquer
+        max_tokens: Nombre maximum de tokens (marqueur de troncature inclus)
+        provider: Fournisseur pour le comptage des tokens
+
+    Returns:
+        Texte complet s'il tient dans le budget, sinon les premières phrases
+        suivies d'un marqueur (chaîne vide si aucune phrase ne tient)
+    """
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text, provider) <= max_tokens:
+        return text
+
+    budget = max_tokens - count_tokens(TRUNCATION_MARKER, provider)
+    kept = ""
+    position = 0
+    for match in _SENTENCE_END.finditer(text):
+        candidate = text[:match.start()]
+        if count_tokens(candidate, provider) > budget:
+            break
+        kept = candidate
+        position = match.end()
+    if not kept:
+        return ""
+    if position >= len(text):
+        return kept
+    return kept.rstrip() + TRUNCATION_MARKER
+
+
+def pack_snippets(
+    snippets: List[Dict[str, Any]],
+    max_tokens: int,
+    provider: Optional[str] = None,
+    keep_order: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Sélectionne les extraits les mieux classés dans la limite d'un budget
+
+    Args:
+        snippets: Extraits {"text", "score", ...}; les autres clés sont conservées
+        max_tokens: Budget total de tokens des textes retenus
+        provider: Fournisseur pour le comptage des tokens
+        keep_order: Rend les extraits retenus dans l'ordre d'origine
+            (ex: historique chronologique) plutôt que par score
+
+    Returns:
+        Extraits retenus, "text" éventuellement tronqué, avec "tokens"
+    """
+    ranked = sorted(
+        enumerate(snippets),
+        key=lambda item: item[1].get("score") or 0.0,
+        reverse=True
+    )
+
+    packed = []
+    remaining = max_tokens
+    for position, snippet in ranked:
+        if remaining <= 0:
+            break
+        text = snippet.get("text") or ""
+        tokens = count_tokens(text, provider)
+        if tokens > remaining:
+            if remaining < MIN_SNIPPET_TOKENS:
+                continue
+            text = truncate_to_tokens(text, remaining, provider)
+            if not text:
+                continue
+            tokens = count_tokens(text, provider)
+        packed.append((position, {**snippet, "text": text, "tokens": tokens}))
+        remaining -= tokens
+
+    if keep_order:
+        packed.sort(key=lambda item: item[0])
+    return [snippet for _, snippet in packed]
+
+
+def pack_history(
+    history: List[Dict[str, str]],
+    max_tokens: int,
+    provider: Optional[str] = None,
+    max_turns: int = 5
+) -> str:
+    """
+    Historique de conversation dans un budget (échanges récents prioritaires)
+
+    Args:
+        history: Échanges {"user", "bot"} du plus ancien au plus récent
+        max_tokens: Budget de tokens de l'historique
+        provider: Fournisseur pour le comptage des tokens
+        max_turns: Nombre maximum d'échanges considérés
+
+    Returns:
+        Historique formaté, dans l'ordre chronologique
+    """
+    turns = history[-max_turns:] if max_turns else history
+    snippets = [
+        {
+            "text": f"Utilisateur: {turn.get('user', '')}\nAssistant: {turn.get('bot', '')}",
+            "score": float(index),
+        }
+        for index, turn in enumerate(turns)
+    ]
+    return "\n".join(
+        snippet["text"]
+        for snippet in pack_snippets(snippets, max_tokens, provider, keep_order=True)
+    )
@@ -0,0 +1,169 @@
+"""
+Service d'export des conversations en NDJSON (streaming)
+
+Lit directement Postgres (SUPABASE_DB_URL) avec des curseurs serveur: les
+lignes sont récupérées par lots et envoyées au fur et à mesure, la mémoire
+reste constante quelle que soit la période exportée.
+
+Format (une ligne JSON par enregistrement):
+- {"type": "conversation", ...} pour chaque conversation concernée
+- {"type": "interaction", ...} pour chaque message, par date croissante
+- {"type": "summary", ...} en dernière ligne (absente si l'export a échoué)
+
+Note: seules les interactions encore en base sont exportées. Les partitions
+archivées sont déjà disponibles en NDJSON dans le bucket interactions-archive.
+"""
+import asyncio
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+import psycopg
+from psycopg.rows import dict_row
+import structlog
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+# Plateformes filtrables (les sessions Slack sont préfixées par "slack_")
+EXPORT_PLATFORMS = ("web", "slack")
+
+
+class ConversationExportService:
+    """Service pour exporter conversations et interactions en NDJSON"""
+
+    # Lignes récupérées par aller-retour du curseur serveur
+    FETCH_SIZE = 2000
+    # Lignes regroupées par morceau envoyé au client
+    CHUNK_ROWS = 500
+    # Exports simultanés maximum (une connexion Postgres chacun)
+    MAX_CONCURRENT_EXPORTS = 2
+
+    def __init__(self):
+        self.dsn = settings.SUPABASE_DB_URL
+        self._semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_EXPORTS)
+
+    def is_configured(self) -> bool:
+        """Indique si la connexion Postgres directe est configurée"""
+        return bool(self.dsn)
+
+    def is_busy(self) -> bool:
+        """Indique si le nombre maximum d'exports simultanés est atteint"""
+        return self._semaphore.locked()
+
+    def _build_filters(
+        self,
+        start: datetime,
+        end: datetime,
+        agent_used: Optional[str],
+        platform: Optional[str]
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Construit la clause WHERE commune (sur l'alias i de interactions)
+
+        Le filtre agent_used sélectionne les conversations dans lesquelles
+        l'agent a répondu: tous leurs messages sont exportés, pas seulement
+        ceux du bot.
+        """
+        clauses = ["i.created_at >= %(start)s", "i.created_at < %(end)s"]
+        params: Dict[str, Any] = {"start": start, "end": end}
+
+        if platform == "slack":
+            clauses.append("i.session_id LIKE 'slack\\_%%'")
+        elif platform == "web":
+            clauses.append("i.session_id NOT LIKE 'slack\\_%%'")
+
+        if agent_used:
+            clauses.append(
+                "i.session_id IN ("
+                "SELECT a.session_id FROM interactions a "
+                "WHERE a.created_at >= %(start)s AND a.created_at < %(end)s "
+                "AND a.message_type = 'bot' AND a.agent_used = %(agent_used)s)"
+            )
+            params["agent_used"] = agent_used
+
+        return " AND ".join(clauses), params
+
+    async def stream_ndjson(
+        self,
+        start: datetime,
+        end: datetime,
+        agent_used: Optional[str] = None,
+        platform: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Génère l'export NDJSON par morceaux
+
+        Args:
+            start: Début de la période (inclus, avec fuseau)
+            end: Fin de la période (exclue, avec fuseau)
+            agent_used: Filtre sur l'agent ayant répondu (optionnel)
+            platform: "web" ou "slack" (optionnel)
+        """
+        where, params = self._build_filters(start, end, agent_used, platform)
+
+        queries = [
+            (
+                "conversation",
+                "SELECT c.id, c.session_id, c.user_id, c.title, c.created_at, c.updated_at "
+                "FROM conversations c "
+                f"WHERE EXISTS (SELECT 1 FROM interactions i WHERE i.session_id = c.session_id AND {where}) "
+                "ORDER BY c.created_at"
+            ),
+            (
+                "interaction",
+                "SELECT i.id, i.session_id, i.user_id, i.message_type, i.content, "
+                "i.agent_used, i.metadata, i.created_at "
+                f"FROM interactions i WHERE {where} "
+                "ORDER BY i.created_at"
+            ),
+        ]
+        counts = {"conversation": 0, "interaction": 0}
+
+        async with self._semaphore:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.dsn) as conn:
+                    await conn.set_read_only(True)
+                    for record_type, query in queries:
+                        async with conn.cursor(name=f"export_{record_type}", row_factory=dict_row) as cur:
+                            cur.itersize = self.FETCH_SIZE
+                            await cur.execute(query, params)
+                            lines = []
+                            async for row in cur:
+                                lines.append(json.dumps(
+                                    {"type": record_type, **row},
+                                    ensure_ascii=False,
+                                    default=str
+                                ))
+                                counts[record_type] += 1
+                                if len(lines) >= self.CHUNK_ROWS:
+                                    yield ("\n".join(lines) + "\n").encode("utf-8")
+                                    lines = []
+                            if lines:
+                                yield ("\n".join(lines) + "\n").encode("utf-8")
+
+                yield (json.dumps({
+                    "type": "summary",
+                    "start": start.isoformat(),
+                    "end": end.isoformat(),
+                    "agent_used": agent_used,
+                    "platform": platform,
+                    "conversations": counts["conversation"],
+                    "interactions": counts["interaction"]
+                }) + "\n").encode("utf-8")
+
+                logger.info(
+                    "Conversation export completed",
+                    conversations=counts["conversation"],
+                    interactions=counts["interaction"]
+                )
+
+            except Exception as e:
+                # Les en-têtes sont déjà envoyés: on signale l'échec dans le flux
+                logger.error(
+                    "Error exporting conversations",
+                    error=str(e),
+                    exc_info=True
+                )
+                yield (json.dumps({"type": "error", "error": str(e)}) + "\n").encode("utf-8")
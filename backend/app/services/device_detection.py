@@ -0,0 +1,96 @@
+"""
+Détection des MacBook mentionnés dans une conversation
+
+Les numéros de série et hostnames donnés par l'utilisateur (message courant
+ou historique) sont repérés sans appel LLM, puis résolus dans l'index Jamf
+en mémoire (jamf_index) pour injecter les faits du device dans le prompt:
+enrôlement, comptes administrateurs, comptes FileVault.
+
+Numéros de série Apple (pas de somme de contrôle publique, le format est
+vérifié avant la recherche dans l'inventaire):
+- 12 caractères (ancien format): usine (3), année (1), semaine (1),
+  identifiant (3), modèle (4); l'année et la semaine ont des alphabets
+  fixes, au moins un chiffre
+- 10 caractères (format aléatoire, depuis 2021): sans voyelles
+- jamais de I ni de O, au moins une lettre (écarte les numéros de
+  téléphone); l'absence de voyelles écarte les mots du format aléatoire
+
+Hostnames: jetons avec un chiffre et un tiret ("MBP51-VY"), retenus
+seulement s'ils sont dans l'inventaire. Les noms génériques ("MacBook Pro",
+partagé par des dizaines de devices) ne sont pas recherchés.
+"""
+import re
+from typing import List, Dict, Any, Iterable
+
+SERIAL_ALPHABET = "0123456789ABCDEFGHJKLMNPQRSTUVWXYZ"
+# Ancien format: caractère de l'année (semestre) et de la semaine
+LEGACY_YEAR_CODES = "CDFGHJKLMNPQRSTVWXYZ"
+LEGACY_WEEK_CODES = "123456789CDFGHJKLMNPQRTVWXY"
+RANDOM_SERIAL_EXCLUDED = "AEIOU"
+
+_SERIAL_CANDIDATE = re.compile(r"\b[A-Za-z0-9]{10}(?:[A-Za-z0-9]{2})?\b")
+_HOSTNAME_CANDIDATE = re.compile(r"\b[A-Za-z][A-Za-z0-9]*\d[A-Za-z0-9]*(?:-[A-Za-z0-9]+)+\b")
+
+# Comptes listés au plus dans les faits injectés
+MAX_LISTED_USERS = 8
+
+
+def is_valid_serial(serial: str) -> bool:
+    """Le jeton a-t-il le format d'un numéro de série Apple ?"""
+    serial = serial.upper()
+    if len(serial) not in (10, 12) or any(char not in SERIAL_ALPHABET for char in serial):
+        return False
+    if serial.isdigit():
+        return False
+    if len(serial) == 12:
+        return any(char.isdigit() for char in serial) and serial[3] in LEGACY_YEAR_CODES and serial[4] in LEGACY_WEEK_CODES
+    return not any(char in RANDOM_SERIAL_EXCLUDED for char in serial)
+
+
+def find_serial_numbers(text: str) -> List[str]:
+    """Numéros de série (en majuscules, sans doublon) mentionnés dans un texte"""
+    serials: List[str] = []
+    for match in _SERIAL_CANDIDATE.finditer(text or ""):
+        serial = match.group(0).upper()
+        if is_valid_serial(serial) and serial not in serials:
+            serials.append(serial)
+    return serials
+
+
+def find_hostname_candidates(text: str) -> List[str]:
+    """Jetons pouvant être un hostname (à confirmer dans l'inventaire)"""
+    candidates: List[str] = []
+    for match in _HOSTNAME_CANDIDATE.finditer(text or ""):
+        if match.group(0) not in candidates:
+            candidates.append(match.group(0))
+    return candidates
+
+
+def conversation_texts(message: str, history: Iterable[Dict[str, str]]) -> List[str]:
+    """Messages de l'utilisateur, du plus récent au plus ancien"""
+    return [message] + [turn.get("user", "") for turn in reversed(list(history or []))]
+
+
+def format_device_facts(device: Dict[str, Any], users: List[Dict[str, Any]]) -> str:
+    """Faits d'un device pour le prompt"""
+    if not device.get("is_enrolled"):
+        return (
+            f"- MacBook {device['serial']}: introuvable dans l'inventaire IT "
+            f"(non géré ou numéro erroné, à confirmer avec l'utilisateur)"
+        )
+
+    admins = [user["username"] for user in users if user.get("is_admin")]
+    filevault = [user["username"] for user in users if user.get("is_filevault_user")]
+
+    def listed(names: List[str]) -> str:
+        if not names:
+            return "aucun"
+        more = len(names) - MAX_LISTED_USERS
+        return ", ".join(names[:MAX_LISTED_USERS]) + (f" (+{more})" if more > 0 else "")
+
+    return (
+        f"- MacBook {device['serial']} (hostname {device['hostname']}): géré par l'IT, "
+        f"{device.get('users_count', len(users))} compte(s)\n"
+        f"  Comptes administrateurs: {listed(admins)}\n"
+        f"  Comptes FileVault (peuvent déverrouiller le disque au démarrage): {listed(filevault)}"
+    )
@@ -0,0 +1,237 @@
+"""
+Service d'embeddings partagé
+
+Un seul client OpenAIEmbeddings pour toute l'application, et un cache à deux
+niveaux des embeddings de requêtes:
+- LRU en mémoire (par processus)
+- Redis (partagé entre les workers), clé embedding:{modèle}:{sha256 du texte normalisé}
+
+Les reformulations identiques à la casse ou aux espaces près ne rappellent
+jamais l'API d'embeddings.
+
+Les embeddings de documents passent par le stockage persistant
+(embedding_store): un texte déjà encodé n'est jamais ré-encodé.
+"""
+import asyncio
+import base64
+import hashlib
+import re
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import structlog
+from langchain_openai import OpenAIEmbeddings
+
+from app.core.config import settings
+from app.database.redis_client import get_redis
+from app.services.embedding_store import content_hash, get_embedding_store
+
+logger = structlog.get_logger()
+
+# Modèle d'embedding utilisé pour l'index (1536 dimensions)
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+
+def normalize_text(text: str) -> str:
+    """Normalise un texte pour la clé de cache (Unicode, casse, espaces)"""
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class EmbeddingService:
+    """Service d'embeddings avec cache LRU + Redis des requêtes"""
+
+    KEY_PREFIX = "embedding"
+    CACHE_SIZE = 1024
+    REDIS_TTL = 60 * 60 * 24 * 30  # 30 jours
+    # Embeddings de documents: taille des batchs, requêtes simultanées, reprises
+    BATCH_SIZE = 256
+    MAX_CONCURRENT_BATCHES = 4
+    MAX_ATTEMPTS = 4
+    RETRY_BASE_DELAY = 1.0
+
+    def __init__(self, model: str = EMBEDDING_MODEL):
+        self.model = model
+        self.embeddings = OpenAIEmbeddings(
+            model=model,
+            openai_api_key=settings.OPENAI_API_KEY
+        )
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        # Requêtes en cours: deux appels simultanés pour le même texte partagent l'appel API
+        self._pending: Dict[str, asyncio.Future] = {}
+        # Limite les requêtes d'embeddings de documents simultanées
+        self._batch_semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_BATCHES)
+
+    def cache_key(self, text: str) -> str:
+        """Clé de cache pour un texte (modèle + hash du texte normalisé)"""
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{self.KEY_PREFIX}:{self.model}:{digest}"
+
+    @staticmethod
+    def _encode(vector: List[float]) -> str:
+        """Encode un vecteur en float32 base64 (≈4x plus compact que du JSON)"""
+        return base64.b64encode(array("f", vector).tobytes()).decode("ascii")
+
+    @staticmethod
+    def _decode(value: str) -> List[float]:
+        """Décode un vecteur encodé par _encode"""
+        vector = array("f")
+        vector.frombytes(base64.b64decode(value))
+        return vector.tolist()
+
+    def _remember(self, key: str, vector: List[float]):
+        """Ajoute un vecteur au cache LRU en mémoire"""
+        self._cache[key] = vector
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    async def _get_from_redis(self, key: str) -> Optional[List[float]]:
+        """Lit un vecteur dans Redis (None si absent ou Redis indisponible)"""
+        try:
+            client = await get_redis()
+            value = await client.get(key)
+            return self._decode(value) if value else None
+        except Exception as e:
+            logger.warning("Embedding cache read error", error=str(e))
+            return None
+
+    async def _set_in_redis(self, key: str, vector: List[float]):
+        """Écrit un vecteur dans Redis (best effort)"""
+        try:
+            client = await get_redis()
+            await client.setex(key, self.REDIS_TTL, self._encode(vector))
+        except Exception as e:
+            logger.warning("Embedding cache write error", error=str(e))
+
+    async def embed_query(self, text: str) -> List[float]:
+        """
+        Retourne l'embedding d'une requête (LRU, puis Redis, puis API)
+
+        Args:
+            text: Texte de la requête
+
+        Returns:
+            Vecteur d'embedding
+        """
+        key = self.cache_key(text)
+
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # Appel initial annulé (déconnexion, timeout): calcul repris ici
+                return await self.embed_query(text)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            vector = await self._get_from_redis(key)
+            if vector is None:
+                vector = await self.embeddings.aembed_query(text)
+                await self._set_in_redis(key, vector)
+                logger.debug("Query embedding computed", model=self.model)
+            self._remember(key, vector)
+            future.set_result(vector)
+            return vector
+        except Exception as e:
+            future.set_exception(e)
+            # Évite un "exception never retrieved" si personne n'attendait
+            future.exception()
+            raise
+        finally:
+            # Annulation (CancelledError n'est pas une Exception): les appels en
+            # attente sont libérés au lieu d'attendre indéfiniment
+            if not future.done():
+                future.cancel()
+            del self._pending[key]
+
+    async def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embeddings d'un batch, avec reprise et backoff exponentiel"""
+        async with self._batch_semaphore:
+            for attempt in range(1, self.MAX_ATTEMPTS + 1):
+                try:
+                    return await self.embeddings.aembed_documents(texts)
+                except Exception as e:
+                    if attempt == self.MAX_ATTEMPTS:
+                        raise
+                    delay = self.RETRY_BASE_DELAY * 2 ** (attempt - 1)
+                    logger.warning(
+                        "Embedding batch failed, retrying",
+                        attempt=attempt,
+                        batch_size=len(texts),
+                        retry_in=delay,
+                        error=str(e)
+                    )
+                    await asyncio.sleep(delay)
+
+    async def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Calcule les embeddings d'une liste de documents
+
+        Les vecteurs déjà connus du stockage persistant (embedding_store) sont
+        réutilisés; les autres textes (dédoublonnés) sont envoyés par batch de
+        BATCH_SIZE, au plus MAX_CONCURRENT_BATCHES requêtes simultanées (tous
+        appels confondus), puis enregistrés.
+
+        Args:
+            texts: Textes à encoder
+
+        Returns:
+            Vecteurs, dans l'ordre des textes
+        """
+        if not texts:
+            return []
+
+        hashes = [content_hash(text) for text in texts]
+        unique_texts = dict(zip(hashes, texts))
+        store = get_embedding_store()
+
+        vectors: Dict[str, List[float]] = {}
+        if store is not None:
+            try:
+                vectors = await store.get_many(self.model, list(unique_texts))
+            except Exception as e:
+                logger.warning("Embedding store read error", error=str(e))
+
+        missing = [digest for digest in unique_texts if digest not in vectors]
+        if missing:
+            batches = await asyncio.gather(*[
+                self._embed_batch([unique_texts[digest] for digest in missing[i:i + self.BATCH_SIZE]])
+                for i in range(0, len(missing), self.BATCH_SIZE)
+            ])
+            computed = dict(zip(missing, [vector for batch in batches for vector in batch]))
+            vectors.update(computed)
+            if store is not None:
+                try:
+                    await store.set_many(self.model, computed)
+                except Exception as e:
+                    logger.warning("Embedding store write error", error=str(e))
+
+        logger.debug(
+            "Document embeddings computed",
+            model=self.model,
+            count=len(texts),
+            reused=len(unique_texts) - len(missing),
+            computed=len(missing)
+        )
+        return [vectors[digest] for digest in hashes]
+
+_embedding_service: Optional[EmbeddingService] = None
+
+
+def get_embedding_service() -> EmbeddingService:
+    """Retourne l'instance partagée du service d'embeddings"""
+    global _embedding_service
+    if _embedding_service is None:
+        _embedding_service = EmbeddingService()
+    return _embedding_service
@@ -0,0 +1,177 @@
+"""
+Stockage persistant des embeddings de documents
+
+Les embeddings sont indexés par (modèle, sha256 du texte): un texte déjà
+encodé n'est jamais renvoyé à l'API, même après un redémarrage ou une
+reconstruction complète de l'index.
+
+Deux implémentations:
+- SQLite (développement): un fichier local, vecteurs float32 en BLOB
+- Redis (production): partagé entre les instances, sans expiration
+
+Choix par EMBEDDING_STORE ("sqlite", "redis", "none"); par défaut Redis en
+production et SQLite ailleurs.
+"""
+import asyncio
+import base64
+import hashlib
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from array import array
+from pathlib import Path
+from typing import List, Dict, Optional
+
+import structlog
+
+from app.core.config import settings
+from app.database.redis_client import get_redis
+
+logger = structlog.get_logger()
+
+# Fichier SQLite par défaut (backend/data/embedding_store/embeddings.sqlite3)
+DEFAULT_SQLITE_PATH = Path(__file__).parent.parent.parent / "data" / "embedding_store" / "embeddings.sqlite3"
+
+EMBEDDING_STORES = ("sqlite", "redis", "none")
+
+
+def content_hash(text: str) -> str:
+    """Hash du texte exact (sans normalisation: le vecteur dépend du texte envoyé)"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _to_bytes(vector: List[float]) -> bytes:
+    """Vecteur -> float32 brut"""
+    return array("f", vector).tobytes()
+
+
+def _from_bytes(value: bytes) -> List[float]:
+    """float32 brut -> vecteur"""
+    vector = array("f")
+    vector.frombytes(value)
+    return vector.tolist()
+
+
+class EmbeddingStore(ABC):
+    """Stockage persistant des embeddings, par modèle et hash de contenu"""
+
+    @abstractmethod
+    async def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        """Retourne les vecteurs connus (hash -> vecteur); les absents sont omis"""
+
+    @abstractmethod
+    async def set_many(self, model: str, vectors: Dict[str, List[float]]):
+        """Enregistre des vecteurs (hash -> vecteur)"""
+
+
+class SQLiteEmbeddingStore(EmbeddingStore):
+    """Embeddings dans un fichier SQLite local (appels exécutés dans un thread)"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path or settings.EMBEDDING_STORE_PATH or DEFAULT_SQLITE_PATH)
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Ouvre la base (création du schéma au premier accès)"""
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (model, content_hash)
+                )
+                """
+            )
+            connection.commit()
+            self._connection = connection
+        return self._connection
+
+    def _get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            connection = self._connect()
+            # Limite SQLite du nombre de paramètres par requête
+            for i in range(0, len(hashes), 500):
+                chunk = hashes[i:i + 500]
+                rows = connection.execute(
+                    f"SELECT content_hash, vector FROM embeddings "
+                    f"WHERE model = ? AND content_hash IN ({','.join('?' * len(chunk))})",
+                    [model, *chunk]
+                ).fetchall()
+                for digest, vector in rows:
+                    found[digest] = _from_bytes(vector)
+        return found
+
+    def _set_many(self, model: str, vectors: Dict[str, List[float]]):
+        with self._lock:
+            connection = self._connect()
+            connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, content_hash, vector) VALUES (?, ?, ?)",
+                [(model, digest, _to_bytes(vector)) for digest, vector in vectors.items()]
+            )
+            connection.commit()
+
+    async def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        if not hashes:
+            return {}
+        return await asyncio.to_thread(self._get_many, model, hashes)
+
+    async def set_many(self, model: str, vectors: Dict[str, List[float]]):
+        if vectors:
+            await asyncio.to_thread(self._set_many, model, vectors)
+
+
+class RedisEmbeddingStore(EmbeddingStore):
+    """Embeddings dans Redis, clé embedding_store:{modèle}:{sha256}, sans expiration"""
+
+    # Le client décode les réponses en texte: vecteurs stockés en base64
+    KEY_PREFIX = "embedding_store"
+
+    def _key(self, model: str, digest: str) -> str:
+        """Clé Redis d'un vecteur"""
+        return f"{self.KEY_PREFIX}:{model}:{digest}"
+
+    async def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        if not hashes:
+            return {}
+        client = await get_redis()
+        values = await client.mget([self._key(model, digest) for digest in hashes])
+        return {
+            digest: _from_bytes(base64.b64decode(value))
+            for digest, value in zip(hashes, values)
+            if value
+        }
+
+    async def set_many(self, model: str, vectors: Dict[str, List[float]]):
+        if not vectors:
+            return
+        client = await get_redis()
+        await client.mset({
+            self._key(model, digest): base64.b64encode(_to_bytes(vector)).decode("ascii")
+            for digest, vector in vectors.items()
+        })
+
+
+_embedding_store: Optional[EmbeddingStore] = None
+_embedding_store_resolved = False
+
+
+def get_embedding_store() -> Optional[EmbeddingStore]:
+    """Retourne le stockage configuré (instance partagée), None si désactivé"""
+    global _embedding_store, _embedding_store_resolved
+    if not _embedding_store_resolved:
+        backend = settings.EMBEDDING_STORE or ("redis" if settings.ENVIRONMENT == "production" else "sqlite")
+        if backend == "sqlite":
+            _embedding_store = SQLiteEmbeddingStore()
+        elif backend == "redis":
+            _embedding_store = RedisEmbeddingStore()
+        elif backend != "none":
+            raise ValueError(f"Unknown EMBEDDING_STORE '{backend}', expected one of {EMBEDDING_STORES}")
+        _embedding_store_resolved = True
+    return _embedding_store
@@ -0,0 +1,84 @@
+"""
+Analyseur de texte français pour la recherche lexicale (BM25)
+
+Chaîne de traitement:
+1. minuscules et suppression des accents ("réunion" -> "reunion")
+2. découpage en mots (les élisions l', d', qu'... sont séparées)
+3. suppression des mots vides
+4. racinisation légère (pluriels et suffixes fréquents, style Savoy)
+
+La racinisation reste volontairement légère: les termes techniques
+("openai", "skeelz", "timesheet") doivent rester reconnaissables.
+"""
+import re
+import unicodedata
+from typing import List
+
+# Mots vides français (et quelques mots anglais fréquents dans les tickets)
+STOP_WORDS = frozenset("""
+a afin ai aie aient aies ait alors as au aucun aucune aupres auquel aura aurai auraient aurais aurait
+aussi autre autres aux avaient avais avait avant avec avez aviez avoir avons ayant c ca ce ceci cela
+celle celles celui ces cet cette ceux chaque chez ci comme comment d dans de des deja depuis dont du
+donc elle elles en encore entre es est et etaient etais etait etant ete etes etre eu eux fait faire
+fais faut hors ici il ils j je jusqu l la le les leur leurs lors lui m ma mais me meme mes moi mon
+n ne ni non nos notre nous on ont or ou par parce pas peu peut peux plus pour pourquoi qu quand que
+quel quelle quelles quels qui quoi s sa sans se sera ses si sien son sont sous suis sur t ta te tes
+toi ton tous tout toute toutes tres tu un une vos votre vous y
+bonjour merci svp stp
+the and of to in is for on with an or be it this that
+""".split())
+
+# Suffixes retirés par la racinisation légère (du plus long au plus court)
+SUFFIXES = (
+    "issements", "issement", "ements", "ement", "ations", "ation", "ateurs", "ateur",
+    "atrices", "atrice", "ments", "ment", "euses", "euse", "iques", "ique",
+    "istes", "iste", "ites", "ite", "eux", "ees", "ee", "er", "es", "e",
+)
+
+# Longueur minimale de la racine après suppression d'un suffixe
+MIN_STEM_LENGTH = 3
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def fold_accents(text: str) -> str:
+    """Met en minuscules et supprime les accents"""
+    text = unicodedata.normalize("NFD", text.lower())
+    return "".join(char for char in text if unicodedata.category(char) != "Mn")
+
+
+def stem(word: str) -> str:
+    """Racinisation légère d'un mot déjà en minuscules sans accents"""
+    if len(word) <= MIN_STEM_LENGTH or word.isdigit():
+        return word
+
+    # Pluriels: "reseaux" -> "reseau", "journaux" -> "journal", "licences" -> "licence"
+    if word.endswith("eaux"):
+        word = word[:-1]
+    elif word.endswith("aux") and len(word) > 5:
+        word = word[:-3] + "al"
+    elif word.endswith(("s", "x")) and not word.endswith("ss"):
+        word = word[:-1]
+
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """Découpe un texte en mots (minuscules, sans accents), sans filtrage"""
+    return _TOKEN_PATTERN.findall(fold_accents(text))
+
+
+def analyze(text: str) -> List[str]:
+    """
+    Transforme un texte en liste de termes indexables
+
+    Args:
+        text: Texte brut (question utilisateur ou document)
+
+    Returns:
+        Termes racinisés, mots vides exclus (l'ordre et les doublons sont conservés)
+    """
+    return [stem(token) for token in tokenize(text) if token not in STOP_WORDS]
@@ -0,0 +1,190 @@
+"""
+Service de lecture des interactions archivées (Supabase Storage)
+
+Les partitions mensuelles de la table interactions plus anciennes que
+INTERACTIONS_RETENTION_MONTHS sont exportées en NDJSON compressé (gzip) par
+scripts/archive_interactions.py, puis détachées. Ce service relit ces
+fichiers à la demande pour servir l'historique des vieilles conversations.
+"""
+import asyncio
+import gzip
+import io
+import json
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import structlog
+from supabase import create_client, Client
+
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+# Nom du bucket Supabase Storage pour les archives d'interactions
+INTERACTIONS_ARCHIVE_BUCKET = "interactions-archive"
+
+
+def archive_cutoff(retention_months: int, now: Optional[datetime] = None) -> datetime:
+    """
+    Retourne la date limite d'archivage (début de mois, UTC)
+
+    Les partitions dont la borne haute est antérieure ou égale à cette date
+    sont archivées: une conversation créée avant peut avoir des messages archivés.
+    """
+    now = now or datetime.now(timezone.utc)
+    months = now.year * 12 + (now.month - 1) - retention_months
+    return datetime(months // 12, months % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def archive_storage_path(partition_name: str, range_start: datetime) -> str:
+    """Chemin du fichier d'archive d'une partition dans le bucket"""
+    return f"{range_start.year}/{partition_name}.ndjson.gz"
+
+
+def serialize_interaction(row: Dict[str, Any]) -> str:
+    """Sérialise une interaction en ligne NDJSON (même forme que les réponses PostgREST)"""
+    return json.dumps(
+        {
+            "id": str(row["id"]),
+            "session_id": row["session_id"],
+            "user_id": row["user_id"],
+            "message_type": row["message_type"],
+            "content": row["content"],
+            "agent_used": row["agent_used"],
+            "metadata": row["metadata"] or {},
+            "created_at": row["created_at"].isoformat(),
+        },
+        ensure_ascii=False
+    )
+
+
+class InteractionArchiveService:
+    """Service pour relire les conversations archivées dans Supabase Storage"""
+
+    # Nombre de conversations archivées gardées en mémoire (messages
+    # téléchargés, valides tant que la liste des archives de la session est la même)
+    CACHE_SIZE = 64
+
+    def __init__(self):
+        self.bucket = INTERACTIONS_ARCHIVE_BUCKET
+        self.service_key = settings.SUPABASE_SERVICE_ROLE_KEY or settings.SUPABASE_KEY
+        self.supabase_client: Optional[Client] = None
+        # (session_id, user_id) -> (IDs des archives lues, messages)
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[Tuple[str, ...], List[Dict[str, Any]]]]" = OrderedDict()
+
+    def _get_client(self) -> Client:
+        """Retourne le client Supabase avec le service role key (bucket privé)"""
+        if not self.supabase_client:
+            self.supabase_client = create_client(settings.SUPABASE_URL, self.service_key)
+        return self.supabase_client
+
+    def may_have_archives(self, conversation_created_at: Optional[str]) -> bool:
+        """
+        Indique si une conversation peut avoir des messages archivés
+
+        Évite la requête sur le manifeste pour toutes les conversations récentes.
+        """
+        if not conversation_created_at:
+            return False
+        try:
+            created_at = datetime.fromisoformat(conversation_created_at.replace("Z", "+00:00"))
+        except ValueError:
+            return True
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return created_at < archive_cutoff(settings.INTERACTIONS_RETENTION_MONTHS)
+
+    async def get_archived_messages(
+        self,
+        session_id: str,
+        user_id: str
+    ) -> List[Dict[str, Any]]:
+        """
+        Récupère les messages archivés d'une conversation
+
+        Args:
+            session_id: ID de la session
+            user_id: ID de l'utilisateur (l'accès est vérifié par l'appelant)
+
+        Returns:
+            Liste des messages triés par date de création (plus anciens en premier)
+        """
+        cache_key = (session_id, user_id)
+
+        try:
+            # Manifeste relu à chaque appel: une partition archivée après une
+            # première lecture (même vide) est prise en compte
+            client = self._get_client()
+            result = client.table("interactions_archive_sessions")\
+                .select("archive_id, interactions_archives(storage_path, range_start)")\
+                .eq("session_id", session_id)\
+                .eq("user_id", user_id)\
+                .execute()
+
+            rows = [row for row in (result.data or []) if row.get("interactions_archives")]
+            rows.sort(key=lambda row: row["interactions_archives"]["range_start"])
+            archive_ids = tuple(str(row["archive_id"]) for row in rows)
+            archives = [row["interactions_archives"] for row in rows]
+
+            cached = self._cache.get(cache_key)
+            if cached and cached[0] == archive_ids:
+                self._cache.move_to_end(cache_key)
+                return cached[1]
+
+            messages: List[Dict[str, Any]] = []
+            for archive in archives:
+                # Téléchargement et décompression hors de la boucle d'événements
+                messages.extend(await asyncio.to_thread(
+                    self._read_session_from_archive,
+                    archive["storage_path"],
+                    session_id,
+                    user_id
+                ))
+
+            messages.sort(key=lambda message: message["created_at"])
+
+            # Pas de mise en cache sans archive: rien à télécharger, et une
+            # partition archivée plus tard doit être relue
+            if not archives:
+                self._cache.pop(cache_key, None)
+            else:
+                self._cache[cache_key] = (archive_ids, messages)
+                self._cache.move_to_end(cache_key)
+                if len(self._cache) > self.CACHE_SIZE:
+                    self._cache.popitem(last=False)
+                logger.info(
+                    "Archived messages loaded",
+                    session_id=session_id,
+                    archives=len(archives),
+                    messages=len(messages)
+                )
+            return messages
+
+        except Exception as e:
+            logger.error(
+                "Error getting archived messages",
+                session_id=session_id,
+                error=str(e),
+                exc_info=True
+            )
+            return []
+
+    def _read_session_from_archive(
+        self,
+        storage_path: str,
+        session_id: str,
+        user_id: str
+    ) -> List[Dict[str, Any]]:
+        """Télécharge un fichier d'archive et en extrait les messages d'une session"""
+        data = self._get_client().storage.from_(self.bucket).download(storage_path)
+        messages = []
+        with gzip.GzipFile(fileobj=io.BytesIO(data)) as archive_file:
+            for line in archive_file:
+                # Filtre textuel rapide avant de décoder le JSON
+                if session_id.encode("utf-8") not in line:
+                    continue
+                message = json.loads(line)
+                if message["session_id"] == session_id and message["user_id"] == user_id:
+                    messages.append(message)
+        return messages
@@ -0,0 +1,189 @@
+"""
+Index des devices Jamf en mémoire
+
+Le parc ne compte que quelques centaines de lignes (une par device et par
+utilisateur): elles sont chargées une fois (au démarrage) depuis la table
+jamf_devices de Supabase, ou à défaut depuis knowledge_base/jamf_data.csv,
+et indexées par numéro de série, hostname, username et JSS ID. Les
+recherches de JamfService ne font alors aucun appel réseau.
+
+Les devices sont agrégés au chargement (infos du device, liste de ses
+utilisateurs, nombre d'utilisateurs), sous la même forme que les RPC
+get_jamf_device_info et la table jamf_devices.
+
+Rafraîchissement (voir versioned_index):
+- load_jamf_data_to_supabase.py incrémente jamf_index:version dans Redis
+- l'index est de toute façon rechargé toutes les REFRESH_SECONDS
+  (synchronisation Jamf faite hors de ce dépôt)
+"""
+import asyncio
+import csv
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import structlog
+
+from app.database.supabase_client import SupabaseClient
+from app.services.versioned_index import VersionedIndex
+
+logger = structlog.get_logger()
+
+# Fichier de repli (backend/knowledge_base) si Supabase est indisponible
+FALLBACK_FILE = Path(__file__).parent.parent.parent / "knowledge_base" / "jamf_data.csv"
+
+# Champs d'un utilisateur de device
+USER_FIELDS = ("username", "is_admin", "is_filevault_user", "uid", "home_directory")
+
+
+def parse_jamf_csv_row(row: Dict[str, str]) -> Dict[str, Any]:
+    """Ligne de l'export Jamf (CSV) -> ligne de la table jamf_devices"""
+    return {
+        "device_jss_id": int(row["Device JSS ID"]),
+        "hostname": row["Hostname"],
+        "serial": row["Serial"],
+        "username": row["Username"],
+        "is_admin": row["Is Admin"].upper() == "TRUE",
+        "is_filevault_user": row["Is Filevault user"].upper() == "TRUE",
+        "uid": int(row["UID"]) if row["UID"] else None,
+        "home_directory": row["Home Directory"] if row["Home Directory"] else None
+    }
+
+
+def read_jamf_csv(csv_file: Path) -> List[Dict[str, Any]]:
+    """Lignes jamf_devices d'un export Jamf (CSV)"""
+    with open(csv_file, "r", encoding="utf-8") as f:
+        return [parse_jamf_csv_row(row) for row in csv.DictReader(f)]
+
+
+def normalize_serial(serial: str) -> str:
+    return (serial or "").strip().upper()
+
+
+def normalize_name(name: str) -> str:
+    """Hostname ou username (comparaison sans casse)"""
+    return (name or "").strip().lower()
+
+
+class JamfDeviceIndex(VersionedIndex):
+    """Devices Jamf en mémoire, indexés par série, hostname, username et JSS ID"""
+
+    NAME = "jamf_devices"
+    TABLE = "jamf_devices"
+    VERSION_KEY = "jamf_index:version"
+    # Rechargement périodique, même sans changement signalé
+    REFRESH_SECONDS = 3600.0
+    # Lignes par requête de chargement
+    PAGE_SIZE = 1000
+
+    def __init__(self):
+        super().__init__()
+        self.supabase = SupabaseClient()
+        self.by_serial: Dict[str, Dict[str, Any]] = {}
+        self.by_hostname: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_username: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_jss_id: Dict[int, Dict[str, Any]] = {}
+
+    def _fetch_table(self) -> List[Dict[str, Any]]:
+        """Toutes les lignes de jamf_devices (synchrone, par pages)"""
+        client = self.supabase._get_client()
+        rows: List[Dict[str, Any]] = []
+        while True:
+            result = client.table(self.TABLE).select(
+                "device_jss_id,hostname,serial," + ",".join(USER_FIELDS)
+            ).order("device_jss_id").range(len(rows), len(rows) + self.PAGE_SIZE - 1).execute()
+            rows.extend(result.data or [])
+            if len(result.data or []) < self.PAGE_SIZE:
+                return rows
+
+    async def _fetch(self) -> List[Dict[str, Any]]:
+        """Lignes depuis Supabase, ou depuis l'export CSV en repli"""
+        try:
+            rows = await asyncio.to_thread(self._fetch_table)
+            if rows:
+                return rows
+            logger.warning("No Jamf devices in Supabase, loading CSV export")
+        except Exception as e:
+            logger.warning("Jamf devices unavailable in Supabase, loading CSV export", error=str(e))
+
+        if not FALLBACK_FILE.exists():
+            return []
+        return read_jamf_csv(FALLBACK_FILE)
+
+    @staticmethod
+    def _build(rows: List[Dict[str, Any]]) -> Dict[str, Dict[Any, Any]]:
+        """Agrège les lignes (device, utilisateur) en devices et construit les index"""
+        by_serial: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            serial = normalize_serial(row["serial"])
+            device = by_serial.get(serial)
+            if device is None:
+                device = by_serial[serial] = {
+                    "device_jss_id": row["device_jss_id"],
+                    "hostname": row["hostname"],
+                    "serial": row["serial"],
+                    "is_enrolled": True,
+                    "users_count": 0,
+                    "users": [],
+                }
+            if any(user["username"] == row["username"] for user in device["users"]):
+                continue
+            device["users"].append({field: row.get(field) for field in USER_FIELDS})
+            device["users_count"] = len(device["users"])
+
+        by_hostname: Dict[str, List[Dict[str, Any]]] = {}
+        by_username: Dict[str, List[Dict[str, Any]]] = {}
+        by_jss_id: Dict[int, Dict[str, Any]] = {}
+        for device in by_serial.values():
+            by_hostname.setdefault(normalize_name(device["hostname"]), []).append(device)
+            by_jss_id.setdefault(device["device_jss_id"], device)
+            for user in device["users"]:
+                by_username.setdefault(normalize_name(user["username"]), []).append(device)
+
+        return {
+            "by_serial": by_serial,
+            "by_hostname": by_hostname,
+            "by_username": by_username,
+            "by_jss_id": by_jss_id,
+        }
+
+    async def _rebuild(self) -> Dict[str, Any]:
+        """Recharge les lignes jamf_devices et reconstruit les index"""
+        rows = await self._fetch()
+        indexes = self._build(rows)
+
+        # Remplacement en bloc: une recherche ne voit jamais un index partiel
+        self.by_serial = indexes["by_serial"]
+        self.by_hostname = indexes["by_hostname"]
+        self.by_username = indexes["by_username"]
+        self.by_jss_id = indexes["by_jss_id"]
+        return {"rows": len(rows), "devices": len(self.by_serial)}
+
+    def get_by_serial(self, serial_number: str) -> Optional[Dict[str, Any]]:
+        """Device (avec ses utilisateurs) par numéro de série"""
+        return self.by_serial.get(normalize_serial(serial_number))
+
+    def get_by_hostname(self, hostname: str) -> List[Dict[str, Any]]:
+        """Devices portant ce hostname (plusieurs possibles: "MacBook Pro")"""
+        return self.by_hostname.get(normalize_name(hostname), [])
+
+    def get_by_username(self, username: str) -> List[Dict[str, Any]]:
+        """Devices sur lesquels l'utilisateur a un compte"""
+        return self.by_username.get(normalize_name(username), [])
+
+    def get_by_jss_id(self, device_jss_id: int) -> Optional[Dict[str, Any]]:
+        """Device par JSS ID"""
+        try:
+            return self.by_jss_id.get(int(device_jss_id))
+        except (TypeError, ValueError):
+            return None
+
+
+_jamf_index: Optional[JamfDeviceIndex] = None
+
+
+def get_jamf_index() -> JamfDeviceIndex:
+    """Retourne l'index Jamf partagé"""
+    global _jamf_index
+    if _jamf_index is None:
+        _jamf_index = JamfDeviceIndex()
+    return _jamf_index
@@ -1,20 +1,34 @@
 """
 Service pour gérer les données Jamf
 Vérifie si un MacBook est enrollé dans Jamf et récupère les informations
+
+Les recherches sont servies par l'index en mémoire (jamf_index), chargé
+depuis la table jamf_devices: aucun appel Supabase par requête.
 """
 import structlog
 from typing import Dict, Any, Optional, List
 
-from app.database.supabase_client import SupabaseClient
+from app.services.jamf_index import get_jamf_index
 
 logger = structlog.get_logger()
 
 
+def _device_info(device: Dict[str, Any]) -> Dict[str, Any]:
+    """Infos d'un device (même forme que la RPC get_jamf_device_info)"""
+    return {
+        "device_jss_id": device["device_jss_id"],
+        "hostname": device["hostname"],
+        "serial": device["serial"],
+        "is_enrolled": True,
+        "users_count": device["users_count"]
+    }
+
+
 class JamfService:
     """Service pour gérer les données Jamf"""
     
     def __init__(self):
-        self.supabase = SupabaseClient()
+        self.index = get_jamf_index()
     
     async def is_device_enrolled(self, serial_number: str) -> bool:
         """
@@ -27,13 +41,8 @@ class JamfService:
             True si le device est enrollé, False sinon
         """
         try:
-            client = self.supabase._get_client()
-            result = client.rpc(
-                "is_device_jamf_enrolled",
-                {"serial_number": serial_number}
-            ).execute()
-            
-            return result.data if result.data else False
+            await self.index.ensure_fresh()
+            return self.index.get_by_serial(serial_number) is not None
         except Exception as e:
             logger.error(f"Error checking Jamf enrollment for serial {serial_number}: {e}")
             return False
@@ -49,15 +58,9 @@ class JamfService:
             Dictionnaire avec les informations du device ou None
         """
         try:
-            client = self.supabase._get_client()
-            result = client.rpc(
-                "get_jamf_device_info",
-                {"serial_number": serial_number}
-            ).execute()
-            
-            if result.data and len(result.data) > 0:
-                return result.data[0]
-            return None
+            await self.index.ensure_fresh()
+            device = self.index.get_by_serial(serial_number)
+            return _device_info(device) if device else None
         except Exception as e:
             logger.error(f"Error getting Jamf device info for serial {serial_number}: {e}")
             return None
@@ -73,20 +76,9 @@ class JamfService:
             Liste des utilisateurs avec leurs informations
         """
         try:
-            client = self.supabase._get_client()
-            result = client.table("jamf_devices").select("*").eq("serial", serial_number).execute()
-            
-            users = []
-            for row in result.data:
-                users.append({
-                    "username": row["username"],
-                    "is_admin": row["is_admin"],
-                    "is_filevault_user": row["is_filevault_user"],
-                    "uid": row["uid"],
-                    "home_directory": row["home_directory"]
-                })
-            
-            return users
+            await self.index.ensure_fresh()
+            device = self.index.get_by_serial(serial_number)
+            return [dict(user) for user in device["users"]] if device else []
         except Exception as e:
             logger.error(f"Error getting device users for serial {serial_number}: {e}")
             return []
@@ -102,12 +94,11 @@ class JamfService:
             Dictionnaire avec les informations du device ou None
         """
         try:
-            client = self.supabase._get_client()
-            result = client.table("jamf_devices").select("*").eq("hostname", hostname).limit(1).execute()
-            
-            if result.data and len(result.data) > 0:
+            await self.index.ensure_fresh()
+            devices = self.index.get_by_hostname(hostname)
+            if devices:
                 # Retourner les infos du premier device trouvé
-                device = result.data[0]
+                device = devices[0]
                 return {
                     "device_jss_id": device["device_jss_id"],
                     "hostname": device["hostname"],
@@ -118,4 +109,20 @@ class JamfService:
         except Exception as e:
             logger.error(f"Error finding device by hostname {hostname}: {e}")
             return None
-
+    
+    async def find_devices_by_username(self, username: str) -> List[Dict[str, Any]]:
+        """
+        Trouve les devices sur lesquels un utilisateur a un compte
+        
+        Args:
+            username: Nom du compte macOS
+            
+        Returns:
+            Liste des devices (mêmes informations que get_device_info)
+        """
+        try:
+            await self.index.ensure_fresh()
+            return [_device_info(device) for device in self.index.get_by_username(username)]
+        except Exception as e:
+            logger.error(f"Error finding devices for username {username}: {e}")
+            return []
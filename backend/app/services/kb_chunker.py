@@ -0,0 +1,247 @@
+"""
+Découpage des documents markdown de la base de connaissances en chunks
+
+- Sections délimitées par les titres markdown (# à ######), hors blocs de
+  code; chaque chunk porte le chemin de titres de sa section
+  ("Document > Section > Sous-section"), repris en tête de son texte
+- Sections longues découpées en chunks d'au plus MAX_CHUNK_TOKENS tokens
+  (paragraphes, puis phrases ou lignes, puis mots), avec un recouvrement de
+  CHUNK_OVERLAP_TOKENS entre chunks consécutifs
+- IDs stables: dérivés du fichier, du chemin de titres et du rang du chunk
+  dans sa section; modifier une section ne change pas les IDs des autres
+- Catégorie du fichier en métadonnée ("category"), utilisée par les filtres
+  de recherche des agents
+
+Le texte des chunks est stocké dans le chunk store (chunk_store), les
+moteurs vectoriels ne gardent que des métadonnées légères.
+"""
+import hashlib
+import re
+import unicodedata
+from collections import Counter
+from typing import List, Dict, Any, NamedTuple
+
+from app.services.context_packer import count_tokens
+
+# Taille maximale d'un chunk (titres inclus) et recouvrement entre chunks
+MAX_CHUNK_TOKENS = 350
+CHUNK_OVERLAP_TOKENS = 50
+
+# Suffixes des fichiers de procédures (procedures/<catégorie>_procedure.md,
+# procedures/<catégorie>_standard_<titre>.md)
+_PROCEDURE_MARKERS = ("_standard_", "_procedure")
+
+# Tokenizer du modèle d'embedding (OpenAI)
+TOKENIZER_PROVIDER = "openai"
+
+HEADING_PATH_SEPARATOR = " > "
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+# Fin de phrase ou de ligne (séparateur conservé)
+_SENTENCE_BREAK = re.compile(r"((?<=[.!?…])[ \t]+|\n+)")
+
+
+class _Unit(NamedTuple):
+    """Fragment insécable d'une section (paragraphe, phrase ou groupe de mots)"""
+    text: str
+    # Séparateur avec le fragment précédent
+    glue: str
+    tokens: int
+
+
+def normalize_id(text: str) -> str:
+    """
+    Normalise un texte pour créer un ID ASCII valide pour Pinecone
+    Remplace les caractères accentués et les caractères spéciaux
+    """
+    # Normaliser les caractères Unicode (NFD = décomposition)
+    text = unicodedata.normalize('NFD', text)
+    # Supprimer les accents
+    text = text.encode('ascii', 'ignore').decode('ascii')
+    # Remplacer les espaces et caractères spéciaux par des underscores
+    text = re.sub(r'[^a-zA-Z0-9_-]', '_', text)
+    # Supprimer les underscores multiples
+    text = re.sub(r'_+', '_', text)
+    # Supprimer les underscores en début/fin
+    text = text.strip('_')
+    return text
+
+
+def _count(text: str) -> int:
+    return count_tokens(text, TOKENIZER_PROVIDER)
+
+
+def split_sections(content: str, default_title: str) -> List[Dict[str, Any]]:
+    """
+    Découpe un document markdown selon ses titres
+
+    Returns:
+        Sections {"path": [titres du plus haut au plus bas], "body": texte}
+        (sections sans texte ignorées)
+    """
+    sections = []
+    stack: List[tuple] = []
+    lines: List[str] = []
+    in_fence = False
+
+    def flush():
+        body = "\n".join(lines).strip()
+        if body:
+            sections.append({"path": [title for _, title in stack] or [default_title], "body": body})
+        lines.clear()
+
+    for line in content.split("\n"):
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else _HEADING.match(line)
+        if match:
+            flush()
+            level = len(match.group(1))
+            while stack and stack[-1][0] >= level:
+                stack.pop()
+            stack.append((level, match.group(2).strip()))
+        else:
+            lines.append(line)
+    flush()
+    return sections
+
+
+def _split_words(text: str, max_tokens: int) -> List[str]:
+    """Découpe un texte sans fin de phrase en groupes de mots de max_tokens"""
+    pieces, current = [], []
+    for word in text.split():
+        if current and _count(" ".join(current + [word])) > max_tokens:
+            pieces.append(" ".join(current))
+            current = []
+        current.append(word)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def _split_units(body: str, max_tokens: int) -> List[_Unit]:
+    """Fragments d'une section, chacun d'au plus max_tokens tokens"""
+    units = []
+    for paragraph in _PARAGRAPH_BREAK.split(body):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tokens = _count(paragraph)
+        if tokens <= max_tokens:
+            units.append(_Unit(paragraph, "\n\n", tokens))
+            continue
+
+        # Paragraphe trop long: phrases ou lignes
+        parts = _SENTENCE_BREAK.split(paragraph)
+        glue = "\n\n"
+        for index in range(0, len(parts), 2):
+            sentence = parts[index].strip()
+            if sentence:
+                for piece in _split_words(sentence, max_tokens) if _count(sentence) > max_tokens else [sentence]:
+                    units.append(_Unit(piece, glue, _count(piece)))
+                    glue = " "
+            if index + 1 < len(parts):
+                glue = "\n" if "\n" in parts[index + 1] else " "
+    return units
+
+
+def _join(units: List[_Unit]) -> str:
+    return units[0].text + "".join(unit.glue + unit.text for unit in units[1:])
+
+
+def _pack(units: List[_Unit], budget: int, overlap: int) -> List[str]:
+    """Regroupe les fragments en chunks de budget tokens, avec recouvrement"""
+    chunks = []
+    current: List[_Unit] = []
+    tokens = 0
+    for unit in units:
+        if current and tokens + unit.tokens > budget:
+            chunks.append(_join(current))
+            # Recouvrement: derniers fragments du chunk précédent
+            tail: List[_Unit] = []
+            tail_tokens = 0
+            for previous in reversed(current):
+                if tail_tokens + previous.tokens > overlap:
+                    break
+                tail.insert(0, previous)
+                tail_tokens += previous.tokens
+            while tail and tail_tokens + unit.tokens > budget:
+                tail_tokens -= tail.pop(0).tokens
+            current, tokens = tail, tail_tokens
+        current.append(unit)
+        tokens += unit.tokens
+    if current:
+        chunks.append(_join(current))
+    return chunks
+
+
+def source_category(file_name: str) -> str:
+    """
+    Catégorie d'un fichier de la base de connaissances
+
+    Procédures: catégorie en préfixe du nom ("network_wifi_procedure.md" ->
+    "network_wifi"); autres fichiers: nom sans extension ni dossier
+    ("wifi_macbook_jamf.md" -> "wifi_macbook_jamf").
+    """
+    stem = file_name.rsplit("/", 1)[-1]
+    stem = stem.rsplit(".md", 1)[0] if stem.endswith(".md") else stem
+    for marker in _PROCEDURE_MARKERS:
+        if marker in stem:
+            return stem.split(marker, 1)[0]
+    return stem
+
+
+def build_chunks(
+    file_name: str,
+    content: str,
+    max_tokens: int = MAX_CHUNK_TOKENS,
+    overlap: int = CHUNK_OVERLAP_TOKENS
+) -> List[Dict[str, Any]]:
+    """
+    Chunks d'un fichier markdown, sans embeddings
+
+    Args:
+        file_name: Nom du fichier (metadata "source")
+        content: Contenu markdown
+        max_tokens: Taille maximale d'un chunk
+        overlap: Recouvrement entre chunks consécutifs d'une section
+
+    Returns:
+        Chunks {"id", "text", "metadata"}; metadata: source, title,
+        heading_path, section_index, chunk_index, category, type, format
+    """
+    # Normaliser le nom de fichier pour l'ID (sans l'extension .md)
+    file_stem = file_name.rsplit(".md", 1)[0] if file_name.endswith(".md") else file_name
+    normalized_stem = normalize_id(file_stem)
+    category = source_category(file_name)
+
+    chunks = []
+    occurrences: Counter = Counter()
+    for section_index, section in enumerate(split_sections(content, file_stem)):
+        heading_path = HEADING_PATH_SEPARATOR.join(section["path"])
+        # Deux sections de même chemin: rang d'apparition dans la clé
+        occurrences[heading_path] += 1
+        key = heading_path if occurrences[heading_path] == 1 else f"{heading_path}#{occurrences[heading_path]}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:8]
+        base_id = f"kb_{normalized_stem}_{normalize_id(section['path'][-1])[:30]}_{digest}"
+
+        prefix = f"{heading_path}\n\n"
+        budget = max(max_tokens - _count(prefix), max_tokens // 2)
+        for chunk_index, body in enumerate(_pack(_split_units(section["body"], budget), budget, overlap)):
+            chunks.append({
+                "id": f"{base_id}_{chunk_index}",
+                "text": prefix + body,
+                "metadata": {
+                    "source": file_name,
+                    "title": section["path"][-1],
+                    "heading_path": heading_path,
+                    "section_index": section_index,
+                    "chunk_index": chunk_index,
+                    "category": category,
+                    "type": "knowledge_base",
+                    "format": "markdown",
+                }
+            })
+    return chunks
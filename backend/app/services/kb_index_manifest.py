@@ -0,0 +1,155 @@
+"""
+Manifest de l'index de la base de connaissances
+
+Pour chaque chunk indexé: hash du contenu (texte + métadonnées) et modèle
+d'embedding. Stocké dans Redis (un hash par namespace):
+
+    kb_manifest:{namespace} -> {chunk_id: {"hash": ..., "model": ..., "source": ...}}
+
+Une réindexation compare les chunks courants au manifest: seuls les chunks
+nouveaux ou modifiés sont ré-encodés, les IDs disparus (sections supprimées
+ou renommées) sont supprimés de l'index.
+
+kb_manifest:version est incrémenté à chaque modification de l'index: les
+caches de résultats de recherche l'intègrent à leurs clés.
+"""
+import hashlib
+import json
+from typing import List, Dict, Any, Optional, Set
+
+import structlog
+
+from app.database.redis_client import get_redis
+
+logger = structlog.get_logger()
+
+DEFAULT_NAMESPACE = "default"
+
+
+def chunk_hash(chunk: Dict[str, Any]) -> str:
+    """Hash du contenu d'un chunk (texte et métadonnées)"""
+    payload = json.dumps(
+        {"text": chunk.get("text", ""), "metadata": chunk.get("metadata", {})},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def diff_chunks(
+    chunks: List[Dict[str, Any]],
+    manifest: Dict[str, Dict[str, str]],
+    model: str,
+    skipped_sources: Optional[Set[str]] = None
+) -> Dict[str, List]:
+    """
+    Compare les chunks courants au manifest
+
+    Args:
+        chunks: Chunks {"id", "text", "metadata"}
+        manifest: Manifest courant (chunk_id -> {"hash", "model", "source"})
+        model: Modèle d'embedding courant
+        skipped_sources: Fichiers non relus (erreur de téléchargement): leurs
+            chunks ne sont pas considérés comme supprimés
+
+    Returns:
+        {"added": [chunks], "updated": [chunks], "unchanged": [chunks],
+         "deleted": [ids]}
+    """
+    added, updated, unchanged = [], [], []
+    current_ids = set()
+    for chunk in chunks:
+        current_ids.add(chunk["id"])
+        entry = manifest.get(chunk["id"])
+        if entry is None:
+            added.append(chunk)
+        elif entry.get("hash") != chunk_hash(chunk) or entry.get("model") != model:
+            updated.append(chunk)
+        else:
+            unchanged.append(chunk)
+
+    skipped_sources = skipped_sources or set()
+    deleted = sorted(
+        chunk_id for chunk_id, entry in manifest.items()
+        if chunk_id not in current_ids and entry.get("source") not in skipped_sources
+    )
+    return {"added": added, "updated": updated, "unchanged": unchanged, "deleted": deleted}
+
+
+class KnowledgeBaseManifest:
+    """Manifest des chunks indexés (Redis)"""
+
+    KEY_PREFIX = "kb_manifest"
+    # Compteur incrémenté à chaque modification de l'index (invalidation des caches)
+    VERSION_KEY = "kb_manifest:version"
+
+    def _key(self, namespace: Optional[str]) -> str:
+        """Clé Redis du manifest d'un namespace"""
+        return f"{self.KEY_PREFIX}:{namespace or DEFAULT_NAMESPACE}"
+
+    async def load(self, namespace: str = None) -> Optional[Dict[str, Dict[str, str]]]:
+        """
+        Lit le manifest d'un namespace
+
+        Returns:
+            Manifest (vide si jamais indexé), None si Redis est indisponible
+        """
+        try:
+            client = await get_redis()
+            raw = await client.hgetall(self._key(namespace))
+            return {chunk_id: json.loads(value) for chunk_id, value in raw.items()}
+        except Exception as e:
+            logger.warning("Knowledge base manifest unavailable", error=str(e))
+            return None
+
+    async def update(
+        self,
+        chunks: List[Dict[str, Any]],
+        deleted_ids: List[str],
+        model: str,
+        namespace: str = None
+    ):
+        """Enregistre les chunks indexés et retire les IDs supprimés (best effort)"""
+        try:
+            client = await get_redis()
+            key = self._key(namespace)
+            pipe = client.pipeline(transaction=True)
+            if deleted_ids:
+                pipe.hdel(key, *deleted_ids)
+            if chunks:
+                pipe.hset(key, mapping={
+                    chunk["id"]: json.dumps({
+                        "hash": chunk_hash(chunk),
+                        "model": model,
+                        "source": chunk.get("metadata", {}).get("source")
+                    })
+                    for chunk in chunks
+                })
+            await pipe.execute()
+        except Exception as e:
+            logger.warning("Knowledge base manifest update failed", error=str(e))
+
+    async def delete(self, namespace: str = None):
+        """Supprime le manifest d'un namespace (best effort)"""
+        try:
+            client = await get_redis()
+            await client.delete(self._key(namespace))
+        except Exception as e:
+            logger.warning("Knowledge base manifest not deleted", error=str(e))
+
+    async def get_version(self) -> int:
+        """Version de l'index (incrémentée à chaque modification, 0 si inconnue)"""
+        try:
+            client = await get_redis()
+            return int(await client.get(self.VERSION_KEY) or 0)
+        except Exception as e:
+            logger.warning("Knowledge base index version unavailable", error=str(e))
+            return 0
+
+    async def bump_version(self):
+        """Signale une modification de l'index aux caches dérivés (best effort)"""
+        try:
+            client = await get_redis()
+            await client.incr(self.VERSION_KEY)
+        except Exception as e:
+            logger.warning("Knowledge base index version not bumped", error=str(e))
@@ -0,0 +1,475 @@
+"""
+Indexation de la base de connaissances dans le moteur vectoriel
+
+Fichiers markdown de Supabase Storage -> chunks (kb_chunker: taille bornée
+en tokens, chemin de titres) -> embeddings -> moteur configuré (Pinecone ou
+index local) et index local secondaire (corpus BM25).
+
+Le texte des chunks est écrit dans le chunk store; les vecteurs ne portent
+que des métadonnées légères (dont content_hash, le hash du chunk).
+
+Téléchargements concurrents, embeddings par batch et upserts parallèles.
+Réindexation incrémentale (kb_index_manifest): seuls les chunks nouveaux ou
+modifiés sont encodés, les chunks disparus sont supprimés. Reconstruction
+complète dans un namespace versionné, activé après validation (kb_namespaces).
+
+Utilisé par les jobs d'administration (admin_jobs) et par
+scripts/load_knowledge_base.py.
+"""
+import asyncio
+import time
+from typing import List, Dict, Any, Optional, Set, Tuple, Callable, Awaitable
+
+import structlog
+
+from app.core.config import settings
+from app.database.local_vector_index import LocalVectorIndex
+from app.database.vector_store import get_vector_store
+from app.services.chunk_store import get_chunk_store
+from app.services.embedding_service import get_embedding_service
+from app.services.kb_chunker import build_chunks
+from app.services.kb_index_manifest import KnowledgeBaseManifest, chunk_hash, diff_chunks
+from app.services.kb_namespaces import KnowledgeBaseNamespaces, LEGACY_NAMESPACE, get_kb_namespaces
+from app.services.knowledge_base_storage import KnowledgeBaseStorage
+
+logger = structlog.get_logger()
+
+# Callback de progression: await progress(étape, **compteurs)
+ProgressCallback = Callable[..., Awaitable[None]]
+
+
+# Téléchargements simultanés depuis Supabase Storage
+DOWNLOAD_CONCURRENCY = 8
+
+# Contrôle d'un namespace reconstruit avant son activation
+SMOKE_QUERY_COUNT = 8
+SMOKE_TOP_K = 5
+SMOKE_MIN_HIT_RATE = 0.75
+SMOKE_ATTEMPTS = 5
+SMOKE_RETRY_DELAY = 3.0
+
+
+async def _noop_progress(stage: str, **data):
+    """Progression ignorée (appel sans suivi)"""
+
+
+async def download_files(
+    storage: KnowledgeBaseStorage,
+    md_files: List[Dict[str, Any]],
+    progress: Optional[ProgressCallback] = None
+) -> Tuple[List[Dict[str, Any]], Set[str]]:
+    """
+    Télécharge les fichiers en parallèle (DOWNLOAD_CONCURRENCY à la fois)
+    
+    Returns:
+        (fichiers lus, noms des fichiers illisibles)
+    """
+    semaphore = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+    progress = progress or _noop_progress
+    processed = 0
+    
+    async def download(file_info: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        nonlocal processed
+        async with semaphore:
+            file_data = await storage.get_file(file_info["path"])
+        if not file_data:
+            logger.warning(f"Could not read file: {file_info['path']}")
+        processed += 1
+        await progress("download", files_total=len(md_files), files_processed=processed)
+        return file_data
+    
+    results = await asyncio.gather(*[download(file_info) for file_info in md_files])
+    failed = {
+        file_info["path"].split("/")[-1]
+        for file_info, file_data in zip(md_files, results)
+        if not file_data
+    }
+    return [file_data for file_data in results if file_data], failed
+
+
+def _local_changes(
+    local_index: LocalVectorIndex,
+    chunks: List[Dict[str, Any]],
+    skipped_sources: Set[str],
+    sources: Optional[Set[str]] = None,
+    namespace: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Chunks à (ré)écrire et IDs orphelins de l'index local
+
+    L'index local sert de manifest à lui-même (content_hash de chaque
+    vecteur): il est resynchronisé même s'il a été perdu ou reconstruit
+    ailleurs.
+    Avec sources, seuls les chunks de ces fichiers sont considérés.
+    """
+    _, documents = local_index.get_documents(namespace)
+    if sources is not None:
+        documents = [d for d in documents if d["metadata"].get("source") in sources]
+    indexed = {document["id"]: document["metadata"].get("content_hash") for document in documents}
+    current_ids = {chunk["id"] for chunk in chunks}
+    stale = [chunk for chunk in chunks if indexed.get(chunk["id"]) != chunk_hash(chunk)]
+    orphans = [
+        document["id"] for document in documents
+        if document["id"] not in current_ids
+        and document["metadata"].get("source") not in skipped_sources
+    ]
+    return stale, orphans
+
+
+async def _sync_chunks(
+    chunks: List[Dict[str, Any]],
+    namespace: Optional[str] = None,
+    skipped_sources: Optional[Set[str]] = None,
+    sources: Optional[Set[str]] = None,
+    progress: Optional[ProgressCallback] = None,
+    invalidate: bool = True
+) -> Dict[str, int]:
+    """
+    Synchronise les moteurs vectoriels d'un namespace avec une liste de chunks
+    
+    Args:
+        chunks: Chunks courants (build_chunks)
+        namespace: Namespace à synchroniser (None = namespace par défaut)
+        skipped_sources: Fichiers non relus: leurs chunks ne sont pas supprimés
+        sources: Limite la synchronisation à ces fichiers (None = toute la base)
+        progress: Callback de progression
+        invalidate: Invalide les caches de recherche après une modification
+            (inutile pour un namespace pas encore actif)
+    
+    Returns:
+        Compteurs: added, updated, deleted, unchanged, embedded
+    """
+    progress = progress or _noop_progress
+    skipped_sources = skipped_sources or set()
+    embedding_service = get_embedding_service()
+    model = embedding_service.model
+    
+    # Moteur principal: différence avec le manifest
+    manifest_store = KnowledgeBaseManifest()
+    manifest = await manifest_store.load(namespace)
+    if manifest is None:
+        logger.warning("Manifest unavailable, full reindex without orphan cleanup")
+        manifest = {}
+    if sources is not None:
+        manifest = {
+            chunk_id: entry for chunk_id, entry in manifest.items()
+            if entry.get("source") in sources
+        }
+    diff = diff_chunks(chunks, manifest, model, skipped_sources=skipped_sources)
+    primary_changes = diff["added"] + diff["updated"]
+    
+    # Index local secondaire (corpus BM25): resynchronisé sur son propre contenu
+    local_index = LocalVectorIndex() if settings.VECTOR_BACKEND != "local" else None
+    local_changes, local_orphans = [], []
+    if local_index is not None:
+        local_changes, local_orphans = _local_changes(local_index, chunks, skipped_sources, sources, namespace)
+    
+    # Embeddings des seuls chunks nouveaux ou modifiés (batchs, reprises avec backoff)
+    to_embed = {chunk["id"]: chunk for chunk in primary_changes + local_changes}
+    values_by_id = {}
+    if to_embed:
+        embeddings = await embedding_service.embed_documents(
+            [chunk["text"] for chunk in to_embed.values()]
+        )
+        values_by_id = dict(zip(to_embed.keys(), embeddings))
+    await progress("embedding", embedded=len(to_embed))
+    
+    def with_values(changed: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Vecteurs sans texte: métadonnées légères et hash du chunk
+        return [
+            {
+                "id": chunk["id"],
+                "values": values_by_id[chunk["id"]],
+                "metadata": {**chunk["metadata"], "content_hash": chunk_hash(chunk)}
+            }
+            for chunk in changed
+        ]
+    
+    # Textes écrits avant les vecteurs: un résultat de recherche a toujours son texte
+    # (comparaison avec le contenu stocké: un chunk store perdu est reconstitué)
+    chunk_store = get_chunk_store()
+    stored_texts = await chunk_store.get_many([chunk["id"] for chunk in chunks], namespace)
+    texts = {
+        chunk["id"]: chunk["text"] for chunk in chunks
+        if stored_texts.get(chunk["id"]) != chunk["text"]
+    }
+    await chunk_store.set_many(texts, namespace)
+    
+    # Upserts et suppressions en parallèle sur les moteurs
+    operations = []
+    primary_store = get_vector_store()
+    if primary_changes:
+        operations.append(primary_store.upsert_vectors(with_values(primary_changes), namespace))
+    if diff["deleted"]:
+        operations.append(primary_store.delete_vectors(diff["deleted"], namespace))
+    try:
+        await asyncio.gather(*operations)
+        # L'index local réécrit son fichier à chaque appel: opérations séquentielles
+        if local_index is not None:
+            await local_index.delete_vectors(local_orphans, namespace)
+            await local_index.upsert_vectors(with_values(local_changes), namespace)
+    except Exception as e:
+        logger.error(f"Error upserting vectors: {e}")
+        raise
+    
+    # Textes des chunks supprimés des deux moteurs
+    await chunk_store.delete_many(sorted(set(diff["deleted"]) | set(local_orphans)), namespace)
+    
+    await manifest_store.update(primary_changes, diff["deleted"], model, namespace)
+    await progress(
+        "upsert",
+        vectors_upserted=len(primary_changes),
+        vectors_deleted=len(diff["deleted"])
+    )
+    
+    changed = primary_changes or diff["deleted"] or local_changes or local_orphans or texts
+    if invalidate and changed:
+        await _invalidate_caches()
+    
+    logger.debug(
+        "Vector stores synchronized",
+        store=type(primary_store).__name__,
+        namespace=namespace,
+        local_written=len(local_changes),
+        local_deleted=len(local_orphans),
+        texts_written=len(texts)
+    )
+    return {
+        "added": len(diff["added"]),
+        "updated": len(diff["updated"]),
+        "deleted": len(diff["deleted"]),
+        "unchanged": len(diff["unchanged"]),
+        "embedded": len(to_embed),
+    }
+
+
+async def _invalidate_caches():
+    """Invalide les caches dérivés de l'index (processus courant et autres workers)"""
+    from app.services.retrieval_service import get_retrieval_service
+    get_retrieval_service().invalidate()
+    await KnowledgeBaseManifest().bump_version()
+
+
+async def index_file(file_name: str, content: str) -> Dict[str, int]:
+    """
+    Réindexe un seul fichier (après création ou modification)
+    
+    Seuls les chunks nouveaux ou modifiés du fichier sont encodés; ses
+    sections supprimées ou renommées sont retirées de l'index.
+    
+    Args:
+        file_name: Nom du fichier (metadata "source" des chunks)
+        content: Contenu markdown
+    
+    Returns:
+        Compteurs: chunks, added, updated, deleted, unchanged, embedded
+    """
+    chunks = build_chunks(file_name, content)
+    stats = {"chunks": len(chunks)}
+    namespace = await get_kb_namespaces().get_active()
+    stats.update(await _sync_chunks(chunks, namespace, sources={file_name}))
+    logger.info("Knowledge base file indexed", file_name=file_name, **stats)
+    return stats
+
+
+async def remove_file(file_name: str) -> Dict[str, int]:
+    """
+    Retire de l'index tous les chunks d'un fichier (après suppression)
+    
+    Returns:
+        Compteurs (deleted = vecteurs supprimés du moteur principal)
+    """
+    namespace = await get_kb_namespaces().get_active()
+    stats = await _sync_chunks([], namespace, sources={file_name})
+    logger.info("Knowledge base file removed from index", file_name=file_name, **stats)
+    return stats
+
+
+async def validate_namespace(namespace: str, chunks: List[Dict[str, Any]]):
+    """
+    Requêtes de contrôle sur un namespace avant son activation
+    
+    Une requête par fichier (au plus SMOKE_QUERY_COUNT): le chemin de titres
+    de son premier chunk. Chaque requête doit renvoyer des résultats et au
+    moins SMOKE_MIN_HIT_RATE d'entre elles doivent retrouver leur fichier
+    dans les SMOKE_TOP_K premiers résultats.
+    
+    Raises:
+        RuntimeError: Si le namespace ne passe pas le contrôle
+    """
+    queries: Dict[str, str] = {}
+    for chunk in chunks:
+        source = chunk["metadata"]["source"]
+        if source not in queries:
+            queries[source] = chunk["metadata"]["heading_path"]
+    queries = dict(sorted(queries.items())[:SMOKE_QUERY_COUNT])
+    if not queries:
+        raise RuntimeError(f"Namespace {namespace} is empty")
+    
+    vector_store = get_vector_store()
+    for attempt in range(1, SMOKE_ATTEMPTS + 1):
+        results = await asyncio.gather(*[
+            vector_store.search(query, top_k=SMOKE_TOP_K, namespace=namespace)
+            for query in queries.values()
+        ])
+        empty = sum(1 for documents in results if not documents)
+        hits = sum(
+            1 for source, documents in zip(queries, results)
+            if any(document["metadata"].get("source") == source for document in documents)
+        )
+        if not empty and hits / len(queries) >= SMOKE_MIN_HIT_RATE:
+            logger.info("Knowledge base namespace validated", namespace=namespace, queries=len(queries), hits=hits)
+            return
+        if attempt < SMOKE_ATTEMPTS:
+            # Index distant: les vecteurs écrits ne sont visibles qu'après quelques secondes
+            await asyncio.sleep(SMOKE_RETRY_DELAY)
+    raise RuntimeError(
+        f"Namespace {namespace} failed validation: {hits}/{len(queries)} smoke queries "
+        f"found their document, {empty} returned nothing"
+    )
+
+
+async def _drop_namespace(namespaces: KnowledgeBaseNamespaces, name: str):
+    """Supprime un namespace de tous les stockages (best effort)"""
+    namespace = None if name == LEGACY_NAMESPACE else name
+    stores = [get_vector_store()]
+    if settings.VECTOR_BACKEND != "local":
+        stores.append(LocalVectorIndex())
+    stores.append(get_chunk_store())
+    try:
+        for store in stores:
+            await store.delete_namespace(namespace)
+        await KnowledgeBaseManifest().delete(namespace)
+        await namespaces.forget(name)
+        logger.info("Knowledge base namespace dropped", namespace=name or "default")
+    except Exception as e:
+        logger.warning("Knowledge base namespace not dropped", namespace=name or "default", error=str(e))
+
+
+async def collect_garbage() -> List[str]:
+    """Supprime les anciennes versions de l'index (au-delà de KEEP_VERSIONS)"""
+    namespaces = get_kb_namespaces()
+    stale = await namespaces.stale_versions()
+    for name in stale:
+        await _drop_namespace(namespaces, name)
+    return stale
+
+
+async def _rebuild(
+    chunks: List[Dict[str, Any]],
+    failed: Set[str],
+    progress: ProgressCallback
+) -> Dict[str, Any]:
+    """
+    Reconstruction blue/green: nouveau namespace, validation, bascule, GC
+    
+    Les embeddings déjà calculés sont relus dans l'embedding store: seule
+    l'écriture des vecteurs est refaite.
+    """
+    if failed:
+        # Un fichier illisible disparaîtrait du nouvel index
+        raise RuntimeError(f"{len(failed)} file(s) could not be downloaded, index not rebuilt: {sorted(failed)}")
+    
+    namespaces = get_kb_namespaces()
+    manifest_store = KnowledgeBaseManifest()
+    version_before = await manifest_store.get_version()
+    namespace = namespaces.new_name()
+    await namespaces.register(namespace)
+    
+    try:
+        stats = await _sync_chunks(chunks, namespace, progress=progress, invalidate=False)
+        await progress("validation", namespace=namespace)
+        await validate_namespace(namespace, chunks)
+    except Exception:
+        await _drop_namespace(namespaces, namespace)
+        raise
+    
+    # Fichiers modifiés pendant la construction (mis à jour dans l'ancien namespace)
+    modified_during_build = await manifest_store.get_version() != version_before
+    previous = await namespaces.switch(namespace)
+    await _invalidate_caches()
+    await progress("switch", namespace=namespace, previous=previous)
+    
+    if modified_during_build:
+        logger.info("Knowledge base modified during rebuild, catching up", namespace=namespace)
+        await index_knowledge_base(full=False)
+    
+    await collect_garbage()
+    return {**stats, "namespace": namespace}
+
+
+async def index_knowledge_base(
+    full: bool = False,
+    progress: Optional[ProgressCallback] = None
+) -> Dict[str, Any]:
+    """Charge les fichiers markdown de la base de connaissances dans Pinecone
+    
+    Format uniforme: Tous les fichiers sont en Markdown (.md)
+    Structure standardisée:
+    - Titre principal (#)
+    - Section Contexte (##)
+    - Sections FAQ avec Q: et R: (##)
+    - Sections procédures si nécessaire (##)
+    
+    Lit maintenant depuis Supabase Storage au lieu du filesystem.
+    Téléchargements concurrents, embeddings par batch (aembed_documents, avec
+    reprises) et upserts parallèles.
+    
+    Réindexation incrémentale: le manifest (kb_index_manifest) indique les
+    chunks déjà indexés dans le namespace actif; seuls les chunks nouveaux ou
+    modifiés sont encodés, les chunks disparus sont supprimés.
+    
+    Reconstruction complète (full): construite dans un nouveau namespace,
+    validée puis activée (voir _rebuild); les recherches ne voient jamais
+    un index partiellement reconstruit.
+    
+    Args:
+        full: Reconstruit l'index dans un nouveau namespace
+        progress: Callback de progression (étapes listing, download,
+            chunking, embedding, upsert, puis validation et switch en
+            reconstruction complète)
+    
+    Returns:
+        Compteurs: files, chunks, added, updated, deleted, unchanged, embedded
+        (et namespace en reconstruction complète)
+    """
+    progress = progress or _noop_progress
+    
+    # Utiliser Supabase Storage
+    storage = KnowledgeBaseStorage()
+    files = await storage.list_files()
+    
+    # Filtrer pour ne garder que les fichiers .md (exclure README.md)
+    md_files = [f for f in files if f["path"].endswith(".md") and not f["path"].endswith("README.md")]
+    
+    logger.info(f"Found {len(md_files)} markdown knowledge files in Supabase Storage")
+    await progress("listing", files_total=len(md_files))
+    
+    stats = {"files": 0, "chunks": 0, "added": 0, "updated": 0, "deleted": 0, "unchanged": 0, "embedded": 0}
+    if not md_files:
+        # Liste vide (ou erreur de listing): ne rien supprimer
+        logger.warning("No documents to load")
+        return stats
+    
+    started = time.perf_counter()
+    downloaded, failed = await download_files(storage, md_files, progress)
+    
+    chunks = []
+    for file_data in downloaded:
+        chunks.extend(build_chunks(file_data["name"], file_data["content"]))
+    stats["files"] = len(downloaded)
+    stats["chunks"] = len(chunks)
+    await progress("chunking", files_indexed=len(downloaded), chunks=len(chunks))
+    
+    if not full:
+        # Mise à jour incrémentale du namespace actif
+        namespace = await get_kb_namespaces().get_active()
+        stats.update(await _sync_chunks(chunks, namespace, skipped_sources=failed, progress=progress))
+    else:
+        stats.update(await _rebuild(chunks, failed, progress))
+    logger.info(
+        "Knowledge base indexed",
+        elapsed_seconds=round(time.perf_counter() - started, 2),
+        **stats
+    )
+    return stats
@@ -0,0 +1,121 @@
+"""
+Namespaces versionnés de la base de connaissances (blue/green)
+
+Une réindexation complète construit un nouveau namespace (vecteurs, index
+local, chunk store, manifest) pendant que les recherches continuent d'être
+servies par le namespace actif. Une fois le nouveau namespace validé, le
+pointeur est basculé en une écriture Redis:
+
+    kb_namespace:active   -> namespace servi aux recherches
+    kb_namespace:versions -> namespaces connus (sorted set, date de création)
+
+Les versions au-delà de KEEP_VERSIONS sont supprimées après la bascule.
+Sans pointeur (base jamais reconstruite), le namespace par défaut est servi.
+"""
+import time
+from datetime import datetime
+from typing import List, Optional
+
+import structlog
+
+from app.database.redis_client import get_redis
+
+logger = structlog.get_logger()
+
+# Membre du sorted set représentant le namespace par défaut (index historique)
+LEGACY_NAMESPACE = ""
+
+
+class KnowledgeBaseNamespaces:
+    """Pointeur du namespace actif et versions de l'index"""
+
+    ACTIVE_KEY = "kb_namespace:active"
+    VERSIONS_KEY = "kb_namespace:versions"
+    NAME_PREFIX = "kb_v"
+    # Versions conservées: l'active et la précédente (retour arrière par switch())
+    KEEP_VERSIONS = 2
+    # Durée pendant laquelle un worker réutilise le pointeur lu
+    POINTER_CACHE_SECONDS = 5.0
+
+    def __init__(self):
+        self._active: Optional[str] = None
+        self._active_read_at: Optional[float] = None
+
+    def new_name(self) -> str:
+        """Nom d'un nouveau namespace (horodaté)"""
+        return f"{self.NAME_PREFIX}{datetime.utcnow():%Y%m%d%H%M%S}"
+
+    async def get_active(self) -> Optional[str]:
+        """
+        Namespace actif (None = namespace par défaut)
+
+        Lu au plus toutes les POINTER_CACHE_SECONDS; si Redis est
+        indisponible, la dernière valeur lue est conservée.
+        """
+        now = time.monotonic()
+        if self._active_read_at is not None and now - self._active_read_at < self.POINTER_CACHE_SECONDS:
+            return self._active
+        try:
+            client = await get_redis()
+            self._active = await client.get(self.ACTIVE_KEY) or None
+            self._active_read_at = now
+        except Exception as e:
+            logger.warning("Active knowledge base namespace unavailable", error=str(e))
+        return self._active
+
+    async def register(self, namespace: str):
+        """Déclare un namespace en construction (supprimé par le GC s'il n'est jamais activé)"""
+        client = await get_redis()
+        await client.zadd(self.VERSIONS_KEY, {namespace: time.time()})
+
+    async def switch(self, namespace: str) -> Optional[str]:
+        """
+        Bascule les recherches sur un namespace (écriture atomique)
+
+        Returns:
+            Namespace précédemment actif (None = namespace par défaut)
+        """
+        client = await get_redis()
+        pipe = client.pipeline(transaction=True)
+        pipe.get(self.ACTIVE_KEY)
+        pipe.set(self.ACTIVE_KEY, namespace)
+        previous, _ = await pipe.execute()
+        if not previous:
+            # Premier basculement: l'index historique devient une version à collecter
+            await client.zadd(self.VERSIONS_KEY, {LEGACY_NAMESPACE: 0})
+        self._active = namespace
+        self._active_read_at = time.monotonic()
+        logger.info("Knowledge base namespace switched", namespace=namespace, previous=previous)
+        return previous or None
+
+    async def stale_versions(self) -> List[str]:
+        """Versions à supprimer: toutes sauf l'active et les plus récentes (KEEP_VERSIONS)"""
+        client = await get_redis()
+        active = await client.get(self.ACTIVE_KEY)
+        versions = await client.zrevrange(self.VERSIONS_KEY, 0, -1)
+        kept = [active] if active else []
+        stale = []
+        for namespace in versions:
+            if namespace == active:
+                continue
+            if len(kept) < self.KEEP_VERSIONS:
+                kept.append(namespace)
+            else:
+                stale.append(namespace)
+        return stale
+
+    async def forget(self, namespace: str):
+        """Retire un namespace supprimé de la liste des versions"""
+        client = await get_redis()
+        await client.zrem(self.VERSIONS_KEY, namespace)
+
+
+_kb_namespaces: Optional[KnowledgeBaseNamespaces] = None
+
+
+def get_kb_namespaces() -> KnowledgeBaseNamespaces:
+    """Retourne le gestionnaire de namespaces partagé (pointeur mis en cache)"""
+    global _kb_namespaces
+    if _kb_namespaces is None:
+        _kb_namespaces = KnowledgeBaseNamespaces()
+    return _kb_namespaces
@@ -1,10 +1,11 @@
 """
 Service pour gérer les fichiers de la base de connaissances dans Supabase Storage
 """
+import asyncio
 import structlog
 import re
 import unicodedata
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Set
 from datetime import datetime
 from pathlib import Path
 from supabase import create_client, Client
@@ -16,6 +17,14 @@ logger = structlog.get_logger()
 # Nom du bucket Supabase Storage pour la base de connaissances
 KNOWLEDGE_BASE_BUCKET = "knowledge-base"
 
+# Mises à jour d'index d'un fichier en cours (références gardées jusqu'à la fin)
+_index_tasks: Set[asyncio.Task] = set()
+# Les mises à jour sont sérialisées (l'index local est réécrit à chaque opération)
+_index_lock: Optional[asyncio.Lock] = None
+# Verrou des jobs d'administration sur la base de connaissances (tous les workers):
+# une réindexation en cours pourrait sinon rétablir l'ancien contenu du fichier
+KNOWLEDGE_BASE_RESOURCE = "knowledge_base"
+
 
 class KnowledgeBaseStorage:
     """Service pour gérer les fichiers de la base de connaissances dans Supabase Storage"""
@@ -39,6 +48,37 @@ class KnowledgeBaseStorage:
             self.supabase_client = create_client(settings.SUPABASE_URL, self.service_key)
         return self.supabase_client.storage
     
+    def _schedule_index_update(self, normalized_path: str, content: Optional[str] = None):
+        """
+        Met à jour l'index vectoriel d'un fichier en arrière-plan
+        
+        Args:
+            normalized_path: Chemin du fichier dans Storage
+            content: Nouveau contenu (None = fichier supprimé)
+        """
+        file_name = normalized_path.split("/")[-1]
+        if file_name == "README.md":
+            return
+        
+        async def update():
+            global _index_lock
+            from app.services.kb_indexer import index_file, remove_file
+            from app.services.admin_jobs import get_job_manager
+            if _index_lock is None:
+                _index_lock = asyncio.Lock()
+            try:
+                async with _index_lock, get_job_manager().hold(KNOWLEDGE_BASE_RESOURCE):
+                    if content is None:
+                        await remove_file(file_name)
+                    else:
+                        await index_file(file_name, content)
+            except Exception as e:
+                logger.error("Knowledge base index update failed", file_name=file_name, error=str(e))
+        
+        task = asyncio.create_task(update())
+        _index_tasks.add(task)
+        task.add_done_callback(_index_tasks.discard)
+    
     def _sanitize_filename(self, filename: str) -> str:
         """
         Nettoie le nom de fichier pour être compatible avec Supabase Storage
@@ -174,8 +214,9 @@ class KnowledgeBaseStorage:
             
             storage = self._get_storage_client()
             
-            # Télécharger le fichier
-            file_content = storage.from_(self.bucket).download(normalized_path)
+            # Télécharger le fichier (client synchrone: exécuté dans un thread pour
+            # permettre des téléchargements concurrents)
+            file_content = await asyncio.to_thread(storage.from_(self.bucket).download, normalized_path)
             
             # Décoder le contenu (bytes -> string)
             content = file_content.decode('utf-8')
@@ -186,7 +227,7 @@ class KnowledgeBaseStorage:
             
             try:
                 folder = normalized_path.rsplit("/", 1)[0] if "/" in normalized_path else ""
-                file_info = storage.from_(self.bucket).list(folder)
+                file_info = await asyncio.to_thread(storage.from_(self.bucket).list, folder)
                 
                 for item in file_info:
                     if item.get("name") == file_name:
@@ -207,13 +248,14 @@ class KnowledgeBaseStorage:
             logger.error("Error getting knowledge base file from storage", error=str(e), file_path=file_path)
             return None
     
-    async def save_file(self, file_path: str, content: str) -> Optional[Dict[str, Any]]:
+    async def save_file(self, file_path: str, content: str, reindex: bool = True) -> Optional[Dict[str, Any]]:
         """
         Crée ou met à jour un fichier
         
         Args:
             file_path: Chemin du fichier (ex: "file.md" ou "procedures/file.md")
             content: Contenu du fichier
+            reindex: Met à jour l'index vectoriel du fichier en arrière-plan
             
         Returns:
             Dictionnaire avec path, name, size, modified ou None en cas d'erreur
@@ -285,6 +327,9 @@ class KnowledgeBaseStorage:
             
             logger.info("Knowledge base file saved to storage", file_path=normalized_path, bucket=self.bucket)
             
+            if reindex:
+                self._schedule_index_update(normalized_path, content)
+            
             return {
                 "path": normalized_path,  # Retourner le path normalisé (celui utilisé dans Storage)
                 "name": file_name,
@@ -296,12 +341,13 @@ class KnowledgeBaseStorage:
             logger.error("Error saving knowledge base file to storage", error=str(e), file_path=file_path)
             return None
     
-    async def delete_file(self, file_path: str) -> bool:
+    async def delete_file(self, file_path: str, reindex: bool = True) -> bool:
         """
         Supprime un fichier
         
         Args:
             file_path: Chemin du fichier
+            reindex: Retire les vecteurs du fichier de l'index en arrière-plan
             
         Returns:
             True si succès, False sinon
@@ -329,6 +375,9 @@ class KnowledgeBaseStorage:
             
             logger.info("Knowledge base file deleted from storage", file_path=normalized_path)
             
+            if reindex:
+                self._schedule_index_update(normalized_path)
+            
             return True
             
         except Exception as e:
@@ -10,6 +10,7 @@ from app.agents.macos_agent import MacOSAgent
 from app.agents.workspace_agent import WorkspaceAgent
 from app.agents.knowledge_agent import KnowledgeAgent
 from app.agents.odoo_ticket_agent import OdooTicketAgent
+from app.services.procedure_progress import get_procedure_progress
 from app.services.ticket_validator import TicketValidator
 from app.core.config import settings
 
@@ -26,6 +27,7 @@ class LangGraphSwarm:
         self.knowledge_agent = KnowledgeAgent()
         self.ticket_agent = OdooTicketAgent()
         self.ticket_validator = TicketValidator()
+        self.procedure_progress = get_procedure_progress()
         
         # Construction du graphe LangGraph
         self.graph = self._build_graph()
@@ -165,13 +167,18 @@ class LangGraphSwarm:
         
         if validation.get("should_create", False):
             try:
+                # Réponses collectées par la procédure en cours (description structurée)
+                progress = await self.procedure_progress.current(state["session_id"])
                 ticket = await self.ticket_agent.create_ticket(
                     user_id=state["user_id"],
                     session_id=state["session_id"],
                     issue_description=state["message"],
                     conversation_history=state.get("history", []),
-                    agent_used=state.get("agent_used", "unknown")
+                    agent_used=state.get("agent_used", "unknown"),
+                    procedure_progress=progress
                 )
+                if progress:
+                    await self.procedure_progress.clear(state["session_id"])
                 
                 state["ticket_created"] = True
                 state["ticket_id"] = ticket.get("id")
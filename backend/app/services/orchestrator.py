@@ -586,13 +586,17 @@ class OrchestratorService:
         
         # Forcer la création du ticket
         try:
+            progress = await swarm.procedure_progress.current(session_id)
             ticket = await ticket_agent.create_ticket(
                 user_id=user_id,
                 session_id=session_id,
                 issue_description=message,
                 conversation_history=history,
-                agent_used=response.get("agent", "unknown")
+                agent_used=response.get("agent", "unknown"),
+                procedure_progress=progress
             )
+            if progress:
+                await swarm.procedure_progress.clear(session_id)
             
             ticket_message = (
                 f"{response.get('message', '')}\n\n"
@@ -0,0 +1,195 @@
+"""
+Index des procédures en mémoire
+
+Les procédures ne sont que quelques dizaines: elles sont chargées une fois
+(au démarrage) depuis la table procedures de Supabase, ou à défaut depuis
+knowledge_base/procedures.json et standard_procedures.json. La recherche
+d'une procédure pour un message ne fait alors aucun appel réseau:
+- similarité cosinus avec l'embedding du message (celui de la recherche
+  documentaire, déjà calculé)
+- score BM25 sur le titre, la catégorie, la description et les questions
+- fragment de prompt précompilé (procedure_prompt), vérifié au chargement
+
+Invalidation: load_procedures_to_supabase.py incrémente
+procedure_index:version dans Redis (voir versioned_index).
+"""
+import json
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Set
+
+import numpy as np
+import structlog
+
+from app.services.bm25_index import BM25Index
+from app.services.embedding_service import get_embedding_service
+from app.services.procedure_prompt import compile_procedure_prompt, is_prompt_current
+from app.services.procedure_service import ProcedureService
+from app.services.versioned_index import VersionedIndex
+
+logger = structlog.get_logger()
+
+# Fichiers de repli (backend/knowledge_base) si Supabase est indisponible
+FALLBACK_FILES = [
+    Path(__file__).parent.parent.parent / "knowledge_base" / "procedures.json",
+    Path(__file__).parent.parent.parent / "knowledge_base" / "standard_procedures.json",
+]
+
+
+def procedure_search_text(procedure: Dict[str, Any]) -> str:
+    """Texte indexé d'une procédure (mots-clés et embedding)"""
+    questions = " ".join(procedure.get("diagnostic_questions") or [])
+    return "\n".join(
+        part for part in (
+            procedure.get("title", ""),
+            procedure.get("category", ""),
+            procedure.get("description", ""),
+            questions,
+        ) if part
+    )
+
+
+class ProcedureIndex(VersionedIndex):
+    """Procédures en mémoire avec recherche par mots-clés et embeddings"""
+
+    NAME = "procedures"
+    VERSION_KEY = "procedure_index:version"
+    # Similarité cosinus minimale d'une procédure retenue
+    MIN_SIMILARITY = 0.45
+    # Poids du score mots-clés (normalisé) dans le score combiné
+    KEYWORD_WEIGHT = 0.2
+    # Sans embedding: part minimale des termes de la requête trouvés
+    KEYWORD_MIN_COVERAGE = 0.6
+
+    def __init__(self):
+        super().__init__()
+        self.procedure_service = ProcedureService()
+        self.procedures: List[Dict[str, Any]] = []
+        self._keywords: Optional[BM25Index] = None
+        self._matrix: Optional[np.ndarray] = None
+
+    async def _fetch(self) -> List[Dict[str, Any]]:
+        """Procédures depuis Supabase, ou depuis les fichiers JSON en repli"""
+        try:
+            procedures = await self.procedure_service.get_all_procedures()
+            if procedures:
+                return procedures
+            logger.warning("No procedures in Supabase, loading JSON files")
+        except Exception as e:
+            logger.warning("Procedures unavailable in Supabase, loading JSON files", error=str(e))
+
+        procedures = []
+        seen: Set[tuple] = set()
+        for path in FALLBACK_FILES:
+            if not path.exists():
+                continue
+            for procedure in json.loads(path.read_text(encoding="utf-8")):
+                key = (procedure["category"], procedure["title"])
+                if key not in seen:
+                    seen.add(key)
+                    procedures.append(procedure)
+        return procedures
+
+    async def _rebuild(self) -> Dict[str, Any]:
+        """Recharge les procédures, leurs embeddings et leurs prompts"""
+        procedures = await self._fetch()
+
+        for procedure in procedures:
+            procedure.setdefault("id", f"{procedure['category']}:{procedure['title']}")
+            # Fragment précompilé réutilisé tel quel, recalculé s'il n'est plus à jour
+            if not is_prompt_current(procedure):
+                compile_procedure_prompt(procedure)
+
+        texts = [procedure_search_text(procedure) for procedure in procedures]
+        keywords = BM25Index([
+            {"id": procedure["id"], "text": text} for procedure, text in zip(procedures, texts)
+        ]) if procedures else None
+
+        # Embeddings relus dans l'embedding store (encodés une seule fois)
+        matrix = None
+        if procedures:
+            try:
+                vectors = np.asarray(await get_embedding_service().embed_documents(texts), dtype=np.float32)
+                norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+                norms[norms == 0] = 1.0
+                matrix = vectors / norms
+            except Exception as e:
+                logger.warning("Procedure embeddings unavailable, keyword matching only", error=str(e))
+
+        self.procedures, self._keywords, self._matrix = procedures, keywords, matrix
+        return {"procedures": len(procedures), "embeddings": matrix is not None}
+
+    def get(self, procedure_id: str) -> Optional[Dict[str, Any]]:
+        """Procédure indexée par ID (avec son prompt rendu)"""
+        for procedure in self.procedures:
+            if str(procedure["id"]) == str(procedure_id):
+                return procedure
+        return None
+
+    async def match(
+        self,
+        message: str,
+        category: Optional[str] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Procédure la plus pertinente pour un message
+
+        Args:
+            message: Message utilisateur
+            category: Limite la recherche à une catégorie (optionnel)
+            query_embedding: Embedding du message; sans embedding, seuls les
+                mots-clés sont utilisés (aucun appel réseau dans les deux cas)
+
+        Returns:
+            Procédure (avec "prompt", "score" et "score_source": similarité
+            cosinus si "embedding", part des termes trouvés si "keywords") ou
+            None si aucune n'est assez proche
+        """
+        await self.ensure_fresh()
+        if not self.procedures:
+            return None
+
+        candidates = [
+            i for i, procedure in enumerate(self.procedures)
+            if not category or procedure["category"] == category
+        ]
+        if not candidates:
+            return None
+
+        keyword_scores = np.zeros(len(self.procedures), dtype=np.float32)
+        coverage = np.zeros(len(self.procedures), dtype=np.float32)
+        if self._keywords is not None:
+            positions = {procedure["id"]: i for i, procedure in enumerate(self.procedures)}
+            for result in self._keywords.search(message, top_k=len(self.procedures)):
+                i = positions[result["id"]]
+                keyword_scores[i] = result["score"]
+                coverage[i] = result["matched_terms"] / max(result["query_terms"], 1)
+            if keyword_scores.max() > 0:
+                keyword_scores = keyword_scores / keyword_scores.max()
+
+        if query_embedding is not None and self._matrix is not None:
+            query = np.asarray(query_embedding, dtype=np.float32)
+            norm = np.linalg.norm(query)
+            similarities = self._matrix @ (query / norm if norm else query)
+            best = max(candidates, key=lambda i: similarities[i] + self.KEYWORD_WEIGHT * keyword_scores[i])
+            if similarities[best] < self.MIN_SIMILARITY:
+                return None
+            return {**self.procedures[best], "score": float(similarities[best]), "score_source": "embedding"}
+
+        best = max(candidates, key=lambda i: keyword_scores[i])
+        if coverage[best] < self.KEYWORD_MIN_COVERAGE:
+            return None
+        # Part des termes de la requête trouvés (le score BM25 normalisé vaut
+        # toujours 1 pour le meilleur candidat)
+        return {**self.procedures[best], "score": float(coverage[best]), "score_source": "keywords"}
+
+
+_procedure_index: Optional[ProcedureIndex] = None
+
+
+def get_procedure_index() -> ProcedureIndex:
+    """Retourne l'index des procédures partagé"""
+    global _procedure_index
+    if _procedure_index is None:
+        _procedure_index = ProcedureIndex()
+    return _procedure_index
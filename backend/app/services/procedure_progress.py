@@ -0,0 +1,265 @@
+"""
+Progression des procédures par session
+
+Une conversation guidée par une procédure suit ses questions de diagnostic
+une par une. Plutôt que de renvoyer la procédure complète à chaque tour et
+de laisser le LLM déduire de l'historique la question suivante, l'état est
+conservé dans Redis (session:{session_id}:procedure_progress):
+
+    procedure        -> copie des champs utiles de la procédure
+    question_index   -> prochaine question à poser
+    answers          -> [{"question", "answer"}] collectées
+
+Chaque message de l'utilisateur est la réponse à la question posée au tour
+précédent, sauf s'il change de sujet (termes orientant vers d'autres
+fichiers que ceux de la procédure, voir RetrievalService.new_topic_terms).
+Le prompt ne contient que la question suivante et les réponses collectées;
+une fois les questions épuisées, les étapes de résolution et les champs du
+ticket, donnés une seule fois: l'état est supprimé au tour suivant, qui peut
+démarrer une autre procédure. Les réponses sont aussi reprises dans la
+description du ticket Odoo.
+"""
+import json
+from datetime import datetime
+from typing import Dict, Any, Iterable, Optional
+
+import structlog
+
+from app.database.redis_client import get_redis
+from app.services.procedure_prompt import conversational_questions, render_resolution_prompt
+from app.services.retrieval_service import get_retrieval_service
+
+logger = structlog.get_logger()
+
+
+def format_collected_answers(progress: Dict[str, Any]) -> str:
+    """Réponses collectées, une par ligne ("" si aucune)"""
+    return "\n".join(
+        f"- {item['question']}: {item['answer']}"
+        for item in progress.get("answers", [])
+    )
+
+
+def render_progress_prompt(progress: Dict[str, Any]) -> str:
+    """
+    Fragment de prompt de l'étape courante d'une procédure
+
+    Contient la question suivante (ou, une fois les questions posées, les
+    étapes de résolution et la création de ticket) et les réponses collectées.
+    """
+    procedure = progress["procedure"]
+    questions = procedure["conversational_questions"]
+    index = progress["question_index"]
+    collected = format_collected_answers(progress)
+
+    formatted = f"""PROCÉDURE EN COURS: {procedure['title']}
+Description: {procedure.get('description', '')}
+"""
+    if collected:
+        formatted += f"\nINFORMATIONS DÉJÀ COLLECTÉES (ne pas redemander):\n{collected}\n"
+
+    if index < len(questions):
+        formatted += (
+            f"\nPROCHAINE QUESTION À POSER ({index + 1}/{len(questions)}, une seule, "
+            f"de manière conversationnelle):\n{questions[index]}\n"
+        )
+        return formatted
+
+    formatted += "\nToutes les questions de diagnostic ont été posées.\n"
+    formatted += render_resolution_prompt(procedure)
+    return formatted
+
+
+class ProcedureProgressTracker:
+    """État des procédures en cours, par session (Redis)"""
+
+    SESSION_KEY = "procedure_progress"
+    # Durée de vie de l'état sans nouvel échange
+    TTL_SECONDS = 86400
+    # Similarité cosinus minimale d'une autre procédure pour abandonner celle
+    # en cours (les correspondances par mots-clés ne suffisent pas)
+    SWITCH_MIN_SCORE = 0.6
+    # Longueur maximale d'une réponse conservée
+    MAX_ANSWER_CHARS = 300
+
+    def _key(self, session_id: str) -> str:
+        return f"session:{session_id}:{self.SESSION_KEY}"
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Progression de la procédure en cours (None si aucune)
+
+        Raises:
+            Exception: Si Redis est indisponible (l'appelant revient à la
+                procédure complète plutôt que de redémarrer la progression)
+        """
+        client = await get_redis()
+        value = await client.get(self._key(session_id))
+        return json.loads(value) if value else None
+
+    async def current(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Progression en cours, sans erreur (None si aucune ou Redis indisponible)"""
+        try:
+            return await self.get(session_id)
+        except Exception as e:
+            logger.warning("Procedure progress unavailable", error=str(e), session_id=session_id)
+            return None
+
+    async def _save(self, session_id: str, progress: Dict[str, Any]):
+        client = await get_redis()
+        await client.setex(self._key(session_id), self.TTL_SECONDS, json.dumps(progress, ensure_ascii=False))
+
+    async def clear(self, session_id: str):
+        """Termine la procédure en cours (ticket créé)"""
+        try:
+            client = await get_redis()
+            await client.delete(self._key(session_id))
+        except Exception as e:
+            logger.warning("Procedure progress not cleared", error=str(e), session_id=session_id)
+
+    @staticmethod
+    def is_complete(progress: Dict[str, Any]) -> bool:
+        """Toutes les questions ont-elles été posées (résolution donnée) ?"""
+        return progress["question_index"] >= len(progress["procedure"]["questions"])
+
+    async def _is_topic_shift(self, message: str, progress: Dict[str, Any]) -> bool:
+        """Le message oriente-t-il vers d'autres fichiers que ceux de la procédure ?"""
+        sources = set(progress.get("sources") or [])
+        if not sources:
+            return False
+        try:
+            terms = await get_retrieval_service().new_topic_terms(message, sources)
+        except Exception as e:
+            logger.warning("Key terms unavailable", error=str(e))
+            return False
+        return bool(terms)
+
+    def _start(self, procedure: Dict[str, Any], sources: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Nouvel état pour une procédure"""
+        return {
+            "procedure": {
+                "id": str(procedure.get("id") or f"{procedure['category']}:{procedure['title']}"),
+                "category": procedure["category"],
+                "title": procedure["title"],
+                "description": procedure.get("description", ""),
+                "questions": procedure["diagnostic_questions"],
+                "conversational_questions": procedure.get("conversational_questions") or conversational_questions(procedure),
+                "resolution_steps": procedure.get("resolution_steps", []),
+                "ticket_creation": procedure.get("ticket_creation", {}),
+            },
+            "question_index": 0,
+            "answers": [],
+            "sources": sorted({source for source in (sources or []) if source}),
+            "started_at": datetime.utcnow().isoformat(),
+        }
+
+    async def advance(
+        self,
+        session_id: str,
+        message: str,
+        procedure: Optional[Dict[str, Any]] = None,
+        sources: Optional[Iterable[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Met à jour la progression avec le message de l'utilisateur
+
+        Args:
+            session_id: ID de la session
+            message: Message de l'utilisateur (réponse à la question précédente)
+            procedure: Procédure trouvée pour ce message (optionnel); démarre
+                une progression si aucune n'est en cours (ou si celle en cours
+                est terminée), ou remplace celle en cours si c'est une autre
+                procédure d'une similarité suffisante ou si le message change
+                de sujet
+            sources: Fichiers des documents trouvés pour ce message (sujet de
+                la procédure démarrée, pour détecter un changement de sujet)
+
+        Returns:
+            Progression à jour, ou None (pas de procédure à questions,
+            changement de sujet, résolution déjà donnée, Redis indisponible)
+        """
+        try:
+            progress = await self.get(session_id)
+            if progress is not None and self.is_complete(progress):
+                # Résolution donnée au tour précédent: la procédure est terminée
+                await self.clear(session_id)
+                progress = None
+            started = self._start(procedure, sources) if procedure and procedure.get("diagnostic_questions") else None
+            if progress is None:
+                if started is None:
+                    return None
+                progress = started
+            elif started and started["procedure"]["id"] == progress["procedure"]["id"]:
+                progress = await self._record_answer(session_id, message, progress)
+            elif started and procedure.get("score_source", "embedding") == "embedding" \
+                    and (procedure.get("score") or 0) >= self.SWITCH_MIN_SCORE:
+                logger.info(
+                    "Procedure switched",
+                    session_id=session_id,
+                    previous=progress["procedure"]["title"],
+                    procedure=procedure["title"]
+                )
+                progress = started
+            else:
+                answered = await self._record_answer(session_id, message, progress)
+                if answered is None and started:
+                    logger.info(
+                        "Procedure switched on topic shift",
+                        session_id=session_id,
+                        previous=progress["procedure"]["title"],
+                        procedure=procedure["title"]
+                    )
+                progress = answered or started
+            if progress is None:
+                return None
+
+            await self._save(session_id, progress)
+            logger.debug(
+                "Procedure progress updated",
+                session_id=session_id,
+                procedure=progress["procedure"]["title"],
+                question_index=progress["question_index"]
+            )
+            return progress
+        except Exception as e:
+            logger.warning("Procedure progress unavailable", error=str(e), session_id=session_id)
+            return None
+
+    async def _record_answer(
+        self,
+        session_id: str,
+        message: str,
+        progress: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Enregistre le message comme réponse à la question en cours
+
+        Returns:
+            Progression avancée, ou None si le message change de sujet (la
+            question reste en attente, l'état n'est pas modifié)
+        """
+        if await self._is_topic_shift(message, progress):
+            logger.debug(
+                "Procedure answer skipped on topic shift",
+                session_id=session_id,
+                procedure=progress["procedure"]["title"]
+            )
+            return None
+        index = progress["question_index"]
+        progress["answers"].append({
+            "question": progress["procedure"]["questions"][index],
+            "answer": message.strip()[:self.MAX_ANSWER_CHARS]
+        })
+        progress["question_index"] = index + 1
+        return progress
+
+
+_procedure_progress: Optional[ProcedureProgressTracker] = None
+
+
+def get_procedure_progress() -> ProcedureProgressTracker:
+    """Retourne le suivi de progression partagé"""
+    global _procedure_progress
+    if _procedure_progress is None:
+        _procedure_progress = ProcedureProgressTracker()
+    return _procedure_progress
@@ -0,0 +1,182 @@
+"""
+Fragments de prompt des procédures (précompilés)
+
+Le texte injecté dans le prompt pour une procédure ne dépend que de la
+procédure: il est calculé une fois, à la génération des fichiers JSON
+(parse_standard_procedures.py) et au chargement dans Supabase
+(load_procedures_to_supabase.py), avec:
+- conversational_questions: questions de diagnostic reformulées
+- prompt: fragment complet, réutilisé tel quel par les agents
+- prompt_hash: empreinte des champs sources et de PROMPT_FORMAT_VERSION
+
+Un fragment dont l'empreinte ne correspond plus aux champs sources (procédure
+modifiée sans recompilation, format changé) est recalculé à la lecture.
+Le fragment étant identique d'une requête à l'autre, il peut être mis en
+cache par les fournisseurs LLM (préfixe de prompt stable).
+"""
+import hashlib
+import json
+from typing import Dict, Any, List, Optional
+
+# À incrémenter à chaque changement de render_procedure_prompt ou des reformulations
+PROMPT_FORMAT_VERSION = 1
+
+# Champs dont dépend le fragment
+SOURCE_FIELDS = ("title", "description", "diagnostic_questions", "resolution_steps", "ticket_creation", "common_issues")
+
+
+def make_question_conversational(question: str) -> str:
+    """
+    Reformule une question de procédure pour qu'elle soit plus conversationnelle
+    """
+    question_lower = question.lower().strip()
+    original = question.strip()
+
+    # Cas spécifiques de reformulation
+    if "identifier la personne" in question_lower:
+        return "Quel est le nom de la personne ?"
+
+    if "identifier la personne + board" in question_lower or "identifier la personne + board" in question_lower:
+        return "Quel est le nom de la personne et quel board Monday exactement ?"
+
+    if "demander les détails" in question_lower:
+        if "nom" in question_lower and "société" in question_lower:
+            return "J'aurais besoin de son nom complet, sa société/bench, son pays et sa fonction. Vous avez ces infos ?"
+        return "J'aurais besoin de quelques infos supplémentaires. Vous les avez sous la main ?"
+
+    if "demander la raison" in question_lower or "raison de la demande" in question_lower:
+        return "Pourriez-vous me dire pourquoi vous avez besoin d'accéder à ce dossier ? Ça m'aiderait à comprendre la situation."
+
+    if "identifier la criticité" in question_lower:
+        return "À quel point c'est urgent pour vous ?"
+
+    if "analyser si c'est possible" in question_lower or "analyser" in question_lower and "licence" in question_lower:
+        return "Est-ce qu'il pourrait avoir un accès sans licence (invité/observateur) ou il lui faut une licence complète ?"
+
+    if "demander si validation n+1" in question_lower or "validation n+1" in question_lower:
+        return "Avez-vous la validation de son N+1 pour cette licence ?"
+
+    if "identifier le macbook" in question_lower:
+        return "Quel est le numéro de série de votre MacBook ? (vous le trouvez dans À propos de ce Mac)"
+
+    if "vérifier si macbook jamfé" in question_lower:
+        return "Votre MacBook est-il géré par l'équipe IT ? (normalement oui si c'est un MacBook de l'entreprise)"
+
+    # Remplacements génériques
+    if original.startswith("Identifier"):
+        rest = original.replace("Identifier ", "").replace("identifier ", "")
+        if "personne" in rest.lower():
+            return f"Quel est le nom de {rest.lower()} ?"
+        return f"Quel est {rest.lower()} ?"
+
+    if original.startswith("Demander"):
+        rest = original.replace("Demander ", "").replace("demander ", "")
+        return f"J'aurais besoin de {rest.lower()}. Vous avez ça ?"
+
+    if original.startswith("Analyser"):
+        rest = original.replace("Analyser ", "").replace("analyser ", "")
+        return f"Pourriez-vous me dire {rest.lower()} ?"
+
+    if original.startswith("Vérifier"):
+        rest = original.replace("Vérifier ", "").replace("vérifier ", "")
+        return f"Est-ce que {rest.lower()} ?"
+
+    # Si la question est déjà bien formulée, la retourner telle quelle
+    if original.endswith("?") or "?" in original:
+        return original
+
+    # Sinon, ajouter un point d'interrogation
+    return original + " ?"
+
+
+def procedure_prompt_hash(procedure: Dict[str, Any]) -> str:
+    """Empreinte des champs sources d'une procédure (et du format du fragment)"""
+    payload = {field: procedure.get(field) for field in SOURCE_FIELDS}
+    payload["format_version"] = PROMPT_FORMAT_VERSION
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+def conversational_questions(procedure: Dict[str, Any]) -> List[str]:
+    """Questions de diagnostic reformulées"""
+    return [
+        make_question_conversational(question)
+        for question in procedure.get("diagnostic_questions") or []
+    ]
+
+
+def render_procedure_prompt(procedure: Dict[str, Any], questions: Optional[List[str]] = None) -> str:
+    """
+    Formate une procédure pour l'inclure dans un prompt
+    Les questions sont listées mais doivent être posées UNE PAR UNE de manière conversationnelle
+
+    Args:
+        procedure: Procédure structurée
+        questions: Questions déjà reformulées (optionnel, calculées sinon)
+    """
+    if questions is None:
+        questions = conversational_questions(procedure)
+    formatted = f"""PROCÉDURE: {procedure['title']}
+Description: {procedure.get('description', '')}
+
+QUESTIONS DE DIAGNOSTIC À POSER (UNE PAR UNE, dans l'ordre, de manière conversationnelle):
+"""
+    for i, question in enumerate(questions, 1):
+        formatted += f"{i}. {question}\n"
+
+    formatted += render_resolution_prompt(procedure)
+
+    if procedure.get("common_issues"):
+        formatted += "\nPROBLÈMES FRÉQUENTS:\n"
+        for issue in procedure["common_issues"]:
+            formatted += f"- {issue}\n"
+
+    return formatted
+
+
+def render_resolution_prompt(procedure: Dict[str, Any]) -> str:
+    """Étapes de résolution et création de ticket d'une procédure"""
+    formatted = "\nÉTAPES DE RÉSOLUTION:\n"
+    for step in procedure.get("resolution_steps", []):
+        admin_note = " (nécessite droits admin)" if step.get("requires_admin") else ""
+        formatted += f"Étape {step['step']}: {step['action']}{admin_note}\n"
+        if step.get("details"):
+            formatted += f"  → {step['details']}\n"
+
+    ticket_info = procedure.get("ticket_creation", {})
+    if ticket_info:
+        formatted += f"\nCRÉATION DE TICKET ODOO:\n"
+        formatted += f"Quand: {ticket_info.get('when', 'Si nécessaire')}\n"
+        fields = ticket_info.get("required_fields", {})
+        if fields:
+            formatted += "Champs requis:\n"
+            for field, value in fields.items():
+                formatted += f"  - {field}: {value}\n"
+
+    return formatted
+
+
+def compile_procedure_prompt(procedure: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Précalcule les questions reformulées, le fragment et son empreinte
+
+    Returns:
+        La procédure (modifiée sur place) avec conversational_questions,
+        prompt et prompt_hash
+    """
+    procedure["conversational_questions"] = conversational_questions(procedure)
+    procedure["prompt"] = render_procedure_prompt(procedure, procedure["conversational_questions"])
+    procedure["prompt_hash"] = procedure_prompt_hash(procedure)
+    return procedure
+
+
+def is_prompt_current(procedure: Dict[str, Any]) -> bool:
+    """Le fragment précompilé correspond-il encore à la procédure ?"""
+    return bool(procedure.get("prompt")) and procedure.get("prompt_hash") == procedure_prompt_hash(procedure)
+
+
+def get_procedure_prompt(procedure: Dict[str, Any]) -> str:
+    """Fragment de la procédure: précompilé s'il est à jour, sinon calculé"""
+    if is_prompt_current(procedure):
+        return procedure["prompt"]
+    return render_procedure_prompt(procedure)
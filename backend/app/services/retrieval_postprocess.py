@@ -0,0 +1,120 @@
+"""
+Post-traitement des résultats de recherche
+
+Les chunks consécutifs d'une section se recouvrent et un index non encore
+réindexé peut contenir des vecteurs de documents complets (kb_doc_*): sans
+post-traitement, le même contenu peut apparaître plusieurs fois dans le prompt.
+
+Étapes:
+1. fusion parent/enfant par source: un document complet est écarté dès
+   qu'un chunk du même fichier est retenu, les textes identiques sont dédoublonnés
+2. diversification MMR (maximal marginal relevance): similarité entre
+   chunks mesurée par Jaccard sur les termes analysés (pas de vecteurs requis)
+3. remplissage d'un budget de tokens plutôt qu'un top_k fixe
+"""
+import hashlib
+from typing import Callable, List, Dict, Any, Optional, Set
+
+from app.services.french_analyzer import analyze, fold_accents
+
+# Compromis pertinence / diversité de MMR (1.0 = pertinence seule)
+MMR_LAMBDA = 0.7
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation rapide du nombre de tokens (≈ 4 caractères par token)"""
+    return max(1, len(text) // 4)
+
+
+def is_full_document(document: Dict[str, Any]) -> bool:
+    """Indique si le résultat est le vecteur d'un document complet"""
+    metadata = document.get("metadata") or {}
+    return metadata.get("section") == "full_document" or str(document.get("id", "")).startswith("kb_doc_")
+
+
+def collapse_by_source(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Supprime les recouvrements parent/enfant et les doublons exacts
+
+    Args:
+        documents: Résultats triés par pertinence décroissante
+
+    Returns:
+        Résultats filtrés, ordre conservé
+    """
+    sources_with_sections = {
+        (document.get("metadata") or {}).get("source")
+        for document in documents
+        if not is_full_document(document)
+    }
+
+    collapsed = []
+    seen_texts: Set[str] = set()
+    for document in documents:
+        source = (document.get("metadata") or {}).get("source")
+        if source and is_full_document(document) and source in sources_with_sections:
+            continue
+        text_key = hashlib.sha1(" ".join(fold_accents(document.get("text", "")).split()).encode("utf-8")).hexdigest()
+        if text_key in seen_texts:
+            continue
+        seen_texts.add(text_key)
+        collapsed.append(document)
+    return collapsed
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    """Similarité de Jaccard entre deux ensembles de termes"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def mmr_select(
+    documents: List[Dict[str, Any]],
+    top_k: int,
+    token_budget: Optional[int] = None,
+    mmr_lambda: float = MMR_LAMBDA,
+    count_tokens: Callable[[str], int] = estimate_tokens
+) -> List[Dict[str, Any]]:
+    """
+    Sélectionne des résultats pertinents et variés dans la limite d'un budget
+
+    Args:
+        documents: Candidats avec un "score" (plus haut = plus pertinent)
+        top_k: Nombre maximum de résultats
+        token_budget: Budget total de tokens (optionnel); un candidat qui
+            dépasserait le budget est ignoré au profit des suivants
+        mmr_lambda: Poids de la pertinence face à la diversité
+        count_tokens: Fonction de comptage des tokens
+
+    Returns:
+        Résultats sélectionnés, dans l'ordre de sélection
+    """
+    if not documents or top_k <= 0:
+        return []
+
+    max_score = max(document.get("score") or 0.0 for document in documents) or 1.0
+    relevance = [(document.get("score") or 0.0) / max_score for document in documents]
+    terms = [set(analyze(document.get("text", ""))) for document in documents]
+
+    selected: List[int] = []
+    remaining = list(range(len(documents)))
+    used_tokens = 0
+
+    while remaining and len(selected) < top_k:
+        best = max(
+            remaining,
+            key=lambda i: mmr_lambda * relevance[i] - (1 - mmr_lambda) * max(
+                (_jaccard(terms[i], terms[j]) for j in selected),
+                default=0.0
+            )
+        )
+        remaining.remove(best)
+
+        tokens = count_tokens(documents[best].get("text", ""))
+        if token_budget is not None and used_tokens + tokens > token_budget:
+            continue
+        selected.append(best)
+        used_tokens += tokens
+
+    return [documents[i] for i in selected]
@@ -0,0 +1,412 @@
+"""
+Service de recherche hybride (BM25 + vectoriel)
+
+Combine deux classements par fusion des rangs réciproques (RRF):
+- BM25 (analyseur français) sur les mêmes chunks que l'index vectoriel
+- recherche vectorielle du moteur configuré (Pinecone ou index local)
+
+Le corpus BM25 est lu dans l'index vectoriel local, reconstruit à chaque
+réindexation par load_knowledge_base.py (mêmes IDs de chunks que Pinecone).
+À défaut, les fichiers markdown de data/knowledge_base sont indexés (même
+découpage, kb_chunker).
+
+Les vecteurs ne portent pas le texte des chunks: il est lu dans le chunk
+store pour les seuls candidats retenus par la fusion.
+
+Sans namespace explicite, la recherche porte sur le namespace actif de la
+base de connaissances (pointeur Redis, voir kb_namespaces): une
+reconstruction complète n'est visible qu'une fois validée et activée.
+
+Quand une requête courte trouve tous ses termes dans un document, le
+classement BM25 suffit: l'appel d'embedding est évité.
+
+Les agents spécialisés restreignent la recherche à leurs catégories
+(metadata_filter, appliqué par le moteur vectoriel et sur le classement
+BM25), avec repli sur tout l'index si les résultats filtrés sont faibles.
+
+Les résultats fusionnés sont dédoublonnés par source puis diversifiés (MMR)
+dans la limite d'un budget de tokens (voir retrieval_postprocess).
+"""
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Set, Tuple
+
+import structlog
+
+from app.database.local_vector_index import LocalVectorIndex
+from app.database.pgvector_store import PgVectorStore
+from app.database.vector_store import get_vector_store, matches_filter
+from app.services.bm25_index import BM25Index
+from app.services.chunk_store import get_chunk_store
+from app.services.embedding_service import get_embedding_service
+from app.services.french_analyzer import analyze
+from app.services.kb_chunker import build_chunks
+from app.services.kb_namespaces import get_kb_namespaces
+from app.services.procedure_service import ProcedureService
+from app.services.retrieval_postprocess import collapse_by_source, mmr_select
+
+logger = structlog.get_logger()
+
+# Base de connaissances markdown livrée avec le dépôt (corpus de secours)
+KNOWLEDGE_BASE_DIR = Path(__file__).parent.parent.parent / "data" / "knowledge_base"
+
+
+class RetrievalService:
+    """Recherche hybride BM25 + vectorielle avec fusion RRF"""
+
+    # Constante de lissage RRF (valeur usuelle)
+    RRF_K = 60
+    # Candidats minimum demandés à chaque moteur avant fusion
+    MIN_CANDIDATES = 10
+    # Une requête de plus de N termes n'est jamais servie par BM25 seul
+    EXACT_MATCH_MAX_TERMS = 4
+    # Recherche filtrée: en dessous de cette similarité (meilleur résultat
+    # vectoriel), la recherche est refaite sur tout l'index
+    FILTER_MIN_SCORE = 0.3
+    # Terme discriminant (new_topic_terms): IDF minimal dans le corpus BM25
+    KEY_TERM_MIN_IDF = 1.5
+
+    def __init__(self):
+        self.vector_store = get_vector_store()
+        self.corpus_index = LocalVectorIndex()
+        self.procedure_service = ProcedureService()
+        # namespace -> (version du corpus, index BM25)
+        self._bm25: Dict[str, Tuple[Any, BM25Index]] = {}
+        # namespace -> version du corpus signalé vide
+        self._bm25_missing: Dict[str, Any] = {}
+
+    def _markdown_files(self) -> List[Path]:
+        """Fichiers markdown du corpus de secours"""
+        return sorted(
+            path for path in KNOWLEDGE_BASE_DIR.rglob("*.md")
+            if path.name != "README.md"
+        )
+
+    def _markdown_version(self, files: List[Path]) -> Tuple[str, int, int]:
+        """Version du corpus de secours (date de modification la plus récente)"""
+        return ("files", max((path.stat().st_mtime_ns for path in files), default=0), len(files))
+
+    def _load_markdown_documents(self, files: List[Path]) -> List[Dict[str, Any]]:
+        """Corpus de secours: sections des fichiers markdown de data/knowledge_base"""
+        documents = []
+        for path in files:
+            documents.extend(build_chunks(path.name, path.read_text(encoding="utf-8")))
+        return documents
+
+    async def _hydrate(
+        self,
+        documents: List[Dict[str, Any]],
+        namespace: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        Complète le texte des documents depuis le chunk store
+
+        Les documents sans texte après lecture (chunk store incomplet) sont écartés.
+        """
+        missing = [document["id"] for document in documents if not document.get("text")]
+        if missing:
+            try:
+                texts = await get_chunk_store().get_many(missing, namespace=namespace)
+            except Exception as e:
+                logger.warning("Chunk store unavailable", error=str(e))
+                texts = {}
+            for document in documents:
+                if not document.get("text"):
+                    document["text"] = texts.get(document["id"], "")
+            if len(texts) < len(missing):
+                logger.warning("Chunk texts missing", count=len(missing) - len(texts))
+        return [document for document in documents if document.get("text")]
+
+    async def _get_bm25(self, namespace: Optional[str]) -> Optional[BM25Index]:
+        """Retourne l'index BM25 du namespace, reconstruit si le corpus a changé"""
+        key = namespace or ""
+        cached = self._bm25.get(key)
+
+        version: Any = self.corpus_index.get_version(namespace)
+        files: List[Path] = []
+        if not version and namespace is None:
+            files = self._markdown_files()
+            version = self._markdown_version(files)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        if files:
+            documents = self._load_markdown_documents(files)
+        else:
+            version, documents = self.corpus_index.get_documents(namespace)
+            documents = await self._hydrate(documents, namespace)
+        if not documents:
+            # Signalé une fois par version du corpus (pas à chaque recherche)
+            if self._bm25_missing.get(key) != version:
+                self._bm25_missing[key] = version
+                logger.warning(
+                    "BM25 corpus missing, vector search only (reindex or check the data volume)",
+                    namespace=key or "default"
+                )
+            return None
+
+        index = BM25Index(documents)
+        self._bm25[key] = (version, index)
+        logger.info("BM25 index built", namespace=key or "default", documents=len(index))
+        return index
+
+    def invalidate(self, namespace: Optional[str] = None):
+        """Oublie l'index BM25 (tous les namespaces par défaut): reconstruit à la recherche suivante"""
+        if namespace is None:
+            self._bm25.clear()
+        else:
+            self._bm25.pop(namespace, None)
+
+    async def new_topic_terms(
+        self,
+        text: str,
+        sources: Set[str],
+        namespace: Optional[str] = None
+    ) -> Optional[Set[str]]:
+        """
+        Termes d'un texte qui orientent vers d'autres fichiers que sources
+
+        Termes analysés (french_analyzer) discriminants dans le corpus BM25
+        (IDF d'au moins KEY_TERM_MIN_IDF) et absents de tous les chunks des
+        fichiers sources. Les termes inconnus de la base ou trop fréquents ne
+        peuvent pas changer le résultat d'une recherche et sont ignorés.
+
+        Returns:
+            Termes trouvés, ou None sans corpus BM25 (changement de sujet
+            impossible à évaluer)
+        """
+        if namespace is None:
+            namespace = await get_kb_namespaces().get_active()
+        bm25 = await self._get_bm25(namespace)
+        if not bm25:
+            return None
+        terms = set()
+        for term in analyze(text):
+            if bm25.idf.get(term, 0.0) < self.KEY_TERM_MIN_IDF:
+                continue
+            if not any(
+                bm25.documents[doc_index].get("metadata", {}).get("source") in sources
+                for doc_index, _ in bm25.postings[term]
+            ):
+                terms.add(term)
+        return terms
+
+    def _is_exact_hit(self, lexical: List[Dict[str, Any]]) -> bool:
+        """Requête courte dont tous les termes sont présents dans le meilleur document"""
+        if not lexical:
+            return False
+        best = lexical[0]
+        return (
+            best["query_terms"] <= self.EXACT_MATCH_MAX_TERMS
+            and best["matched_terms"] == best["query_terms"]
+        )
+
+    def _fuse(self, rankings: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Fusion des rangs réciproques: score = somme de 1 / (RRF_K + rang)"""
+        fused: Dict[str, Dict[str, Any]] = {}
+        for retriever, documents in rankings.items():
+            for rank, document in enumerate(documents, 1):
+                entry = fused.get(document["id"])
+                if entry is None:
+                    entry = {
+                        "id": document["id"],
+                        "text": document.get("text", ""),
+                        "metadata": document.get("metadata", {}),
+                        "score": 0.0,
+                        "retrievers": {},
+                    }
+                    fused[document["id"]] = entry
+                entry["score"] += 1.0 / (self.RRF_K + rank)
+                entry["retrievers"][retriever] = document.get("score")
+
+        return sorted(fused.values(), key=lambda entry: entry["score"], reverse=True)
+
+    def _lexical_search(
+        self,
+        bm25: Optional[BM25Index],
+        query: str,
+        candidates: int,
+        metadata_filter: Optional[Dict[str, List[str]]]
+    ) -> List[Dict[str, Any]]:
+        """Classement BM25, restreint aux documents du filtre"""
+        if not bm25:
+            return []
+        try:
+            if not metadata_filter:
+                return bm25.search(query, top_k=candidates)
+            return [
+                document for document in bm25.search(query, top_k=len(bm25))
+                if matches_filter(document.get("metadata", {}), metadata_filter)
+            ][:candidates]
+        except Exception as e:
+            logger.warning("BM25 search failed", error=str(e))
+            return []
+
+    async def _vector_search(
+        self,
+        query: str,
+        candidates: int,
+        namespace: Optional[str],
+        query_embedding: Optional[List[float]],
+        combined: bool,
+        procedure_category: Optional[str],
+        metadata_filter: Optional[Dict[str, List[str]]]
+    ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Recherche vectorielle (et procédure avec pgvector, combined)"""
+        if combined:
+            return await self.vector_store.match(
+                query,
+                top_k=candidates,
+                namespace=namespace,
+                query_embedding=query_embedding,
+                procedure_category=procedure_category,
+                with_procedure=True,
+                metadata_filter=metadata_filter
+            )
+        vector = await self.vector_store.search(
+            query,
+            top_k=candidates,
+            namespace=namespace,
+            query_embedding=query_embedding,
+            metadata_filter=metadata_filter
+        )
+        return vector, None
+
+    def _is_weak(self, vector: List[Dict[str, Any]]) -> bool:
+        """Résultats filtrés insuffisants: aucun, ou meilleure similarité trop basse"""
+        return not vector or (vector[0].get("score") or 0) < self.FILTER_MIN_SCORE
+
+    async def _search(
+        self,
+        query: str,
+        top_k: int,
+        namespace: Optional[str],
+        query_embedding: Optional[List[float]],
+        token_budget: Optional[int],
+        with_procedure: bool = False,
+        procedure_category: Optional[str] = None,
+        metadata_filter: Optional[Dict[str, List[str]]] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """Recherche hybride, et procédure la plus proche si demandée"""
+        candidates = max(top_k * 3, self.MIN_CANDIDATES)
+        if namespace is None:
+            namespace = await get_kb_namespaces().get_active()
+        # pgvector: chunks et procédure renvoyés par la même RPC
+        combined = with_procedure and isinstance(self.vector_store, PgVectorStore)
+
+        bm25 = None
+        try:
+            bm25 = await self._get_bm25(namespace)
+        except Exception as e:
+            logger.warning("BM25 index unavailable", error=str(e))
+        lexical = self._lexical_search(bm25, query, candidates, metadata_filter)
+
+        procedure = None
+        if query_embedding is None and not combined and self._is_exact_hit(lexical):
+            logger.debug(
+                "Exact-term hit, vector search skipped",
+                query_preview=query[:50],
+                best_id=lexical[0]["id"]
+            )
+            fused = self._fuse({"bm25": lexical})
+        else:
+            if query_embedding is None and not combined and (with_procedure or metadata_filter):
+                # Calculé une fois: réutilisé par l'index des procédures et par
+                # la recherche sans filtre éventuelle
+                query_embedding = await get_embedding_service().embed_query(query)
+            vector, procedure = await self._vector_search(
+                query, candidates, namespace, query_embedding, combined, procedure_category, metadata_filter
+            )
+            if metadata_filter and self._is_weak(vector):
+                logger.debug(
+                    "Filtered search too weak, searching the whole index",
+                    query_preview=query[:50],
+                    metadata_filter=metadata_filter,
+                    best_score=vector[0].get("score") if vector else None
+                )
+                lexical = self._lexical_search(bm25, query, candidates, None)
+                vector, procedure = await self._vector_search(
+                    query, candidates, namespace, query_embedding, combined, procedure_category, None
+                )
+            fused = self._fuse({"bm25": lexical, "vector": vector})
+
+        if with_procedure and not combined:
+            procedure = await self.procedure_service.find_relevant_procedure(
+                query,
+                procedure_category,
+                query_embedding=query_embedding
+            )
+
+        fused = await self._hydrate(fused, namespace)
+        return mmr_select(collapse_by_source(fused), top_k=top_k, token_budget=token_budget), procedure
+
+    async def search(
+        self,
+        query: str,
+        top_k: int = 3,
+        namespace: str = None,
+        query_embedding: Optional[List[float]] = None,
+        token_budget: Optional[int] = None,
+        metadata_filter: Optional[Dict[str, List[str]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Recherche hybride
+
+        Args:
+            query: Requête de recherche
+            top_k: Nombre maximum de résultats à retourner
+            namespace: Namespace (optionnel, namespace actif par défaut)
+            query_embedding: Embedding déjà calculé de la requête (optionnel)
+            token_budget: Budget de tokens des textes retournés (optionnel)
+            metadata_filter: Limite la recherche aux documents dont les
+                métadonnées ont l'une des valeurs admises par champ, par
+                exemple {"category": ["network_wifi"]}; recherche sur tout
+                l'index si les résultats filtrés sont trop faibles
+
+        Returns:
+            Documents {"id", "text", "metadata", "score" (RRF), "retrievers"}
+            ("retrievers": score d'origine par moteur)
+        """
+        documents, _ = await self._search(
+            query, top_k, namespace, query_embedding, token_budget, metadata_filter=metadata_filter
+        )
+        return documents
+
+    async def search_with_procedure(
+        self,
+        query: str,
+        top_k: int = 3,
+        token_budget: Optional[int] = None,
+        procedure_category: Optional[str] = None,
+        query_embedding: Optional[List[float]] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Recherche hybride et procédure la plus pertinente
+
+        Avec pgvector, un seul appel (RPC match_knowledge) renvoie les chunks
+        et la procédure structurée; sinon la procédure est recherchée par
+        l'index des procédures en mémoire (ProcedureService.find_relevant_procedure),
+        avec l'embedding de la requête déjà calculé pour la recherche vectorielle.
+
+        Returns:
+            (documents, procédure ou None)
+        """
+        return await self._search(
+            query,
+            top_k,
+            None,
+            query_embedding,
+            token_budget,
+            with_procedure=True,
+            procedure_category=procedure_category
+        )
+
+
+_retrieval_service: Optional[RetrievalService] = None
+
+
+def get_retrieval_service() -> RetrievalService:
+    """Retourne l'instance partagée du service de recherche"""
+    global _retrieval_service
+    if _retrieval_service is None:
+        _retrieval_service = RetrievalService()
+    return _retrieval_service
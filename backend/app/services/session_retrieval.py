@@ -0,0 +1,138 @@
+"""
+Mémoire de recherche par session
+
+Pendant un diagnostic, les relances ("j'ai redémarré", "toujours pareil")
+déclenchaient chacune un embedding et une recherche vectorielle, souvent
+moins pertinents qu'au premier tour car le message est très court.
+
+Les documents (et la procédure) trouvés pour le problème initial sont
+conservés dans Redis (session:{session_id}:retrieval:{scope}, un scope par
+agent) et réutilisés tant que:
+- la base de connaissances n'a pas changé (kb_manifest:version)
+- le message n'apporte aucun terme discriminant absent des fichiers dont
+  viennent les documents retenus (signal de changement de sujet, calculé
+  sur l'index BM25 en mémoire, sans appel réseau; sans corpus BM25, le
+  changement de sujet ne peut pas être évalué et la recherche est refaite)
+
+Sinon, une nouvelle recherche est faite et remplace la mémoire.
+"""
+import json
+from typing import List, Dict, Any, Optional, Tuple, Callable, Awaitable
+
+import structlog
+
+from app.database.redis_client import get_redis
+from app.services.kb_index_manifest import KnowledgeBaseManifest
+from app.services.retrieval_service import get_retrieval_service
+
+logger = structlog.get_logger()
+
+SearchResult = Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+
+class SessionRetrievalMemory:
+    """Réutilisation des résultats de recherche d'une session entre les tours"""
+
+    KEY_PREFIX = "retrieval"
+    # Durée de vie de la mémoire sans nouvelle recherche
+    TTL_SECONDS = 3600
+
+    def __init__(self):
+        self.manifest = KnowledgeBaseManifest()
+
+    def _key(self, session_id: str, scope: str) -> str:
+        return f"session:{session_id}:{self.KEY_PREFIX}:{scope}"
+
+    async def _load(self, session_id: str, scope: str) -> Optional[Dict[str, Any]]:
+        try:
+            client = await get_redis()
+            value = await client.get(self._key(session_id, scope))
+            return json.loads(value) if value else None
+        except Exception as e:
+            logger.warning("Session retrieval memory unavailable", error=str(e), session_id=session_id)
+            return None
+
+    async def _store(self, session_id: str, scope: str, entry: Dict[str, Any]):
+        try:
+            client = await get_redis()
+            await client.setex(
+                self._key(session_id, scope),
+                self.TTL_SECONDS,
+                json.dumps(entry, ensure_ascii=False, default=str)
+            )
+        except Exception as e:
+            logger.warning("Session retrieval memory not saved", error=str(e), session_id=session_id)
+
+    async def _new_terms(self, message: str, entry: Dict[str, Any]) -> Optional[List[str]]:
+        """Termes discriminants du message absents des fichiers de la mémoire (None sans corpus BM25)"""
+        terms = await get_retrieval_service().new_topic_terms(message, set(entry.get("sources", [])))
+        return sorted(terms) if terms is not None else None
+
+    async def search(
+        self,
+        session_id: str,
+        scope: str,
+        message: str,
+        search: Callable[[], Awaitable[SearchResult]]
+    ) -> SearchResult:
+        """
+        Résultats de recherche pour un message, réutilisés si possible
+
+        Args:
+            session_id: ID de la session
+            scope: Portée de la mémoire (nom de l'agent: filtres et top_k propres)
+            message: Message de l'utilisateur
+            search: Recherche à exécuter si la mémoire ne peut pas servir,
+                renvoyant (documents, procédure ou None)
+
+        Returns:
+            (documents, procédure ou None)
+        """
+        version = await self.manifest.get_version()
+        entry = await self._load(session_id, scope)
+
+        if entry and entry.get("kb_version") == version:
+            try:
+                new_terms = await self._new_terms(message, entry)
+            except Exception as e:
+                logger.warning("Key terms unavailable", error=str(e))
+                new_terms = None
+            if new_terms == []:
+                logger.debug(
+                    "Session retrieval reused",
+                    session_id=session_id,
+                    scope=scope,
+                    query_preview=message[:50]
+                )
+                return entry["documents"], entry.get("procedure")
+            logger.debug(
+                "Session retrieval refreshed",
+                session_id=session_id,
+                scope=scope,
+                new_terms=new_terms
+            )
+
+        documents, procedure = await search()
+        if not documents and not procedure:
+            # Rien à réutiliser: la recherche sera retentée au tour suivant
+            return documents, procedure
+        sources = {document.get("metadata", {}).get("source") for document in documents}
+        await self._store(session_id, scope, {
+            "kb_version": version,
+            "query": message,
+            "sources": sorted(source for source in sources if source),
+            "documents": documents,
+            "procedure": procedure,
+        })
+        return documents, procedure
+
+
+_session_retrieval: Optional[SessionRetrievalMemory] = None
+
+
+def get_session_retrieval() -> SessionRetrievalMemory:
+    """Retourne la mémoire de recherche partagée"""
+    global _session_retrieval
+    if _session_retrieval is None:
+        _session_retrieval = SessionRetrievalMemory()
+    return _session_retrieval
@@ -0,0 +1,116 @@
+"""
+Index en mémoire invalidé par un numéro de version dans Redis
+
+Base des index chargés une fois par processus (procédures, devices Jamf):
+- load(): chargement unique au démarrage, ou rechargement complet
+- notify_changed(): incrémente la version publiée (scripts de chargement);
+  chaque worker la vérifie au plus toutes les VERSION_CHECK_SECONDS
+- REFRESH_SECONDS (optionnel): rechargement périodique même sans changement
+  signalé (données mises à jour hors de ce dépôt)
+
+Les rechargements se font en arrière-plan: les recherches continuent sur
+l'index précédent, remplacé en bloc par _rebuild().
+"""
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Any, Optional
+
+import structlog
+
+from app.database.redis_client import get_redis
+
+logger = structlog.get_logger()
+
+
+class VersionedIndex(ABC):
+    """Index en mémoire rechargé quand sa version Redis change"""
+
+    # Nom de l'index dans les logs
+    NAME = "index"
+    # Clé Redis de la version publiée
+    VERSION_KEY = ""
+    # Intervalle de vérification de la version (rechargement sur un autre worker)
+    VERSION_CHECK_SECONDS = 30.0
+    # Rechargement périodique (None = uniquement sur changement de version)
+    REFRESH_SECONDS: Optional[float] = None
+
+    def __init__(self):
+        self._loaded = False
+        self._version: Optional[str] = None
+        self._version_checked_at = 0.0
+        self._loaded_at = 0.0
+        self._load_lock = asyncio.Lock()
+        self._reload_task: Optional[asyncio.Task] = None
+
+    @abstractmethod
+    async def _rebuild(self) -> Dict[str, Any]:
+        """
+        Relit les données et remplace l'index
+
+        Returns:
+            Compteurs ajoutés au log de chargement
+        """
+
+    async def _read_version(self) -> Optional[str]:
+        """Version publiée (None si Redis est indisponible)"""
+        try:
+            client = await get_redis()
+            return await client.get(self.VERSION_KEY) or "0"
+        except Exception as e:
+            logger.warning("Index version unavailable", index=self.NAME, error=str(e))
+            return None
+
+    async def load(self, force: bool = True):
+        """
+        Charge (ou recharge) l'index
+
+        Args:
+            force: Recharge même si l'index est déjà chargé (sinon, les appels
+                concurrents au premier chargement attendent un seul chargement)
+        """
+        async with self._load_lock:
+            if self._loaded and not force:
+                return
+            version = await self._read_version()
+            stats = await self._rebuild()
+            self._version = version
+            self._version_checked_at = self._loaded_at = time.monotonic()
+            self._loaded = True
+            logger.info("In-memory index loaded", index=self.NAME, **stats)
+
+    def invalidate(self):
+        """Oublie l'index: rechargé à la recherche suivante"""
+        self._loaded = False
+
+    async def notify_changed(self):
+        """Signale un rechargement à tous les workers (best effort)"""
+        self.invalidate()
+        try:
+            client = await get_redis()
+            await client.incr(self.VERSION_KEY)
+        except Exception as e:
+            logger.warning("Index version not bumped", index=self.NAME, error=str(e))
+
+    def _schedule_reload(self, reason: str, **fields):
+        """Rechargement en arrière-plan (un seul à la fois)"""
+        if self._reload_task and not self._reload_task.done():
+            return
+        logger.info("Reloading in-memory index", index=self.NAME, reason=reason, **fields)
+        self._reload_task = asyncio.create_task(self.load())
+
+    async def ensure_fresh(self):
+        """Charge l'index au premier appel; rechargement en arrière-plan s'il est périmé"""
+        if not self._loaded:
+            await self.load(force=False)
+            return
+        now = time.monotonic()
+        if self.REFRESH_SECONDS is not None and now - self._loaded_at >= self.REFRESH_SECONDS:
+            self._schedule_reload("scheduled")
+            return
+        if now - self._version_checked_at < self.VERSION_CHECK_SECONDS:
+            return
+        self._version_checked_at = now
+        version = await self._read_version()
+        if version is not None and version != self._version:
+            self._schedule_reload("changed", version=version)
@@ -11,10 +11,14 @@ from contextlib import asynccontextmanager
 from app.core.config import settings
 from app.core.logging import setup_logging
 from app.core.health_check import HealthChecker
+from app.database.pinecone_client import shutdown_pinecone_executor
 from app.api.v1.router import api_router
 from app.websocket.manager_instance import manager
 from app.services.orchestrator import OrchestratorService
 from app.services.human_support_service import HumanSupportService
+from app.services.admin_jobs import get_job_manager
+from app.services.procedure_index import get_procedure_index
+from app.services.jamf_index import get_jamf_index
 
 # Configuration du logging
 setup_logging(log_level=settings.LOG_LEVEL)
@@ -50,9 +54,22 @@ async def lifespan(app: FastAPI):
                 error=str(e),
                 exc_info=True
             )
+        
+        # Chargement de l'index des procédures (évite la latence à la première question)
+        try:
+            await get_procedure_index().load(force=False)
+        except Exception as e:
+            logger.warning("Procedure index warm-up failed", error=str(e))
+        
+        # Chargement de l'index Jamf (recherches de devices sans appel Supabase)
+        try:
+            await get_jamf_index().load(force=False)
+        except Exception as e:
+            logger.warning("Jamf index warm-up failed", error=str(e))
     
     yield
     logger.info("Shutting down VyBuddy Rebirth API")
+    shutdown_pinecone_executor()
 
 
 app = FastAPI(
@@ -391,6 +408,44 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
             pass
 
 
+
+@app.websocket("/ws/admin/jobs/{job_id}")
+async def admin_job_websocket(websocket: WebSocket, job_id: str):
+    """
+    Progression d'un job d'administration (réindexation, pipeline) en temps réel
+    Envoie l'état courant du job puis chaque événement jusqu'à la fin du job
+    """
+    token = websocket.query_params.get("token")
+    if not token:
+        await websocket.close(code=1008, reason="Authentication required")
+        return
+    
+    from app.services.auth_service import AuthService
+    from app.database.supabase_client import SupabaseClient
+    user_info = await AuthService().verify_token(token)
+    if not user_info or not await SupabaseClient().is_user_admin(user_info.get("email")):
+        await websocket.close(code=1008, reason="Admin access required")
+        return
+    
+    await websocket.accept()
+    try:
+        found = False
+        async for job in get_job_manager().watch(job_id):
+            found = True
+            await manager.send_message(websocket, {"type": "job", "job": job})
+        if not found:
+            await manager.send_message(websocket, {"type": "error", "message": "Job not found"})
+        await websocket.close(code=1000)
+    except WebSocketDisconnect:
+        logger.debug("Admin job WebSocket disconnected", job_id=job_id)
+    except Exception as e:
+        logger.error("Admin job WebSocket error", job_id=job_id, error=str(e))
+        try:
+            await websocket.close(code=1011)
+        except Exception:
+            pass
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -0,0 +1,67 @@
+-- ============================================
+-- Migration: index composites pour les requêtes chaudes
+-- ============================================
+-- À exécuter dans l'éditeur SQL de Supabase (après supabase_schema.sql,
+-- add_feedback_schema.sql et slack_integration_schema.sql)
+--
+-- Les index simples (session_id, user_id, created_at) obligent Postgres à
+-- combiner plusieurs index ou à trier en mémoire. Les requêtes émises par
+-- SupabaseClient filtrent toujours par (session_id, user_id) et trient par
+-- created_at, ou filtrent par user_id et trient par updated_at.
+--
+-- Note: en production avec beaucoup de données, préférez exécuter chaque
+-- CREATE INDEX avec CONCURRENTLY, une instruction à la fois (CONCURRENTLY
+-- n'est pas autorisé dans un bloc transactionnel).
+--
+-- Vérification: python backend/scripts/check_query_plans.py
+
+-- ============================================
+-- interactions
+-- ============================================
+-- get_conversation_messages:
+--   WHERE session_id = ? AND user_id = ? ORDER BY created_at ASC LIMIT ?
+CREATE INDEX IF NOT EXISTS idx_interactions_session_user_created
+ON interactions(session_id, user_id, created_at);
+
+-- get_agent_stats:
+--   WHERE message_type = 'bot' AND created_at >= ? GROUP BY agent_used
+CREATE INDEX IF NOT EXISTS idx_interactions_bot_created_agent
+ON interactions(created_at, agent_used)
+WHERE message_type = 'bot';
+
+-- idx_interactions_session_id est un préfixe de l'index composite: redondant
+DROP INDEX IF EXISTS idx_interactions_session_id;
+
+-- ============================================
+-- conversations
+-- ============================================
+-- get_user_conversations:
+--   WHERE user_id = ? ORDER BY updated_at DESC LIMIT ?
+CREATE INDEX IF NOT EXISTS idx_conversations_user_updated
+ON conversations(user_id, updated_at DESC);
+
+-- idx_conversations_user_id est un préfixe de l'index composite: redondant
+DROP INDEX IF EXISTS idx_conversations_user_id;
+
+-- Note: les recherches par (session_id, user_id) utilisent la contrainte
+-- UNIQUE(session_id) existante, aucun index supplémentaire n'est nécessaire.
+
+-- ============================================
+-- message_feedbacks
+-- ============================================
+-- get_user_message_feedback / get_user_message_feedbacks_batch:
+--   WHERE interaction_id IN (...) AND user_id = ?
+-- Couvert par la contrainte UNIQUE(interaction_id, user_id).
+-- idx_message_feedbacks_interaction_id est un préfixe de cette contrainte: redondant
+DROP INDEX IF EXISTS idx_message_feedbacks_interaction_id;
+
+-- ============================================
+-- admin_users
+-- ============================================
+-- is_admin_user: jointure admin_users.user_id -> users.id, filtre users.email
+-- Couvert par UNIQUE(user_id) et idx_users_email, aucun changement.
+
+-- Mise à jour des statistiques du planificateur
+ANALYZE interactions;
+ANALYZE conversations;
+ANALYZE message_feedbacks;
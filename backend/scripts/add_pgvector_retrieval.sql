@@ -0,0 +1,123 @@
+-- ============================================
+-- Migration: recherche vectorielle pgvector dans Supabase
+-- ============================================
+-- À exécuter dans l'éditeur SQL de Supabase (après supabase_schema.sql)
+--
+-- Moteur optionnel (VECTOR_BACKEND=pgvector): les vecteurs des chunks de la
+-- base de connaissances et des procédures sont stockés dans la base
+-- Postgres existante. Une seule RPC (match_knowledge) renvoie les chunks les
+-- plus proches et la procédure la plus proche avec sa ligne structurée:
+-- plus d'appel Pinecone ni de get_procedures_by_category séparé.
+--
+-- Le texte des chunks reste dans le chunk store (CHUNK_STORE): kb_chunks ne
+-- contient que l'embedding et les métadonnées légères.
+--
+-- Dimension: 1536 (text-embedding-3-small). À adapter si EMBEDDING_MODEL change.
+--
+-- Nécessite pgvector 0.8+ (parcours itératif des index HNSW): un parcours
+-- HNSW ne renvoie que hnsw.ef_search candidats, filtrés ensuite par
+-- namespace (plusieurs versions de l'index coexistent) et par catégorie;
+-- sans parcours itératif, les recherches renverraient moins de match_count
+-- chunks, voire aucun.
+
+BEGIN;
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+-- ============================================
+-- Chunks de la base de connaissances
+-- ============================================
+CREATE TABLE IF NOT EXISTS kb_chunks (
+    namespace TEXT NOT NULL DEFAULT 'default',
+    id TEXT NOT NULL,
+    embedding vector(1536) NOT NULL,
+    metadata JSONB NOT NULL DEFAULT '{}'::jsonb,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (namespace, id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_kb_chunks_embedding
+    ON kb_chunks USING hnsw (embedding vector_cosine_ops);
+
+-- ============================================
+-- Embeddings des procédures
+-- ============================================
+-- Calculés par load_procedures_to_supabase.py (titre, catégorie, description)
+ALTER TABLE procedures ADD COLUMN IF NOT EXISTS embedding vector(1536);
+
+CREATE INDEX IF NOT EXISTS idx_procedures_embedding
+    ON procedures USING hnsw (embedding vector_cosine_ops);
+
+-- ============================================
+-- Recherche combinée: chunks + procédure
+-- ============================================
+-- kind = 'chunk': id, score, metadata
+-- kind = 'procedure': id, score, procedure (ligne structurée complète)
+-- score = similarité cosinus (1 - distance)
+-- match_filter: {"champ": ["valeur", ...]} sur les métadonnées des chunks
+-- (chaque champ doit avoir l'une des valeurs), NULL = pas de filtre
+-- Parcours HNSW itératif (ordre exact): l'index est relu tant que les
+-- filtres (namespace, match_filter, catégorie) n'ont pas retenu assez de lignes
+DROP FUNCTION IF EXISTS match_knowledge(vector, TEXT, INTEGER, TEXT, INTEGER, FLOAT);
+
+CREATE OR REPLACE FUNCTION match_knowledge(
+    query_embedding vector(1536),
+    match_namespace TEXT DEFAULT 'default',
+    match_count INTEGER DEFAULT 10,
+    procedure_category TEXT DEFAULT NULL,
+    procedure_count INTEGER DEFAULT 1,
+    procedure_min_score FLOAT DEFAULT 0,
+    match_filter JSONB DEFAULT NULL
+)
+RETURNS TABLE (
+    kind TEXT,
+    id TEXT,
+    score FLOAT,
+    metadata JSONB,
+    procedure JSONB
+) AS $$
+BEGIN
+    RETURN QUERY
+    (
+        SELECT
+            'chunk'::TEXT,
+            c.id,
+            1 - (c.embedding <=> query_embedding),
+            c.metadata,
+            NULL::JSONB
+        FROM kb_chunks c
+        WHERE c.namespace = match_namespace
+          AND (
+              match_filter IS NULL
+              OR NOT EXISTS (
+                  SELECT 1 FROM jsonb_each(match_filter) f
+                  WHERE NOT COALESCE(f.value ? (c.metadata->>f.key), false)
+              )
+          )
+        ORDER BY c.embedding <=> query_embedding
+        LIMIT match_count
+    )
+    UNION ALL
+    (
+        SELECT
+            'procedure'::TEXT,
+            p.id::TEXT,
+            1 - (p.embedding <=> query_embedding),
+            NULL::JSONB,
+            -- Ligne complète sans l'embedding (inclut le fragment précompilé
+            -- si add_procedure_prompts.sql a été appliqué)
+            to_jsonb(p) - 'embedding'
+        FROM procedures p
+        WHERE procedure_count > 0
+          AND p.embedding IS NOT NULL
+          AND (procedure_category IS NULL OR p.category = procedure_category)
+          AND 1 - (p.embedding <=> query_embedding) >= procedure_min_score
+        ORDER BY p.embedding <=> query_embedding
+        LIMIT procedure_count
+    );
+END;
+$$ LANGUAGE plpgsql STABLE
+SET hnsw.iterative_scan = 'strict_order'
+SET hnsw.ef_search = 100;
+
+COMMIT;
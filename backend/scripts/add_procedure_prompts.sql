@@ -0,0 +1,17 @@
+-- ============================================
+-- Migration: fragments de prompt précompilés des procédures
+-- ============================================
+-- À exécuter dans l'éditeur SQL de Supabase (après supabase_schema.sql)
+--
+-- load_procedures_to_supabase.py enregistre pour chaque procédure les
+-- questions de diagnostic reformulées et le fragment de prompt complet,
+-- avec l'empreinte des champs sources (prompt_hash). Les agents réutilisent
+-- le fragment tel quel tant que l'empreinte correspond.
+
+BEGIN;
+
+ALTER TABLE procedures ADD COLUMN IF NOT EXISTS conversational_questions JSONB DEFAULT '[]'::jsonb;
+ALTER TABLE procedures ADD COLUMN IF NOT EXISTS prompt TEXT;
+ALTER TABLE procedures ADD COLUMN IF NOT EXISTS prompt_hash TEXT;
+
+COMMIT;
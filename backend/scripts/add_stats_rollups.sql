@@ -0,0 +1,326 @@
+-- ============================================
+-- Migration: statistiques pré-agrégées (rollups)
+-- ============================================
+-- À exécuter dans l'éditeur SQL de Supabase (après add_feedback_schema.sql
+-- et add_composite_indexes.sql)
+--
+-- get_feedback_stats et get_agent_stats agrégeaient auparavant les tables
+-- feedbacks, message_feedbacks et interactions à chaque appel. Les compteurs
+-- sont désormais maintenus incrémentalement par des triggers:
+-- - feedback_stats_totals: une seule ligne, lue en O(1) par get_feedback_stats
+-- - feedback_stats_daily: compteurs par jour (UTC)
+-- - agent_stats_daily: messages bot par jour et par agent
+--
+-- Note: les partitions archivées puis détachées (archive_interactions.py) ne
+-- déclenchent pas de DELETE: l'historique des statistiques est conservé.
+
+BEGIN;
+
+-- ============================================
+-- Tables de rollup
+-- ============================================
+CREATE TABLE IF NOT EXISTS feedback_stats_totals (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id), -- une seule ligne
+    total_feedbacks BIGINT NOT NULL DEFAULT 0,
+    rating_sum BIGINT NOT NULL DEFAULT 0,
+    rating_count BIGINT NOT NULL DEFAULT 0,
+    total_message_feedbacks BIGINT NOT NULL DEFAULT 0,
+    likes_count BIGINT NOT NULL DEFAULT 0,
+    dislikes_count BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS feedback_stats_daily (
+    day DATE PRIMARY KEY,
+    feedbacks_count BIGINT NOT NULL DEFAULT 0,
+    rating_sum BIGINT NOT NULL DEFAULT 0,
+    rating_count BIGINT NOT NULL DEFAULT 0,
+    message_feedbacks_count BIGINT NOT NULL DEFAULT 0,
+    likes_count BIGINT NOT NULL DEFAULT 0,
+    dislikes_count BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS agent_stats_daily (
+    day DATE NOT NULL,
+    agent_used TEXT NOT NULL,
+    message_count BIGINT NOT NULL DEFAULT 0,
+    content_length_sum BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, agent_used)
+);
+
+-- ============================================
+-- Fonctions d'incrément
+-- ============================================
+CREATE OR REPLACE FUNCTION bump_feedback_stats(
+    stat_day DATE,
+    d_feedbacks BIGINT,
+    d_rating_sum BIGINT,
+    d_rating_count BIGINT,
+    d_message_feedbacks BIGINT,
+    d_likes BIGINT,
+    d_dislikes BIGINT
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO feedback_stats_daily AS s (
+        day, feedbacks_count, rating_sum, rating_count,
+        message_feedbacks_count, likes_count, dislikes_count
+    )
+    VALUES (stat_day, d_feedbacks, d_rating_sum, d_rating_count, d_message_feedbacks, d_likes, d_dislikes)
+    ON CONFLICT (day) DO UPDATE SET
+        feedbacks_count = s.feedbacks_count + EXCLUDED.feedbacks_count,
+        rating_sum = s.rating_sum + EXCLUDED.rating_sum,
+        rating_count = s.rating_count + EXCLUDED.rating_count,
+        message_feedbacks_count = s.message_feedbacks_count + EXCLUDED.message_feedbacks_count,
+        likes_count = s.likes_count + EXCLUDED.likes_count,
+        dislikes_count = s.dislikes_count + EXCLUDED.dislikes_count;
+
+    INSERT INTO feedback_stats_totals AS t (
+        id, total_feedbacks, rating_sum, rating_count,
+        total_message_feedbacks, likes_count, dislikes_count, updated_at
+    )
+    VALUES (TRUE, d_feedbacks, d_rating_sum, d_rating_count, d_message_feedbacks, d_likes, d_dislikes, NOW())
+    ON CONFLICT (id) DO UPDATE SET
+        total_feedbacks = t.total_feedbacks + EXCLUDED.total_feedbacks,
+        rating_sum = t.rating_sum + EXCLUDED.rating_sum,
+        rating_count = t.rating_count + EXCLUDED.rating_count,
+        total_message_feedbacks = t.total_message_feedbacks + EXCLUDED.total_message_feedbacks,
+        likes_count = t.likes_count + EXCLUDED.likes_count,
+        dislikes_count = t.dislikes_count + EXCLUDED.dislikes_count,
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger sur feedbacks (notes de 1 à 5, nullable)
+CREATE OR REPLACE FUNCTION feedbacks_stats_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_feedback_stats(
+            (OLD.created_at AT TIME ZONE 'UTC')::DATE,
+            -1,
+            -COALESCE(OLD.rating, 0),
+            CASE WHEN OLD.rating IS NOT NULL THEN -1 ELSE 0 END,
+            0, 0, 0
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_feedback_stats(
+            (NEW.created_at AT TIME ZONE 'UTC')::DATE,
+            1,
+            COALESCE(NEW.rating, 0),
+            CASE WHEN NEW.rating IS NOT NULL THEN 1 ELSE 0 END,
+            0, 0, 0
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_feedbacks_stats ON feedbacks;
+CREATE TRIGGER trg_feedbacks_stats
+AFTER INSERT OR DELETE OR UPDATE OF rating, created_at ON feedbacks
+FOR EACH ROW EXECUTE FUNCTION feedbacks_stats_trigger();
+
+-- Trigger sur message_feedbacks (like/dislike, modifiable par l'utilisateur)
+CREATE OR REPLACE FUNCTION message_feedbacks_stats_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bump_feedback_stats(
+            (OLD.created_at AT TIME ZONE 'UTC')::DATE,
+            0, 0, 0,
+            -1,
+            CASE WHEN OLD.reaction = 'like' THEN -1 ELSE 0 END,
+            CASE WHEN OLD.reaction = 'dislike' THEN -1 ELSE 0 END
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bump_feedback_stats(
+            (NEW.created_at AT TIME ZONE 'UTC')::DATE,
+            0, 0, 0,
+            1,
+            CASE WHEN NEW.reaction = 'like' THEN 1 ELSE 0 END,
+            CASE WHEN NEW.reaction = 'dislike' THEN 1 ELSE 0 END
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_message_feedbacks_stats ON message_feedbacks;
+CREATE TRIGGER trg_message_feedbacks_stats
+AFTER INSERT OR DELETE OR UPDATE OF reaction, created_at ON message_feedbacks
+FOR EACH ROW EXECUTE FUNCTION message_feedbacks_stats_trigger();
+
+-- Trigger sur interactions (messages bot uniquement)
+CREATE OR REPLACE FUNCTION interactions_agent_stats_trigger()
+RETURNS TRIGGER AS $$
+DECLARE
+    row_data interactions%ROWTYPE;
+    direction BIGINT;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        row_data := NEW;
+        direction := 1;
+    ELSE
+        row_data := OLD;
+        direction := -1;
+    END IF;
+
+    IF row_data.message_type <> 'bot' THEN
+        RETURN NULL;
+    END IF;
+
+    INSERT INTO agent_stats_daily AS s (day, agent_used, message_count, content_length_sum)
+    VALUES (
+        (row_data.created_at AT TIME ZONE 'UTC')::DATE,
+        COALESCE(row_data.agent_used, 'unknown'),
+        direction,
+        direction * LENGTH(row_data.content)
+    )
+    ON CONFLICT (day, agent_used) DO UPDATE SET
+        message_count = s.message_count + EXCLUDED.message_count,
+        content_length_sum = s.content_length_sum + EXCLUDED.content_length_sum;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_interactions_agent_stats ON interactions;
+CREATE TRIGGER trg_interactions_agent_stats
+AFTER INSERT OR DELETE ON interactions
+FOR EACH ROW EXECUTE FUNCTION interactions_agent_stats_trigger();
+
+-- ============================================
+-- Fonctions de lecture (remplacent les agrégations complètes)
+-- ============================================
+-- Même signature qu'avant: le frontend et SupabaseClient ne changent pas
+CREATE OR REPLACE FUNCTION get_feedback_stats()
+RETURNS TABLE (
+    total_feedbacks BIGINT,
+    total_message_feedbacks BIGINT,
+    likes_count BIGINT,
+    dislikes_count BIGINT,
+    avg_rating NUMERIC
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        COALESCE(t.total_feedbacks, 0)::BIGINT,
+        COALESCE(t.total_message_feedbacks, 0)::BIGINT,
+        COALESCE(t.likes_count, 0)::BIGINT,
+        COALESCE(t.dislikes_count, 0)::BIGINT,
+        (t.rating_sum::NUMERIC / NULLIF(t.rating_count, 0))::NUMERIC
+    FROM (SELECT 1) AS one
+    LEFT JOIN feedback_stats_totals t ON t.id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statistiques par agent sur les N derniers jours (granularité: jour UTC)
+CREATE OR REPLACE FUNCTION get_agent_stats(days INTEGER DEFAULT 7)
+RETURNS TABLE (
+    agent_used TEXT,
+    count BIGINT,
+    avg_response_length NUMERIC
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        s.agent_used,
+        SUM(s.message_count)::BIGINT as count,
+        (SUM(s.content_length_sum)::NUMERIC / NULLIF(SUM(s.message_count), 0))::NUMERIC as avg_response_length
+    FROM agent_stats_daily s
+    WHERE s.day >= (NOW() AT TIME ZONE 'UTC')::DATE - days
+    GROUP BY s.agent_used
+    HAVING SUM(s.message_count) > 0
+    ORDER BY count DESC;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statistiques de feedbacks jour par jour (graphiques admin)
+CREATE OR REPLACE FUNCTION get_feedback_stats_daily(days INTEGER DEFAULT 30)
+RETURNS TABLE (
+    day DATE,
+    feedbacks_count BIGINT,
+    message_feedbacks_count BIGINT,
+    likes_count BIGINT,
+    dislikes_count BIGINT,
+    avg_rating NUMERIC
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        s.day,
+        s.feedbacks_count,
+        s.message_feedbacks_count,
+        s.likes_count,
+        s.dislikes_count,
+        (s.rating_sum::NUMERIC / NULLIF(s.rating_count, 0))::NUMERIC as avg_rating
+    FROM feedback_stats_daily s
+    WHERE s.day >= (NOW() AT TIME ZONE 'UTC')::DATE - days
+    ORDER BY s.day;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- Initialisation à partir des données existantes
+-- ============================================
+-- Les verrous bloquent les écritures le temps du recalcul pour qu'aucun
+-- incrément ne soit perdu ni compté deux fois.
+LOCK TABLE feedbacks, message_feedbacks, interactions IN SHARE ROW EXCLUSIVE MODE;
+
+TRUNCATE feedback_stats_totals, feedback_stats_daily, agent_stats_daily;
+
+INSERT INTO feedback_stats_daily (
+    day, feedbacks_count, rating_sum, rating_count,
+    message_feedbacks_count, likes_count, dislikes_count
+)
+SELECT
+    day,
+    SUM(feedbacks_count), SUM(rating_sum), SUM(rating_count),
+    SUM(message_feedbacks_count), SUM(likes_count), SUM(dislikes_count)
+FROM (
+    SELECT
+        (created_at AT TIME ZONE 'UTC')::DATE AS day,
+        COUNT(*) AS feedbacks_count,
+        COALESCE(SUM(rating), 0) AS rating_sum,
+        COUNT(rating) AS rating_count,
+        0 AS message_feedbacks_count,
+        0 AS likes_count,
+        0 AS dislikes_count
+    FROM feedbacks
+    GROUP BY 1
+    UNION ALL
+    SELECT
+        (created_at AT TIME ZONE 'UTC')::DATE,
+        0, 0, 0,
+        COUNT(*),
+        COUNT(*) FILTER (WHERE reaction = 'like'),
+        COUNT(*) FILTER (WHERE reaction = 'dislike')
+    FROM message_feedbacks
+    GROUP BY 1
+) per_day
+GROUP BY day;
+
+INSERT INTO feedback_stats_totals (
+    id, total_feedbacks, rating_sum, rating_count,
+    total_message_feedbacks, likes_count, dislikes_count
+)
+SELECT
+    TRUE,
+    COALESCE(SUM(feedbacks_count), 0), COALESCE(SUM(rating_sum), 0), COALESCE(SUM(rating_count), 0),
+    COALESCE(SUM(message_feedbacks_count), 0), COALESCE(SUM(likes_count), 0), COALESCE(SUM(dislikes_count), 0)
+FROM feedback_stats_daily;
+
+INSERT INTO agent_stats_daily (day, agent_used, message_count, content_length_sum)
+SELECT
+    (created_at AT TIME ZONE 'UTC')::DATE,
+    COALESCE(agent_used, 'unknown'),
+    COUNT(*),
+    COALESCE(SUM(LENGTH(content)), 0)
+FROM interactions
+WHERE message_type = 'bot'
+GROUP BY 1, 2;
+
+COMMIT;
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Script d'archivage des partitions mensuelles de la table interactions
+
+Pour chaque partition entièrement antérieure à la période de rétention
+(INTERACTIONS_RETENTION_MONTHS):
+1. export en NDJSON compressé (gzip) via un curseur serveur (mémoire constante)
+2. upload dans le bucket Supabase Storage "interactions-archive"
+3. enregistrement dans interactions_archives / interactions_archive_sessions
+4. détachement puis suppression de la partition (même transaction que le manifeste)
+
+Crée aussi les partitions des prochains mois: à planifier une fois par mois.
+
+Prérequis: partition_interactions.sql appliqué, SUPABASE_DB_URL défini.
+    python scripts/archive_interactions.py --dry-run
+    python scripts/archive_interactions.py
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import os
+import sys
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+# Ajouter le répertoire parent au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg
+from psycopg.rows import dict_row
+from supabase import create_client
+import structlog
+
+from app.core.config import settings
+from app.services.interaction_archive import (
+    INTERACTIONS_ARCHIVE_BUCKET,
+    archive_cutoff,
+    archive_storage_path,
+    serialize_interaction,
+)
+
+logger = structlog.get_logger()
+
+# Nombre de lignes récupérées par aller-retour du curseur serveur
+FETCH_SIZE = 5000
+
+
+def export_partition(conn, partition_name: str, output_path: Path) -> dict:
+    """
+    Exporte une partition en NDJSON gzip
+
+    Returns:
+        Dictionnaire avec row_count, size_bytes, sha256 et sessions
+        ({(session_id, user_id): nombre de messages})
+    """
+    sessions: Counter = Counter()
+    row_count = 0
+
+    with conn.transaction():
+        with conn.cursor(name=f"export_{partition_name}", row_factory=dict_row) as cur:
+            cur.itersize = FETCH_SIZE
+            cur.execute(
+                f'SELECT id, session_id, user_id, message_type, content, agent_used, metadata, created_at '
+                f'FROM "{partition_name}" ORDER BY created_at'
+            )
+            with gzip.open(output_path, "wt", encoding="utf-8") as archive_file:
+                for row in cur:
+                    archive_file.write(serialize_interaction(row) + "\n")
+                    sessions[(row["session_id"], row["user_id"])] += 1
+                    row_count += 1
+
+    sha256 = hashlib.sha256()
+    with open(output_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(block)
+
+    return {
+        "row_count": row_count,
+        "size_bytes": output_path.stat().st_size,
+        "sha256": sha256.hexdigest(),
+        "sessions": sessions,
+    }
+
+
+def upload_archive(storage, storage_path: str, output_path: Path):
+    """Upload le fichier d'archive dans Supabase Storage"""
+    storage.from_(INTERACTIONS_ARCHIVE_BUCKET).upload(
+        storage_path,
+        output_path,
+        file_options={"content-type": "application/gzip", "upsert": "true"}
+    )
+
+
+def record_and_detach(conn, partition: dict, storage_path: str, export: dict, keep_detached: bool):
+    """Enregistre l'archive dans le manifeste puis détache la partition (atomique)"""
+    with conn.transaction():
+        with conn.cursor() as cur:
+            # Garde-fou: aucune ligne ne doit avoir été ajoutée depuis l'export
+            cur.execute(f'SELECT COUNT(*) FROM "{partition["partition_name"]}"')
+            current_count = cur.fetchone()[0]
+            if current_count != export["row_count"]:
+                raise RuntimeError(
+                    f"{partition['partition_name']}: {current_count} lignes en base, "
+                    f"{export['row_count']} exportées"
+                )
+
+            cur.execute(
+                """
+                INSERT INTO interactions_archives
+                    (partition_name, range_start, range_end, storage_path, row_count, size_bytes, sha256)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (partition_name) DO UPDATE SET
+                    storage_path = EXCLUDED.storage_path,
+                    row_count = EXCLUDED.row_count,
+                    size_bytes = EXCLUDED.size_bytes,
+                    sha256 = EXCLUDED.sha256,
+                    archived_at = NOW()
+                RETURNING id
+                """,
+                (
+                    partition["partition_name"],
+                    partition["range_start"],
+                    partition["range_end"],
+                    storage_path,
+                    export["row_count"],
+                    export["size_bytes"],
+                    export["sha256"],
+                )
+            )
+            archive_id = cur.fetchone()[0]
+
+            cur.execute("DELETE FROM interactions_archive_sessions WHERE archive_id = %s", (archive_id,))
+            with cur.copy(
+                "COPY interactions_archive_sessions (session_id, archive_id, user_id, message_count) FROM STDIN"
+            ) as copy:
+                for (session_id, user_id), message_count in export["sessions"].items():
+                    copy.write_row((session_id, archive_id, user_id, message_count))
+
+            # DETACH ne déclenche pas de DELETE: les statistiques par agent sont conservées
+            cur.execute(f'ALTER TABLE interactions DETACH PARTITION "{partition["partition_name"]}"')
+            if not keep_detached:
+                cur.execute(f'DROP TABLE "{partition["partition_name"]}"')
+
+
+def archive_interactions(retention_months: int, dry_run: bool, keep_detached: bool) -> dict:
+    """Archive toutes les partitions antérieures à la période de rétention"""
+    cutoff = archive_cutoff(retention_months)
+    stats = {"partitions": 0, "rows": 0, "bytes": 0, "created_partitions": 0}
+
+    with psycopg.connect(settings.SUPABASE_DB_URL, autocommit=True) as conn:
+        with conn.cursor() as cur:
+            if not dry_run:
+                cur.execute("SELECT ensure_interactions_partitions()")
+                stats["created_partitions"] = cur.fetchone()[0]
+
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                "SELECT * FROM list_interactions_partitions() WHERE range_end <= %s",
+                (cutoff,)
+            )
+            partitions = cur.fetchall()
+
+        logger.info(
+            "Partitions to archive",
+            cutoff=cutoff.isoformat(),
+            partitions=[p["partition_name"] for p in partitions]
+        )
+        if dry_run or not partitions:
+            return stats
+
+        storage_key = settings.SUPABASE_SERVICE_ROLE_KEY or settings.SUPABASE_KEY
+        storage = create_client(settings.SUPABASE_URL, storage_key).storage
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for partition in partitions:
+                output_path = Path(tmp_dir) / f"{partition['partition_name']}.ndjson.gz"
+                storage_path = archive_storage_path(partition["partition_name"], partition["range_start"])
+
+                export = export_partition(conn, partition["partition_name"], output_path)
+                upload_archive(storage, storage_path, output_path)
+                record_and_detach(conn, partition, storage_path, export, keep_detached)
+                output_path.unlink()
+
+                stats["partitions"] += 1
+                stats["rows"] += export["row_count"]
+                stats["bytes"] += export["size_bytes"]
+                logger.info(
+                    "Partition archived",
+                    partition=partition["partition_name"],
+                    storage_path=storage_path,
+                    rows=export["row_count"],
+                    sessions=len(export["sessions"]),
+                    size_bytes=export["size_bytes"]
+                )
+
+    return stats
+
+
+async def main():
+    """Point d'entrée principal"""
+    parser = argparse.ArgumentParser(description="Archive les vieilles partitions de la table interactions")
+    parser.add_argument(
+        "--retention-months",
+        type=int,
+        default=settings.INTERACTIONS_RETENTION_MONTHS,
+        help="Nombre de mois conservés dans la table interactions"
+    )
+    parser.add_argument("--dry-run", action="store_true", help="Liste les partitions sans rien archiver")
+    parser.add_argument(
+        "--keep-detached",
+        action="store_true",
+        help="Conserve les partitions détachées au lieu de les supprimer"
+    )
+    args = parser.parse_args()
+
+    if not settings.SUPABASE_DB_URL:
+        logger.error("SUPABASE_DB_URL is not set")
+        sys.exit(1)
+
+    # psycopg est synchrone: le travail s'exécute dans un thread
+    stats = await asyncio.to_thread(
+        archive_interactions,
+        args.retention_months,
+        args.dry_run,
+        args.keep_detached
+    )
+    logger.info("Archiving completed", **stats)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -17,6 +17,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
 from app.core.config import settings
+from app.services.procedure_prompt import compile_procedure_prompt
 import structlog
 
 logger = structlog.get_logger()
@@ -179,6 +180,10 @@ async def main():
     # Créer les procédures
     procedures = await create_procedures_from_categorized_tickets(categorized_file)
     
+    # Fragments de prompt précompilés (réutilisés tels quels par les agents)
+    for procedure in procedures:
+        compile_procedure_prompt(procedure)
+    
     # Sauvegarder les procédures
     output_file = Path(__file__).parent.parent / "knowledge_base" / "procedures.json"
     with open(output_file, 'w', encoding='utf-8') as f:
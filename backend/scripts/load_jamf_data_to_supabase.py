@@ -5,13 +5,13 @@ Script pour charger les données Jamf dans Supabase
 import asyncio
 import sys
 import os
-import csv
 from pathlib import Path
 
 # Ajouter le répertoire parent au path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.database.supabase_client import SupabaseClient
+from app.services.jamf_index import get_jamf_index, read_jamf_csv
 import structlog
 
 logger = structlog.get_logger()
@@ -25,20 +25,7 @@ async def load_jamf_data_to_supabase(csv_file: Path):
     client = supabase._get_client()
     
     # Lire le CSV
-    devices = []
-    with open(csv_file, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            devices.append({
-                "device_jss_id": int(row["Device JSS ID"]),
-                "hostname": row["Hostname"],
-                "serial": row["Serial"],
-                "username": row["Username"],
-                "is_admin": row["Is Admin"].upper() == "TRUE",
-                "is_filevault_user": row["Is Filevault user"].upper() == "TRUE",
-                "uid": int(row["UID"]) if row["UID"] else None,
-                "home_directory": row["Home Directory"] if row["Home Directory"] else None
-            })
+    devices = read_jamf_csv(csv_file)
     
     logger.info(f"Loading {len(devices)} Jamf device records to Supabase")
     
@@ -67,6 +54,9 @@ async def load_jamf_data_to_supabase(csv_file: Path):
         except Exception as e:
             logger.error(f"Error inserting batch {i//batch_size + 1}: {e}")
     
+    # Rechargement de l'index Jamf en mémoire (tous les workers)
+    await get_jamf_index().notify_changed()
+    
     logger.info(f"Successfully loaded {total_inserted} Jamf device records to Supabase")
 
 
@@ -1,183 +1,29 @@
 #!/usr/bin/env python3
 """
-Script pour charger la base de connaissances dans Pinecone
+Script pour charger la base de connaissances dans le moteur vectoriel
+(Pinecone ou index local selon VECTOR_BACKEND). L'index local est toujours
+reconstruit à partir des mêmes vecteurs.
+
+Réindexation incrémentale par défaut; --full reconstruit l'index dans un
+nouveau namespace, activé après validation (blue/green).
+La logique d'indexation est dans app/services/kb_indexer.py (partagée avec
+les jobs d'administration).
 """
 import asyncio
 import sys
 import os
-import unicodedata
-import re
-from pathlib import Path
+from typing import Dict, Any
 
 # Ajouter le répertoire parent au path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from app.database.pinecone_client import PineconeClient
-from langchain_openai import OpenAIEmbeddings
-from app.core.config import settings
-import structlog
+from app.services.kb_indexer import index_knowledge_base
 
-logger = structlog.get_logger()
 
-
-def normalize_id(text: str) -> str:
-    """
-    Normalise un texte pour créer un ID ASCII valide pour Pinecone
-    Remplace les caractères accentués et les caractères spéciaux
-    """
-    # Normaliser les caractères Unicode (NFD = décomposition)
-    text = unicodedata.normalize('NFD', text)
-    # Supprimer les accents
-    text = text.encode('ascii', 'ignore').decode('ascii')
-    # Remplacer les espaces et caractères spéciaux par des underscores
-    text = re.sub(r'[^a-zA-Z0-9_-]', '_', text)
-    # Supprimer les underscores multiples
-    text = re.sub(r'_+', '_', text)
-    # Supprimer les underscores en début/fin
-    text = text.strip('_')
-    return text
-
-
-async def load_knowledge_base():
-    """Charge les fichiers markdown de la base de connaissances dans Pinecone
-    
-    Format uniforme: Tous les fichiers sont en Markdown (.md)
-    Structure standardisée:
-    - Titre principal (#)
-    - Section Contexte (##)
-    - Sections FAQ avec Q: et R: (##)
-    - Sections procédures si nécessaire (##)
-    
-    Lit maintenant depuis Supabase Storage au lieu du filesystem
-    """
-    from app.services.knowledge_base_storage import KnowledgeBaseStorage
-    
-    pinecone = PineconeClient()
-    embeddings = OpenAIEmbeddings(
-        model="text-embedding-3-small",
-        openai_api_key=settings.OPENAI_API_KEY
-    )
-    
-    # Utiliser Supabase Storage
-    storage = KnowledgeBaseStorage()
-    files = await storage.list_files()
-    
-    # Filtrer pour ne garder que les fichiers .md (exclure README.md)
-    md_files = [f for f in files if f["path"].endswith(".md") and not f["path"].endswith("README.md")]
-    
-    logger.info(f"Found {len(md_files)} markdown knowledge files in Supabase Storage")
-    
-    vectors_to_upsert = []
-    
-    for file_info in md_files:
-        file_path = file_info["path"]
-        file_name = file_info["name"]
-        
-        logger.info(f"Processing: {file_name}")
-        
-        # Récupérer le contenu depuis Supabase Storage
-        file_data = await storage.get_file(file_path)
-        if not file_data:
-            logger.warning(f"Could not read file: {file_path}")
-            continue
-        
-        content = file_data["content"]
-        
-        # Diviser le contenu en sections pour créer des embeddings plus précis
-        # Chaque section (##) devient un vecteur séparé
-        sections = []
-        current_section = ""
-        current_title = ""
-        
-        for line in content.split('\n'):
-            if line.startswith('## '):
-                # Nouvelle section détectée
-                if current_section.strip():
-                    sections.append({
-                        "title": current_title,
-                        "content": current_section.strip()
-                    })
-                current_title = line.replace('## ', '').strip()
-                current_section = line + '\n'
-            elif line.startswith('### '):
-                # Sous-section
-                current_section += line + '\n'
-            else:
-                current_section += line + '\n'
-        
-        # Ajouter la dernière section
-        if current_section.strip():
-            sections.append({
-                "title": current_title or md_file.stem,
-                "content": current_section.strip()
-            })
-        
-        # Si pas de sections détectées, traiter le document entier
-        if not sections:
-            sections = [{"title": file_stem, "content": content}]
-        
-        # Normaliser le nom de fichier pour l'ID
-        # Enlever l'extension .md
-        file_stem = file_name.rsplit(".md", 1)[0] if file_name.endswith(".md") else file_name
-        normalized_stem = normalize_id(file_stem)
-        
-        # Créer un embedding pour le document complet
-        doc_embedding = await embeddings.aembed_query(content)
-        doc_vector = {
-            "id": f"kb_doc_{normalized_stem}",
-            "values": doc_embedding,
-            "metadata": {
-                "text": content,
-                "source": file_name,
-                "type": "knowledge_base",
-                "format": "markdown",
-                "section": "full_document"
-            }
-        }
-        vectors_to_upsert.append(doc_vector)
-        
-        # Créer des embeddings pour chaque section (pour recherche plus précise)
-        for idx, section in enumerate(sections):
-            section_text = f"{section['title']}\n\n{section['content']}"
-            section_embedding = await embeddings.aembed_query(section_text)
-            
-            # Normaliser le titre de section pour l'ID
-            normalized_section_title = normalize_id(section['title'])
-            
-            section_vector = {
-                "id": f"kb_section_{normalized_stem}_{idx}_{normalized_section_title[:30]}",
-                "values": section_embedding,
-                "metadata": {
-                    "text": section_text,
-                    "title": section['title'],
-                    "source": file_name,
-                    "type": "knowledge_base",
-                    "format": "markdown",
-                    "section": section['title'],
-                    "section_index": idx
-                }
-            }
-            vectors_to_upsert.append(section_vector)
-    
-    # Upsert dans Pinecone
-    if vectors_to_upsert:
-        try:
-            index = pinecone._get_index()
-            # Upsert par batch de 100 (limite Pinecone)
-            batch_size = 100
-            for i in range(0, len(vectors_to_upsert), batch_size):
-                batch = vectors_to_upsert[i:i + batch_size]
-                index.upsert(vectors=batch)
-                logger.info(f"Upserted batch {i//batch_size + 1} ({len(batch)} vectors)")
-            
-            logger.info(f"Successfully loaded {len(vectors_to_upsert)} documents into Pinecone")
-        except Exception as e:
-            logger.error(f"Error upserting to Pinecone: {e}")
-            raise
-    else:
-        logger.warning("No documents to load")
+async def load_knowledge_base(full: bool = False) -> Dict[str, Any]:
+    """Charge les fichiers markdown de la base de connaissances (voir kb_indexer)"""
+    return await index_knowledge_base(full=full)
 
 
 if __name__ == "__main__":
-    asyncio.run(load_knowledge_base())
-
+    asyncio.run(load_knowledge_base(full="--full" in sys.argv))
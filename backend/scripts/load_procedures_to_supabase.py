@@ -2,6 +2,13 @@
 """
 Script pour charger les procédures dans Supabase
 Étape 5: Stockage dans Supabase
+
+Les questions reformulées et le fragment de prompt de chaque procédure sont
+précompilés (app/services/procedure_prompt.py) et stockés avec leur empreinte.
+
+Avec VECTOR_BACKEND=pgvector, l'embedding de chaque procédure (titre,
+catégorie, description) est enregistré dans procedures.embedding
+(scripts/add_pgvector_retrieval.sql).
 """
 import asyncio
 import sys
@@ -14,11 +21,19 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.database.supabase_client import SupabaseClient
 from app.core.config import settings
+from app.services.embedding_service import get_embedding_service
+from app.services.procedure_prompt import compile_procedure_prompt
+from app.services.procedure_index import get_procedure_index
 import structlog
 
 logger = structlog.get_logger()
 
 
+def procedure_embedding_text(procedure: dict) -> str:
+    """Texte encodé pour la recherche vectorielle d'une procédure"""
+    return f"{procedure['title']}\n{procedure['category']}\n{procedure.get('description', '')}".strip()
+
+
 async def load_procedures_to_supabase(procedures_file: Path):
     """
     Charge les procédures dans Supabase
@@ -32,7 +47,18 @@ async def load_procedures_to_supabase(procedures_file: Path):
     
     logger.info(f"Loading {len(procedures)} procedures to Supabase")
     
+    # Fragments de prompt recompilés (le fichier a pu être modifié à la main)
     for procedure in procedures:
+        compile_procedure_prompt(procedure)
+    
+    # Embeddings des procédures (recherche pgvector), calculés par batch
+    embeddings = [None] * len(procedures)
+    if settings.VECTOR_BACKEND == "pgvector":
+        embeddings = await get_embedding_service().embed_documents([
+            procedure_embedding_text(procedure) for procedure in procedures
+        ])
+    
+    for procedure, embedding in zip(procedures, embeddings):
         try:
             # Préparer les données
             data = {
@@ -43,8 +69,14 @@ async def load_procedures_to_supabase(procedures_file: Path):
                 "resolution_steps": json.dumps(procedure.get("resolution_steps", [])),
                 "ticket_creation": json.dumps(procedure.get("ticket_creation", {})),
                 "common_issues": json.dumps(procedure.get("common_issues", [])),
-                "source_tickets_count": procedure.get("source_tickets_count", 0)
+                "source_tickets_count": procedure.get("source_tickets_count", 0),
+                # Fragment précompilé (scripts/add_procedure_prompts.sql)
+                "conversational_questions": json.dumps(procedure["conversational_questions"]),
+                "prompt": procedure["prompt"],
+                "prompt_hash": procedure["prompt_hash"]
             }
+            if embedding is not None:
+                data["embedding"] = embedding
             
             # Insérer ou mettre à jour (upsert)
             result = client.table("procedures").upsert(
@@ -57,6 +89,9 @@ async def load_procedures_to_supabase(procedures_file: Path):
         except Exception as e:
             logger.error(f"Error loading procedure {procedure.get('title', 'unknown')}: {e}")
     
+    # Rechargement de l'index des procédures en mémoire (tous les workers)
+    await get_procedure_index().notify_changed()
+    
     logger.info("Finished loading procedures to Supabase")
 
 
@@ -67,8 +67,8 @@ async def migrate_knowledge_base():
             with open(md_file, 'r', encoding='utf-8') as f:
                 content = f.read()
             
-            # Sauvegarder dans Supabase Storage
-            result = await storage.save_file(storage_path, content)
+            # Sauvegarder dans Supabase Storage (indexation: load_knowledge_base.py ensuite)
+            result = await storage.save_file(storage_path, content, reindex=False)
             
             if result:
                 logger.info(f"Migrated: {storage_path}")
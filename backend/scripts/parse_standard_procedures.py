@@ -15,6 +15,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import structlog
 
+from app.services.procedure_prompt import compile_procedure_prompt
+
 logger = structlog.get_logger()
 
 # Mapping des procédures vers les catégories existantes
@@ -224,6 +226,10 @@ async def main():
     
     logger.info(f"Parsed {len(procedures)} standard procedures")
     
+    # Fragments de prompt précompilés (réutilisés tels quels par les agents)
+    for procedure in procedures:
+        compile_procedure_prompt(procedure)
+    
     # Sauvegarder en JSON
     output_file = Path(__file__).parent.parent / "knowledge_base" / "standard_procedures.json"
     with open(output_file, 'w', encoding='utf-8') as f:
@@ -0,0 +1,221 @@
+-- ============================================
+-- Migration: partitionnement mensuel de la table interactions
+-- ============================================
+-- À exécuter dans l'éditeur SQL de Supabase (après slack_integration_schema.sql,
+-- add_composite_indexes.sql et add_stats_rollups.sql)
+--
+-- interactions conserve tous les messages depuis le début. Les index (dont
+-- les index JSONB Slack) et les requêtes d'historique grossissent sans fin.
+-- La table devient partitionnée par mois (RANGE sur created_at, bornes UTC):
+-- - les requêtes récentes ne touchent que les partitions concernées
+-- - les vieilles partitions sont exportées puis détachées par
+--   scripts/archive_interactions.py (lecture à la demande via
+--   InteractionArchiveService)
+--
+-- Note: la clé primaire devient (id, created_at) car Postgres exige que la
+-- clé de partitionnement fasse partie des contraintes d'unicité. Les id
+-- restent des UUID aléatoires, aucun appelant ne dépend de l'unicité seule.
+--
+-- L'ancienne table est conservée sous le nom interactions_legacy. Une fois
+-- les données vérifiées: DROP TABLE interactions_legacy;
+
+BEGIN;
+
+-- Bloque les écritures pendant la copie
+LOCK TABLE interactions IN ACCESS EXCLUSIVE MODE;
+
+-- ============================================
+-- Bascule des noms
+-- ============================================
+ALTER TABLE interactions RENAME TO interactions_legacy;
+ALTER TABLE interactions_legacy RENAME CONSTRAINT interactions_pkey TO interactions_legacy_pkey;
+
+-- Les noms d'index sont globaux au schéma: on libère ceux de l'ancienne table
+DROP INDEX IF EXISTS idx_interactions_session_id;
+DROP INDEX IF EXISTS idx_interactions_session_user_created;
+DROP INDEX IF EXISTS idx_interactions_user_id;
+DROP INDEX IF EXISTS idx_interactions_created_at;
+DROP INDEX IF EXISTS idx_interactions_bot_created_agent;
+DROP INDEX IF EXISTS idx_interactions_metadata_platform;
+DROP INDEX IF EXISTS idx_interactions_metadata_slack_channel;
+
+-- L'ancienne table ne doit plus alimenter les statistiques
+DROP TRIGGER IF EXISTS trg_interactions_agent_stats ON interactions_legacy;
+
+CREATE TABLE interactions (
+    id UUID DEFAULT gen_random_uuid() NOT NULL,
+    session_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    message_type TEXT NOT NULL, -- 'user' ou 'bot'
+    content TEXT NOT NULL,
+    agent_used TEXT,
+    metadata JSONB DEFAULT '{}'::jsonb,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    CONSTRAINT interactions_pkey PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- Partition par défaut: filet de sécurité pour qu'aucune insertion n'échoue
+-- si les partitions futures n'ont pas été créées à temps
+CREATE TABLE IF NOT EXISTS interactions_default PARTITION OF interactions DEFAULT;
+
+-- ============================================
+-- Gestion des partitions
+-- ============================================
+-- Crée la partition du mois contenant month_start (nom: interactions_yYYYYmMM)
+CREATE OR REPLACE FUNCTION create_interactions_partition(month_start DATE)
+RETURNS TEXT AS $$
+DECLARE
+    range_start TIMESTAMP WITH TIME ZONE;
+    range_end TIMESTAMP WITH TIME ZONE;
+    partition_name TEXT;
+BEGIN
+    month_start := date_trunc('month', month_start)::DATE;
+    range_start := month_start::TIMESTAMP AT TIME ZONE 'UTC';
+    range_end := (month_start + INTERVAL '1 month')::TIMESTAMP AT TIME ZONE 'UTC';
+    partition_name := 'interactions_' || to_char(month_start, '"y"YYYY"m"MM');
+
+    IF to_regclass(partition_name) IS NOT NULL THEN
+        RETURN NULL;
+    END IF;
+
+    -- Postgres refuse de créer une partition dont les lignes sont déjà dans
+    -- la partition par défaut: on le signale sans bloquer les autres mois
+    IF EXISTS (
+        SELECT 1 FROM interactions_default
+        WHERE created_at >= range_start AND created_at < range_end
+    ) THEN
+        RAISE WARNING 'interactions_default contient des lignes pour %, partition % non créée',
+            to_char(month_start, 'YYYY-MM'), partition_name;
+        RETURN NULL;
+    END IF;
+
+    EXECUTE format(
+        'CREATE TABLE %I PARTITION OF interactions FOR VALUES FROM (%L) TO (%L)',
+        partition_name, range_start, range_end
+    );
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Crée les partitions manquantes de from_month jusqu'à months_ahead mois après
+-- le mois courant. Appelée par archive_interactions.py à chaque exécution.
+CREATE OR REPLACE FUNCTION ensure_interactions_partitions(
+    from_month DATE DEFAULT (NOW() AT TIME ZONE 'UTC')::DATE,
+    months_ahead INTEGER DEFAULT 3
+)
+RETURNS INTEGER AS $$
+DECLARE
+    current_month DATE := date_trunc('month', from_month)::DATE;
+    last_month DATE := (date_trunc('month', NOW() AT TIME ZONE 'UTC') + (months_ahead || ' months')::INTERVAL)::DATE;
+    created INTEGER := 0;
+BEGIN
+    WHILE current_month <= last_month LOOP
+        IF create_interactions_partition(current_month) IS NOT NULL THEN
+            created := created + 1;
+        END IF;
+        current_month := (current_month + INTERVAL '1 month')::DATE;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Liste les partitions mensuelles avec leurs bornes (utilisé par le job d'archivage)
+CREATE OR REPLACE FUNCTION list_interactions_partitions()
+RETURNS TABLE (
+    partition_name TEXT,
+    range_start TIMESTAMP WITH TIME ZONE,
+    range_end TIMESTAMP WITH TIME ZONE
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT
+        c.relname::TEXT,
+        (regexp_match(pg_get_expr(c.relpartbound, c.oid), 'FROM \(''([^'']+)''\)'))[1]::TIMESTAMP WITH TIME ZONE,
+        (regexp_match(pg_get_expr(c.relpartbound, c.oid), 'TO \(''([^'']+)''\)'))[1]::TIMESTAMP WITH TIME ZONE
+    FROM pg_inherits inh
+    JOIN pg_class c ON c.oid = inh.inhrelid
+    WHERE inh.inhparent = 'interactions'::regclass
+      AND pg_get_expr(c.relpartbound, c.oid) <> 'DEFAULT'
+    ORDER BY 2;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- Copie des données
+-- ============================================
+SELECT ensure_interactions_partitions(
+    COALESCE(
+        (SELECT MIN(created_at AT TIME ZONE 'UTC')::DATE FROM interactions_legacy),
+        (NOW() AT TIME ZONE 'UTC')::DATE
+    )
+);
+
+INSERT INTO interactions (id, session_id, user_id, message_type, content, agent_used, metadata, created_at)
+SELECT id, session_id, user_id, message_type, content, agent_used, metadata, COALESCE(created_at, NOW())
+FROM interactions_legacy;
+
+-- ============================================
+-- Index (créés sur la table parente, propagés à chaque partition)
+-- ============================================
+CREATE INDEX IF NOT EXISTS idx_interactions_session_user_created ON interactions(session_id, user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_interactions_user_id ON interactions(user_id);
+CREATE INDEX IF NOT EXISTS idx_interactions_created_at ON interactions(created_at ASC);
+CREATE INDEX IF NOT EXISTS idx_interactions_bot_created_agent ON interactions(created_at, agent_used) WHERE message_type = 'bot';
+CREATE INDEX IF NOT EXISTS idx_interactions_metadata_platform ON interactions ((metadata->>'platform'));
+CREATE INDEX IF NOT EXISTS idx_interactions_metadata_slack_channel ON interactions ((metadata->>'slack_channel'));
+
+-- Trigger des statistiques par agent (add_stats_rollups.sql), recréé après la
+-- copie pour ne pas compter deux fois les messages existants
+CREATE TRIGGER trg_interactions_agent_stats
+AFTER INSERT OR DELETE ON interactions
+FOR EACH ROW EXECUTE FUNCTION interactions_agent_stats_trigger();
+
+-- La vue Slack référençait l'ancienne table (liaison par OID): on la recrée
+CREATE OR REPLACE VIEW slack_conversations_view AS
+SELECT
+    c.id,
+    c.session_id,
+    c.user_id,
+    c.title,
+    c.created_at,
+    c.updated_at,
+    COUNT(i.id) as message_count,
+    MAX(i.created_at) as last_message_at,
+    (i.metadata->>'slack_channel')::text as slack_channel,
+    (i.metadata->>'slack_user_name')::text as slack_user_name
+FROM conversations c
+LEFT JOIN interactions i ON c.session_id = i.session_id
+WHERE (i.metadata->>'platform') = 'slack'
+   OR c.session_id LIKE 'slack_%'
+GROUP BY c.id, c.session_id, c.user_id, c.title, c.created_at, c.updated_at,
+         (i.metadata->>'slack_channel')::text, (i.metadata->>'slack_user_name')::text;
+
+-- ============================================
+-- Manifeste des archives
+-- ============================================
+-- Une ligne par partition exportée vers Supabase Storage
+CREATE TABLE IF NOT EXISTS interactions_archives (
+    id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+    partition_name TEXT NOT NULL UNIQUE,
+    range_start TIMESTAMP WITH TIME ZONE NOT NULL,
+    range_end TIMESTAMP WITH TIME ZONE NOT NULL,
+    storage_path TEXT NOT NULL,
+    row_count BIGINT NOT NULL,
+    size_bytes BIGINT NOT NULL,
+    sha256 TEXT NOT NULL,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- Index session -> archives: le chemin de lecture ne télécharge que les
+-- fichiers qui contiennent réellement la conversation demandée
+CREATE TABLE IF NOT EXISTS interactions_archive_sessions (
+    session_id TEXT NOT NULL,
+    archive_id UUID NOT NULL REFERENCES interactions_archives(id) ON DELETE CASCADE,
+    user_id TEXT NOT NULL,
+    message_count INTEGER NOT NULL,
+    PRIMARY KEY (session_id, archive_id)
+);
+
+COMMIT;
+
+ANALYZE interactions;
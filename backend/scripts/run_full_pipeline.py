@@ -16,33 +16,45 @@ import structlog
 logger = structlog.get_logger()
 
 
-async def run_pipeline():
+async def _noop_progress(stage: str, **data):
+    """Progression ignorée (exécution en ligne de commande)"""
+
+
+async def run_pipeline(progress=None):
     """
     Exécute le pipeline complet:
     1. Catégorisation des tickets
     2. Création des procédures
     3. Chargement dans Pinecone
     4. Chargement dans Supabase
+    
+    Args:
+        progress: Callback de progression (jobs d'administration), optionnel
     """
+    progress = progress or _noop_progress
     logger.info("Starting full pipeline for procedural knowledge base creation")
     
     # Étape 1: Catégorisation
     logger.info("Step 1: Categorizing tickets...")
+    await progress("categorize", step=1, steps_total=4)
     from scripts.categorize_tickets import main as categorize_main
     await categorize_main()
     
     # Étape 2: Création des procédures
     logger.info("Step 2: Creating procedures...")
+    await progress("create_procedures", step=2, steps_total=4)
     from scripts.create_procedures import main as create_procedures_main
     await create_procedures_main()
     
     # Étape 3: Chargement dans Pinecone
     logger.info("Step 3: Loading procedures to Pinecone...")
-    from scripts.load_knowledge_base import load_knowledge_base
-    await load_knowledge_base()
+    await progress("load_knowledge_base", step=3, steps_total=4)
+    from app.services.kb_indexer import index_knowledge_base
+    await index_knowledge_base(progress=progress)
     
     # Étape 4: Chargement dans Supabase
     logger.info("Step 4: Loading procedures to Supabase...")
+    await progress("load_supabase", step=4, steps_total=4)
     from scripts.load_procedures_to_supabase import main as load_supabase_main
     await load_supabase_main()
     
@@ -11,8 +11,8 @@ CREATE TABLE IF NOT EXISTS conversations (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
--- Index pour les recherches par utilisateur
-CREATE INDEX IF NOT EXISTS idx_conversations_user_id ON conversations(user_id);
+-- Index pour les recherches par utilisateur (liste triée par date de mise à jour)
+CREATE INDEX IF NOT EXISTS idx_conversations_user_updated ON conversations(user_id, updated_at DESC);
 CREATE INDEX IF NOT EXISTS idx_conversations_session_id ON conversations(session_id);
 CREATE INDEX IF NOT EXISTS idx_conversations_updated_at ON conversations(updated_at DESC);
 
@@ -28,10 +28,12 @@ CREATE TABLE IF NOT EXISTS interactions (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
--- Index pour les recherches par session
-CREATE INDEX IF NOT EXISTS idx_interactions_session_id ON interactions(session_id);
+-- Index pour les recherches par session (filtre session_id + user_id, tri par created_at)
+CREATE INDEX IF NOT EXISTS idx_interactions_session_user_created ON interactions(session_id, user_id, created_at);
 CREATE INDEX IF NOT EXISTS idx_interactions_user_id ON interactions(user_id);
 CREATE INDEX IF NOT EXISTS idx_interactions_created_at ON interactions(created_at ASC);
+-- Index partiel pour les statistiques par agent (get_agent_stats)
+CREATE INDEX IF NOT EXISTS idx_interactions_bot_created_agent ON interactions(created_at, agent_used) WHERE message_type = 'bot';
 
 -- Contrainte de clé étrangère (optionnelle, pour garantir l'intégrité)
 -- ALTER TABLE interactions ADD CONSTRAINT fk_interactions_conversation 
@@ -209,14 +209,72 @@ export default function AdminKnowledgeBasePage() {
     }
   }
 
+  const followReindexJob = (jobId: string) => {
+    const wsBase = apiUrl.replace(/^http/, 'ws')
+    const ws = new WebSocket(`${wsBase}/ws/admin/jobs/${jobId}?token=${encodeURIComponent(token)}`)
+    const toastId = toast.loading('Re-indexation en cours...')
+    // Statut final reçu (terminé, échoué ou erreur du serveur)
+    let finished = false
+
+    const finish = () => {
+      finished = true
+      setIsReindexing(false)
+      ws.close()
+    }
+
+    ws.onmessage = (event) => {
+      const data = JSON.parse(event.data)
+      if (data.type === 'error') {
+        toast.error(`Suivi de la re-indexation impossible : ${data.message || 'erreur inconnue'}`, { id: toastId })
+        finish()
+        return
+      }
+      if (data.type !== 'job') return
+      const job = data.job
+      const progress = job.progress || {}
+
+      if (job.status === 'completed') {
+        const { added = 0, updated = 0, deleted = 0 } = job.result || {}
+        toast.success(
+          `Base de connaissances re-indexée : ${added} ajout(s), ${updated} mise(s) à jour, ${deleted} suppression(s)`,
+          { id: toastId }
+        )
+        finish()
+      } else if (job.status === 'failed') {
+        toast.error(`Erreur lors de la re-indexation : ${job.error || 'erreur inconnue'}`, { id: toastId })
+        finish()
+      } else if (job.stage === 'download' && progress.files_total) {
+        toast.loading(`Téléchargement : ${progress.files_processed || 0}/${progress.files_total} fichiers`, { id: toastId })
+      } else if (job.stage === 'embedding') {
+        toast.loading(`Calcul des embeddings : ${progress.embedded || 0} chunk(s)`, { id: toastId })
+      } else if (job.stage === 'upsert') {
+        toast.loading(`Mise à jour de l'index : ${progress.vectors_upserted || 0} vecteur(s)`, { id: toastId })
+      } else if (job.stage === 'validation') {
+        toast.loading('Validation du nouvel index...', { id: toastId })
+      }
+    }
+
+    // Une erreur est toujours suivie de la fermeture: signalée dans onclose
+    ws.onerror = () => {
+      ws.close()
+    }
+
+    ws.onclose = () => {
+      if (finished) return
+      finished = true
+      toast.error('Suivi de la re-indexation interrompu.', { id: toastId })
+      setIsReindexing(false)
+    }
+  }
+
   const reindex = async () => {
     if (!token) return
-    if (!confirm('Êtes-vous sûr de vouloir re-indexer la base de connaissances dans Pinecone ? Cela peut prendre quelques minutes.')) return
+    if (!confirm('Êtes-vous sûr de vouloir re-indexer la base de connaissances ?')) return
 
     setIsReindexing(true)
 
     try {
-      await axios.post(
+      const response = await axios.post(
         `${apiUrl}/api/v1/admin/knowledge-base/reindex`,
         {},
         {
@@ -225,13 +283,13 @@ export default function AdminKnowledgeBasePage() {
           }
         }
       )
-      
-      toast.success('Base de connaissances re-indexée avec succès dans Pinecone !')
+      followReindexJob(response.data.id)
     } catch (error: any) {
-      const message = 'Erreur lors de la re-indexation. Veuillez réessayer.'
+      const message = error.response?.status === 409
+        ? 'Une re-indexation est déjà en cours.'
+        : 'Erreur lors de la re-indexation. Veuillez réessayer.'
       console.error('Error reindexing:', error)
       toast.error(message)
-    } finally {
       setIsReindexing(false)
     }
   }